@@ -10,6 +10,8 @@ from importlib.metadata import version
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from manugen_ai.extraction import EXTRACTION_STATS
+from manugen_ai.http_client import get_http_client
 
 from .adk_api import adk_app  # Import the ADK FastAPI app
 
@@ -63,6 +65,21 @@ async def api_status():
     }
 
 
+@app.get("/api/v1/http_cache")
+async def http_cache_status():
+    """HTTP response cache metrics endpoint."""
+    cache = get_http_client().cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.summary()}
+
+
+@app.get("/api/v1/extraction")
+async def extraction_status():
+    """Fetched content extraction metrics endpoint (bytes in, tokens out)."""
+    return EXTRACTION_STATS.summary()
+
+
 # mount the ADK FastAPI app as a sub-app of our API server
 app.mount(
     "/adk_api",
@@ -15,13 +15,34 @@ echo ""
 cd "$(dirname "$0")"
 
 # ensure the text embedding model is downloaded
-if [ "${USE_GEMINI_EMBEDDINGS:-0}" != "1" ]; then
+if [ "${USE_GEMINI_EMBEDDINGS:-0}" != "1" ] && [ "${FLAGEMBEDDING_BACKEND:-torch}" = "onnx" ]; then
+    # export once here, rather than in the workers' first requests
+    echo "* Downloading and exporting FlagEmbedding text embedding model (${FLAGEMBEDDING_MODEL_OR_PATH:-BAAI/bge-m3}) to ONNX..."
+    uv run python -c "from manugen_ai.data import export_flag_embedding_model_to_onnx ; export_flag_embedding_model_to_onnx()"
+elif [ "${USE_GEMINI_EMBEDDINGS:-0}" != "1" ]; then
     echo "* Downloading FlagEmbedding text embedding model (${FLAGEMBEDDING_MODEL_OR_PATH:-BAAI/bge-m3})..."
     uv run python -c "from manugen_ai.data import get_flag_embedding_model ; get_flag_embedding_model()"
 else
     echo "* Using Gemini text embeddings via the Google GenAI API, skipping download."
 fi
 
+# start the embedding service, so that the uvicorn workers share one copy of the
+# FlagEmbedding model and their query embeddings are micro-batched together
+if [ "${USE_GEMINI_EMBEDDINGS:-0}" != "1" ] && [ -n "${EMBEDDING_SERVICE_URL}" ]; then
+    echo "* Starting embedding service at ${EMBEDDING_SERVICE_URL}..."
+    uv run manugen embedding-server &
+    EMBEDDING_SERVICE_PID=$!
+
+    # wait for the service to load its model, so the workers' first
+    # embedding requests aren't refused
+    echo "* Waiting for the embedding service to be ready..."
+    if ! uv run python -c "from manugen_ai.embedding_service import EmbeddingServiceClient ; EmbeddingServiceClient('${EMBEDDING_SERVICE_URL}').wait_until_ready(timeout_s=${EMBEDDING_SERVICE_STARTUP_TIMEOUT_S:-600})"; then
+        echo "* Embedding service did not start, exiting."
+        kill ${EMBEDDING_SERVICE_PID} 2>/dev/null
+        exit 1
+    fi
+fi
+
 # Run the FastAPI server using uvicorn
 if [ "${HOT_RELOAD_BACKEND}" = "1" ]; then
     # run in debug mode, with hot reloading
@@ -0,0 +1,108 @@
+"""
+Benchmarks recall@k and latency of HNSW search (DuckDB `vss`) against
+exact search for a range of `ef_search` values.
+
+Example:
+    python benchmarks/ann_recall.py --n-rows 100000 --ef-search 32 --ef-search 64 --ef-search 128
+"""
+
+from __future__ import annotations
+
+import pathlib
+import tempfile
+import time
+
+import duckdb
+from common import (
+    CountingEmbedder,
+    build_synthetic_withdrarxiv_db,
+    hash_embed,
+    latency_summary,
+    report,
+)
+from cyclopts import App
+from manugen_ai.search import (
+    WithdrarxivSearchEngine,
+    create_hnsw_index,
+    load_vss_extension,
+)
+
+app = App()
+
+
+def timed_searches(engine: WithdrarxivSearchEngine, vectors, top_k: int, backend=None):
+    """
+    Run one search per vector and return latency samples in seconds.
+    """
+    samples = []
+    for vector in vectors:
+        start = time.perf_counter()
+        engine.search_vector(vector, top_k=top_k, backend=backend)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@app.default
+def main(
+    n_rows: int = 50_000,
+    dim: int = 1024,
+    n_queries: int = 50,
+    top_k: int = 10,
+    ef_search: list[int] = [16, 32, 64, 128, 256],
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the HNSW recall benchmark on a synthetic corpus.
+
+    Args:
+        n_rows: Number of synthetic papers.
+        dim: Embedding size.
+        n_queries: Number of query vectors.
+        top_k: Number of neighbours compared per query.
+        ef_search: HNSW candidate list sizes to evaluate.
+        output: Optional path to write JSON results to.
+    """
+    vectors = [hash_embed(f"synthetic query {i}", dim) for i in range(n_queries)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = build_synthetic_withdrarxiv_db(
+            str(pathlib.Path(tmp_dir) / "withdrarxiv_embeddings_bench.duckdb"),
+            n_rows=n_rows,
+            dim=dim,
+        )
+        results = {"n_rows": n_rows, "dim": dim, "top_k": top_k}
+
+        conn = duckdb.connect(db_path)
+        if not load_vss_extension(conn):
+            conn.close()
+            results["error"] = "DuckDB vss extension is not available"
+            report("ann_recall", results, output)
+            return
+
+        start = time.perf_counter()
+        create_hnsw_index(conn)
+        results["index_build_s"] = time.perf_counter() - start
+        conn.close()
+
+        embedder = CountingEmbedder(dim)
+        engine = WithdrarxivSearchEngine(db_path, embed_fn=embedder, embedding_size=dim)
+        results["exact"] = latency_summary(
+            timed_searches(engine, vectors, top_k, backend="exact")
+        )
+        engine.close()
+
+        for ef in ef_search:
+            engine = WithdrarxivSearchEngine(
+                db_path, embed_fn=embedder, embedding_size=dim, hnsw_ef_search=ef
+            )
+            results[f"hnsw_ef_search_{ef}"] = {
+                **latency_summary(timed_searches(engine, vectors, top_k)),
+                f"recall_at_{top_k}": engine.recall_at_k(vectors, top_k=top_k),
+            }
+            engine.close()
+
+    report("ann_recall", results, output)
+
+
+if __name__ == "__main__":
+    app()
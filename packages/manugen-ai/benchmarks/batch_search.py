@@ -0,0 +1,102 @@
+"""
+Benchmarks batched multi-query withdrarxiv search (one embedding call and
+one matrix-matrix product or SQL statement) against searching each query
+in turn, for the exact and memory-mapped matrix backends.
+
+Example:
+    python benchmarks/batch_search.py --n-rows 100000 --n-queries 200
+"""
+
+from __future__ import annotations
+
+import pathlib
+import tempfile
+import time
+
+import duckdb
+import numpy as np
+from common import (
+    CountingEmbedder,
+    build_synthetic_withdrarxiv_db,
+    hash_embed,
+    report,
+)
+from cyclopts import App
+from manugen_ai.search import (
+    WithdrarxivSearchEngine,
+    export_embedding_matrix,
+    get_matrix_path,
+)
+
+app = App()
+
+
+@app.default
+def main(
+    n_rows: int = 20_000,
+    dim: int = 1024,
+    n_queries: int = 100,
+    top_k: int = 2,
+    embed_latency_ms: float = 5.0,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the batch search benchmark on a synthetic corpus.
+
+    Args:
+        n_rows: Number of synthetic papers.
+        dim: Embedding size.
+        n_queries: Number of queries searched per approach.
+        top_k: Number of results per query.
+        embed_latency_ms: Simulated latency of each embedding call.
+        output: Optional path to write JSON results to.
+    """
+    queries = [f"synthetic query {i}" for i in range(n_queries)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = build_synthetic_withdrarxiv_db(
+            str(pathlib.Path(tmp_dir) / "withdrarxiv_embeddings_bench.duckdb"),
+            n_rows=n_rows,
+            dim=dim,
+        )
+        conn = duckdb.connect(db_path)
+        export_embedding_matrix(conn, get_matrix_path(db_path), embedding_size=dim)
+        conn.close()
+        results = {"n_rows": n_rows, "dim": dim, "n_queries": n_queries}
+
+        def embed_batch_fn(texts):
+            # one simulated embedding call for the whole batch
+            time.sleep(embed_latency_ms / 1000)
+            return np.stack([hash_embed(text, dim) for text in texts])
+
+        for backend in ("exact", "matrix"):
+            embedder = CountingEmbedder(dim, latency_s=embed_latency_ms / 1000)
+            engine = WithdrarxivSearchEngine(
+                db_path,
+                embed_fn=embedder,
+                embed_batch_fn=embed_batch_fn,
+                embedding_size=dim,
+                backend=backend,
+            )
+
+            start = time.perf_counter()
+            for query in queries:
+                engine.search(query, top_k=top_k)
+            per_query_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            engine.search_batch(queries, top_k=top_k)
+            batch_s = time.perf_counter() - start
+            engine.close()
+
+            results[backend] = {
+                "per_query_total_s": per_query_s,
+                "batch_total_s": batch_s,
+                "speedup": per_query_s / batch_s if batch_s else None,
+            }
+
+    report("batch_search", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,270 @@
+"""
+Shared helpers for manugen-ai benchmarks.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import pathlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ruff: noqa: T201
+
+
+def hash_embed(text: str, dim: int) -> np.ndarray:
+    """
+    Deterministically map a text to a random unit vector.
+
+    Args:
+        text (str): The text to embed.
+        dim (int): Number of components in the vector.
+
+    Returns:
+        np.ndarray: A float32 unit vector of shape (dim,).
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+class CountingEmbedder:
+    """
+    A deterministic stand-in for `manugen_ai.data.embed` which counts
+    how many times it was called and can simulate model latency.
+    """
+
+    def __init__(self, dim: int, latency_s: float = 0.0):
+        self.dim = dim
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def __call__(self, text: str) -> np.ndarray:
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return hash_embed(text, self.dim)
+
+
+def build_synthetic_withdrarxiv_db(
+    db_path: str,
+    n_rows: int,
+    dim: int,
+    seed: int = 0,
+    chunk_size: int = 50_000,
+    n_clusters: int | None = None,
+) -> str:
+    """
+    Build a withdrarxiv-shaped DuckDB database (`papers` and `embeddings`
+    tables) filled with random unit vectors.
+
+    Args:
+        db_path (str): Where to write the database.
+        n_rows (int): Number of papers.
+        dim (int): Embedding size.
+        seed (int): Random seed.
+        chunk_size (int): Rows generated and inserted per chunk.
+        n_clusters (int, optional): Draw vectors around this many random
+            centres, like topics, rather than uniformly.
+
+    Returns:
+        str: The database path.
+    """
+    rng = np.random.default_rng(seed)
+    centres = (
+        rng.standard_normal((n_clusters, dim)).astype(np.float32)
+        if n_clusters
+        else None
+    )
+    conn = duckdb.connect(db_path)
+    conn.execute(
+        """
+        CREATE OR REPLACE TABLE papers (
+          arxiv_id VARCHAR,
+          title VARCHAR,
+          abstract VARCHAR,
+          subjects VARCHAR,
+          scrubbed_comments VARCHAR,
+          category VARCHAR
+        );
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE embeddings (
+          arxiv_id VARCHAR,
+          embedding FLOAT[{dim}]
+        );
+        """
+    )
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        ids = [f"{2000 + i // 100_000}.{i % 100_000:05d}" for i in range(start, stop)]
+        vecs = rng.standard_normal((stop - start, dim)).astype(np.float32)
+        if centres is not None:
+            vecs += centres[rng.integers(n_clusters, size=stop - start)]
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        batch = pa.table(
+            {
+                "arxiv_id": ids,
+                "abstract": [f"synthetic abstract {i}" for i in range(start, stop)],
+                "scrubbed_comments": [f"reason {i}" for i in range(start, stop)],
+                "embedding": pa.FixedSizeListArray.from_arrays(
+                    pa.array(vecs.ravel()), dim
+                ),
+            }
+        )
+        conn.register("batch", batch)
+        conn.execute(
+            """
+            INSERT INTO papers
+            SELECT arxiv_id, arxiv_id, abstract, 'Machine Learning (cs.LG)',
+              scrubbed_comments, 'factual/methodological/other critical errors'
+            FROM batch
+            """
+        )
+        conn.execute("INSERT INTO embeddings SELECT arxiv_id, embedding FROM batch")
+        conn.unregister("batch")
+    conn.close()
+    return db_path
+
+
+def write_synthetic_withdrarxiv_parquet(parquet_path: str, n_rows: int) -> str:
+    """
+    Write a withdrarxiv-shaped Parquet file with synthetic abstracts.
+
+    Args:
+        parquet_path (str): Where to write the Parquet file.
+        n_rows (int): Number of papers.
+
+    Returns:
+        str: The Parquet path.
+    """
+    pq.write_table(
+        pa.table(
+            {
+                "arxiv_id": [
+                    f"{2000 + i // 100_000}.{i % 100_000:05d}" for i in range(n_rows)
+                ],
+                "title": [f"synthetic title {i}" for i in range(n_rows)],
+                "abstract": [
+                    f"synthetic abstract {i} " + "lorem ipsum " * (i % 50)
+                    for i in range(n_rows)
+                ],
+                "subjects": ["Machine Learning (cs.LG)"] * n_rows,
+                "scrubbed_comments": [f"reason {i}" for i in range(n_rows)],
+                "category": ["factual/methodological/other critical errors"] * n_rows,
+            }
+        ),
+        parquet_path,
+    )
+    return parquet_path
+
+
+def stub_embed_batch(texts: List[str], dim: int) -> np.ndarray:
+    """
+    Deterministically embed a batch of texts with `hash_embed`.
+    """
+    return np.stack([hash_embed(text, dim) for text in texts])
+
+
+def latency_summary(samples_s: List[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples (in seconds) as milliseconds.
+    """
+    ms = np.asarray(samples_s) * 1000
+    return {
+        "n": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+async def heartbeat(stop: asyncio.Event, interval_s: float, lags: List[float]):
+    """
+    Record how late the event loop resumes a task sleeping `interval_s`,
+    until `stop` is set.
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval_s)
+        lags.append(time.perf_counter() - start - interval_s)
+
+
+def start_slow_server(
+    latency_s: float, body: bytes, headers: Dict[str, str] | None = None
+) -> ThreadingHTTPServer:
+    """
+    Serve `body` on localhost after `latency_s`, keeping connections alive.
+
+    Args:
+        latency_s (float): Seconds each response is delayed.
+        body (bytes): The response body.
+        headers (Dict[str, str], optional): Extra response headers; a
+            conditional request matching their ETag gets a 304.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call `shutdown()` when done.
+    """
+    headers = headers or {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency_s)
+            not_modified = "ETag" in headers and (
+                self.headers.get("If-None-Match") == headers["ETag"]
+            )
+            self.send_response(304 if not_modified else 200)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if not_modified:
+                self.end_headers()
+                return
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def recall(found: List[List[Dict]], expected: List[List[Dict]]) -> float:
+    """
+    Mean fraction of each query's expected arxiv ids that were found.
+    """
+    return float(
+        np.mean(
+            [
+                len({r["arxiv_id"] for r in f} & {r["arxiv_id"] for r in e}) / len(e)
+                for f, e in zip(found, expected)
+            ]
+        )
+    )
+
+
+def report(name: str, results: Dict, output: pathlib.Path | None = None) -> None:
+    """
+    Print benchmark results and optionally write them as JSON.
+    """
+    print(f"== {name} ==")
+    print(json.dumps(results, indent=2))
+    if output is not None:
+        output.write_text(json.dumps({"benchmark": name, "results": results}, indent=2))
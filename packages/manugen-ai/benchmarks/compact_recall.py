@@ -0,0 +1,160 @@
+"""
+Benchmarks the "compact" search backend (int8 or float16 first-pass
+vectors, optionally truncated, then an exact rerank with the float32
+embeddings) against exact search over the memory-mapped float32 matrix:
+recall@k, latency, and the size of the compact vectors on disk and in
+memory compared with the float32 embeddings.
+
+The rerank reads the float32 embeddings from the full database, which
+workers still download and keep on disk, so `resident_ratio` is the
+saving per worker; `download_mb` (the full and compact databases
+together) is larger than the full database alone.
+
+Example:
+    python benchmarks/compact_recall.py --n-rows 100000 --dim 1024 --compact-dim 256 --candidates 50 --candidates 200
+"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import tempfile
+import time
+
+import duckdb
+import numpy as np
+from common import (
+    CountingEmbedder,
+    build_synthetic_withdrarxiv_db,
+    latency_summary,
+    recall,
+    report,
+)
+from cyclopts import App
+from manugen_ai.search import (
+    WithdrarxivSearchEngine,
+    export_compact_embeddings,
+    export_embedding_matrix,
+    get_compact_db_path,
+    get_matrix_path,
+)
+
+app = App()
+
+
+def timed_batch_search(engine: WithdrarxivSearchEngine, vectors, top_k: int):
+    """
+    Search each vector in turn, returning the results and latency samples.
+    """
+    results, samples = [], []
+    for vector in vectors:
+        start = time.perf_counter()
+        results.append(engine.search_vector(vector, top_k=top_k))
+        samples.append(time.perf_counter() - start)
+    return results, samples
+
+
+@app.default
+def main(
+    n_rows: int = 50_000,
+    dim: int = 1024,
+    n_clusters: int = 200,
+    n_queries: int = 100,
+    top_k: int = 10,
+    dtype: list[str] = ["int8", "float16"],
+    compact_dim: list[int] = [0, 256],
+    candidates: list[int] = [20, 100, 400],
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the compact search benchmark on a clustered synthetic corpus.
+
+    Args:
+        n_rows: Number of synthetic papers.
+        dim: Embedding size.
+        n_clusters: Number of topics the synthetic embeddings cluster around.
+        n_queries: Number of query vectors (perturbed corpus vectors).
+        top_k: Number of neighbours compared per query.
+        dtype: First-pass dtypes to evaluate.
+        compact_dim: Leading components kept (0 keeps all of them).
+        candidates: First-pass candidates reranked per query.
+        output: Optional path to write JSON results to.
+    """
+    rng = np.random.default_rng(1)
+    results = {"n_rows": n_rows, "dim": dim, "top_k": top_k}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = build_synthetic_withdrarxiv_db(
+            str(pathlib.Path(tmp_dir) / "withdrarxiv_embeddings_bench.duckdb"),
+            n_rows=n_rows,
+            dim=dim,
+            n_clusters=n_clusters,
+        )
+        conn = duckdb.connect(db_path)
+        matrix_path = export_embedding_matrix(
+            conn, matrix_path=get_matrix_path(db_path), embedding_size=dim
+        )
+        corpus = np.load(matrix_path, mmap_mode="r")
+        conn.close()
+
+        # queries near corpus vectors, as for abstracts similar to a paper's
+        queries = np.asarray(corpus[rng.integers(n_rows, size=n_queries)])
+        queries = queries + rng.standard_normal(queries.shape).astype(
+            np.float32
+        ) / np.sqrt(dim)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        embedder = CountingEmbedder(dim)
+        engine = WithdrarxivSearchEngine(
+            db_path, embed_fn=embedder, embedding_size=dim, backend="matrix"
+        )
+        expected, samples = timed_batch_search(engine, queries, top_k)
+        engine.close()
+        float32_mb = corpus.nbytes / 2**20
+        results["matrix_float32"] = {
+            **latency_summary(samples),
+            "db_mb": os.path.getsize(db_path) / 2**20,
+            "matrix_mb": os.path.getsize(matrix_path) / 2**20,
+            "resident_mb": float32_mb,
+        }
+
+        for first_pass_dtype in dtype:
+            for kept in compact_dim:
+                compact_db_path = export_compact_embeddings(
+                    db_path,
+                    compact_db_path=get_compact_db_path(db_path),
+                    embedding_size=dim,
+                    dtype=first_pass_dtype,
+                    dim=kept or None,
+                )
+                compact_mb = os.path.getsize(compact_db_path) / 2**20
+                for n_candidates in candidates:
+                    engine = WithdrarxivSearchEngine(
+                        db_path,
+                        embed_fn=embedder,
+                        embedding_size=dim,
+                        backend="compact",
+                        compact_rerank_candidates=n_candidates,
+                    )
+                    found, samples = timed_batch_search(engine, queries, top_k)
+                    results[
+                        f"compact_{first_pass_dtype}_dim_{kept or dim}"
+                        f"_candidates_{n_candidates}"
+                    ] = {
+                        **latency_summary(samples),
+                        f"recall_at_{top_k}": recall(found, expected),
+                        "compact_mb": compact_mb,
+                        # how much smaller than the float32 embeddings
+                        "size_ratio": float32_mb / compact_mb,
+                        # the full database is needed for the rerank
+                        "download_mb": os.path.getsize(db_path) / 2**20 + compact_mb,
+                        "resident_mb": engine._compact.nbytes / 2**20,
+                        "resident_ratio": corpus.nbytes / engine._compact.nbytes,
+                    }
+                    engine.close()
+
+    report("compact_recall", results, output)
+
+
+if __name__ == "__main__":
+    app()
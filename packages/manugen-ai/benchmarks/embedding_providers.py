@@ -0,0 +1,93 @@
+"""
+Benchmarks the throughput of registered embedding providers (see
+`manugen_ai.embedding_providers`): texts per second embedded with
+`encode_batch` in sequential batches, and with `aencode_batch` with
+several batches in flight at once.
+
+The default "hashing" provider runs offline; pass `--providers bge-m3`
+or `--providers gemini` to measure a real model (which must be available).
+
+Example:
+    python benchmarks/embedding_providers.py --providers hashing --providers bge-m3 --n-texts 256
+"""
+
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import time
+
+from common import report
+from cyclopts import App
+from manugen_ai import data
+
+app = App()
+
+
+async def encode_concurrently(provider, batches, concurrency: int, batch_size: int):
+    """
+    Embed batches with `aencode_batch`, keeping up to `concurrency`
+    batches in flight.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def encode(batch):
+        async with semaphore:
+            return await provider.aencode_batch(batch, batch_size=batch_size)
+
+    return await asyncio.gather(*(encode(batch) for batch in batches))
+
+
+@app.default
+def main(
+    providers: list[str] = ["hashing"],
+    n_texts: int = 1024,
+    batch_size: int = 32,
+    concurrency: int = 4,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the embedding provider benchmark.
+
+    Args:
+        providers: Names of the registered providers to benchmark.
+        n_texts: Number of synthetic abstracts.
+        batch_size: Texts per `encode_batch` call.
+        concurrency: Batches in flight with `aencode_batch`.
+        output: Optional path to write JSON results to.
+    """
+    texts = [
+        f"synthetic abstract {i} " + "withdrawn due to an error " * (i % 20)
+        for i in range(n_texts)
+    ]
+    batches = [
+        texts[start : start + batch_size] for start in range(0, n_texts, batch_size)
+    ]
+    results = {"n_texts": n_texts, "batch_size": batch_size}
+
+    for name in providers:
+        provider = data.get_embedding_provider(name)
+        # warm up, e.g. load the model
+        provider.encode_batch(batches[0], batch_size=batch_size)
+
+        start = time.perf_counter()
+        for batch in batches:
+            provider.encode_batch(batch, batch_size=batch_size)
+        sync_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        asyncio.run(encode_concurrently(provider, batches, concurrency, batch_size))
+        async_s = time.perf_counter() - start
+
+        results[name] = {
+            "model_name": provider.model_name,
+            "dimension": provider.dimension,
+            "sync_texts_per_s": n_texts / sync_s,
+            f"async_{concurrency}_in_flight_texts_per_s": n_texts / async_s,
+        }
+
+    report("embedding_providers", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,149 @@
+"""
+Benchmarks query embedding throughput and latency through the embedding
+service, with and without dynamic micro-batching, for concurrent clients
+(standing in for uvicorn workers) each embedding one query at a time.
+
+By default a stub encoder with a fixed per-call overhead plus a per-text
+cost stands in for the model; pass `--no-stub` to serve the configured
+FlagEmbedding model instead.
+
+Example:
+    python benchmarks/embedding_service.py --clients 8 --max-batch-size 1 --max-batch-size 16
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import pathlib
+import tempfile
+import threading
+import time
+
+import numpy as np
+import uvicorn
+from common import hash_embed, latency_summary, report
+from cyclopts import App
+from manugen_ai import data
+from manugen_ai.embedding_service import EmbeddingServiceClient, create_embedding_app
+
+app = App()
+
+
+def make_stub_encoder(dim: int, call_overhead_s: float, per_text_s: float):
+    """
+    Create a stub encoder whose latency grows sub-linearly with batch
+    size, as a model's does: a fixed overhead per call plus a cost per text.
+    """
+
+    def encode(texts):
+        time.sleep(call_overhead_s + per_text_s * len(texts))
+        return np.stack([hash_embed(text, dim) for text in texts])
+
+    return encode
+
+
+def run_clients(url: str, clients: int, queries_per_client: int):
+    """
+    Embed single queries from concurrent clients, returning per-request
+    latencies and the total wall time.
+    """
+
+    def worker(worker_id: int):
+        # one client per worker, as each uvicorn worker process has its own
+        client = EmbeddingServiceClient(url)
+        client.embed(["warm up"])
+        samples = []
+        for i in range(queries_per_client):
+            start = time.perf_counter()
+            client.embed([f"query {worker_id} {i}"])
+            samples.append(time.perf_counter() - start)
+        client.close()
+        return samples
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(clients) as executor:
+        samples = [s for r in executor.map(worker, range(clients)) for s in r]
+    wall_s = time.perf_counter() - start
+    return samples, wall_s
+
+
+@app.default
+def main(
+    clients: int = 8,
+    queries_per_client: int = 25,
+    max_batch_size: list[int] = [1, 8, 32],
+    max_wait_ms: float = 5.0,
+    dim: int = 1024,
+    stub: bool = True,
+    call_overhead_ms: float = 20.0,
+    per_text_ms: float = 2.0,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the embedding service benchmark.
+
+    Args:
+        clients: Number of concurrent clients.
+        queries_per_client: Single-query requests sent by each client.
+        max_batch_size: Micro-batch sizes to compare (1 disables batching).
+        max_wait_ms: Time a micro-batch waits for more requests.
+        dim: Embedding size of the stub encoder.
+        stub: Whether to use the stub encoder instead of the model.
+        call_overhead_ms: Stub encoder latency per call.
+        per_text_ms: Stub encoder latency per text.
+        output: Optional path to write JSON results to.
+    """
+    results = {
+        "clients": clients,
+        "queries_per_client": queries_per_client,
+        "max_wait_ms": max_wait_ms,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for batch_size in max_batch_size:
+            if stub:
+                encode = make_stub_encoder(
+                    dim, call_overhead_ms / 1000, per_text_ms / 1000
+                )
+            else:
+
+                def encode(texts, batch_size=batch_size):
+                    return data.encode_with_flag_embedding_model(
+                        texts, batch_size=batch_size
+                    )
+
+            socket_path = pathlib.Path(tmp_dir) / f"embed_{batch_size}.sock"
+            server = uvicorn.Server(
+                uvicorn.Config(
+                    create_embedding_app(
+                        encode,
+                        model_name="benchmark",
+                        max_batch_size=batch_size,
+                        max_wait_ms=0.0 if batch_size == 1 else max_wait_ms,
+                    ),
+                    uds=str(socket_path),
+                    log_level="warning",
+                )
+            )
+            thread = threading.Thread(target=server.run, daemon=True)
+            thread.start()
+            while not server.started:
+                time.sleep(0.01)
+
+            url = f"unix://{socket_path}"
+            samples, wall_s = run_clients(url, clients, queries_per_client)
+            health = EmbeddingServiceClient(url).health()
+            server.should_exit = True
+            thread.join()
+
+            results[f"max_batch_size_{batch_size}"] = {
+                **latency_summary(samples),
+                "queries_per_s": len(samples) / wall_s,
+                "mean_batch_size": health["mean_batch_size"],
+            }
+
+    report("embedding_service", results, output)
+
+
+if __name__ == "__main__":
+    app()
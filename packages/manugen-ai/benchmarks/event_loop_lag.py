@@ -0,0 +1,156 @@
+"""
+Benchmarks event loop lag while concurrent sessions search withdrarxiv
+embeddings, as agent sessions streaming from one uvicorn worker do: with
+the sync search tool run on the event loop (as ADK runs sync function
+tools), and with the async search tool, encoding queries either in a
+worker thread or in a process pool, and searching in the search thread pool.
+
+A stub stands in for bge-m3: it holds the GIL for `encode-ms` per query,
+like the Python-side work of tokenizing and running the model. A
+heartbeat task measures how late the event loop wakes it up.
+
+Example:
+    python benchmarks/event_loop_lag.py --n-rows 100000 --sessions 8 --encode-ms 50
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+from common import (
+    build_synthetic_withdrarxiv_db,
+    heartbeat,
+    latency_summary,
+    report,
+    stub_embed_batch,
+)
+from cyclopts import App
+from manugen_ai import data
+from manugen_ai.embedding_providers import (
+    FlagEmbeddingProvider,
+    register_embedding_provider,
+)
+
+app = App()
+
+
+def busy_encode(
+    texts: list[str], batch_size: int = 4, dim: int = 256, encode_s: float = 0.05
+) -> np.ndarray:
+    """
+    Embed texts like a CPU-bound model which holds the GIL.
+    """
+    deadline = time.perf_counter() + encode_s * len(texts)
+    while time.perf_counter() < deadline:
+        pass
+    return stub_embed_batch(texts, dim)
+
+
+async def run_sessions(search, sessions: int, searches: int, interval_s: float):
+    """
+    Run concurrent sessions searching in turn while measuring loop lag.
+
+    Returns:
+        dict: Loop lag and search throughput.
+    """
+    lags = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(stop, interval_s, lags))
+
+    async def session(i: int):
+        for j in range(searches):
+            await search(f"synthetic draft abstract {i} {j}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    return {
+        "loop_lag": {**latency_summary(lags), "max_ms": max(lags) * 1000},
+        "searches_per_s": sessions * searches / elapsed,
+    }
+
+
+@app.default
+def main(
+    n_rows: int = 100_000,
+    dim: int = 256,
+    sessions: int = 8,
+    searches: int = 5,
+    encode_ms: float = 50.0,
+    processes: int = 2,
+    heartbeat_ms: float = 5.0,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the event loop lag benchmark on a synthetic corpus.
+
+    Args:
+        n_rows: Number of synthetic papers.
+        dim: Embedding size.
+        sessions: Concurrent sessions.
+        searches: Searches per session.
+        encode_ms: GIL-holding encoder time per query.
+        processes: Processes encoding queries for the async tool.
+        heartbeat_ms: Interval of the loop lag heartbeat.
+        output: Optional path to write JSON results to.
+    """
+    provider = FlagEmbeddingProvider(
+        "stub/busy-bge-m3",
+        encode_fn=functools.partial(busy_encode, dim=dim, encode_s=encode_ms / 1000),
+        dimension=dim,
+    )
+    register_embedding_provider("busy-bge-m3", lambda: provider)
+    data.EMBEDDING_PROVIDER = "busy-bge-m3"
+    data.USE_EMBEDDING_CACHE = False
+
+    results = {
+        "n_rows": n_rows,
+        "dim": dim,
+        "sessions": sessions,
+        "searches": searches,
+        "encode_ms": encode_ms,
+    }
+
+    async def sync_search(query: str):
+        return data.search_withdrarxiv_embeddings(query)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = build_synthetic_withdrarxiv_db(
+            str(pathlib.Path(tmp_dir) / "withdrarxiv_embeddings_bench.duckdb"),
+            n_rows=n_rows,
+            dim=dim,
+        )
+        data.get_withdrarxiv_db_path = lambda: db_path
+        # open the search engine outside of the measurements
+        data.search_withdrarxiv_embeddings("warm up")
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+            # start the encoding processes outside of the measurements
+            list(pool.map(busy_encode, [["warm up"]] * processes))
+
+            for mode, search, executor in (
+                ("sync_tool", sync_search, None),
+                ("async_tool_thread", data.asearch_withdrarxiv_embeddings, None),
+                ("async_tool_process_pool", data.asearch_withdrarxiv_embeddings, pool),
+            ):
+                provider.get_executor = lambda executor=executor: executor
+                results[mode] = asyncio.run(
+                    run_sessions(search, sessions, searches, heartbeat_ms / 1000)
+                )
+
+        data.get_withdrarxiv_search_engine().close()
+
+    report("event_loop_lag", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,92 @@
+"""
+Benchmarks gathering an outline's assets: fetching each URL in turn with
+`fetch_url`, as the former fetch loop did with one tool call (and model
+turn) per URL, against fetching them all in one `fetch_urls` call, as the
+deterministic fetch stage does.
+
+A local server answers every request after `latency-ms`, standing in for
+slow remote sites; `turn-ms` adds the model round trip each tool call of
+the former fetch loop cost. All URLs share the local host, so the HTTP
+client's per-host limit (HTTP_MAX_CONNECTIONS_PER_HOST) applies to them.
+
+Example:
+    python benchmarks/fetch_assets.py --n-urls 20 --latency-ms 200 --turn-ms 1500
+"""
+
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import time
+
+from common import report, start_slow_server
+from cyclopts import App
+from manugen_ai import http_client
+from manugen_ai.tools.tools import fetch_url, fetch_urls
+
+app = App()
+
+
+async def fetch_in_turn(urls: list[str], turn_s: float) -> float:
+    """
+    Fetch URLs one at a time, each after a simulated model turn.
+    """
+    start = time.perf_counter()
+    for url in urls:
+        await asyncio.sleep(turn_s)
+        await fetch_url(url)
+    elapsed = time.perf_counter() - start
+    await http_client.get_http_client().aclose()
+    return elapsed
+
+
+async def fetch_at_once(urls: list[str]) -> float:
+    """
+    Fetch URLs in one `fetch_urls` call.
+    """
+    start = time.perf_counter()
+    await fetch_urls(urls)
+    elapsed = time.perf_counter() - start
+    await http_client.get_http_client().aclose()
+    return elapsed
+
+
+@app.default
+def main(
+    n_urls: int = 20,
+    latency_ms: float = 200.0,
+    turn_ms: float = 1500.0,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the asset fetching benchmark against a local slow server.
+
+    Args:
+        n_urls: Distinct URLs in the outline.
+        latency_ms: Server latency per request.
+        turn_ms: Model round trip per tool call of the former fetch loop.
+        output: Optional path to write JSON results to.
+    """
+    # measure the network, not the response cache
+    http_client.USE_HTTP_CACHE = False
+    httpd = start_slow_server(latency_ms / 1000, b"x" * 2**10)
+    urls = [f"http://127.0.0.1:{httpd.server_port}/{i}" for i in range(n_urls)]
+
+    results = {"n_urls": n_urls, "latency_ms": latency_ms, "turn_ms": turn_ms}
+    results["fetch_url_in_turn_s"] = asyncio.run(fetch_in_turn(urls, 0.0))
+    results["fetch_url_in_turn_with_model_turns_s"] = asyncio.run(
+        fetch_in_turn(urls, turn_ms / 1000)
+    )
+    results["fetch_urls_at_once_s"] = asyncio.run(fetch_at_once(urls))
+    results["speedup"] = (
+        results["fetch_url_in_turn_with_model_turns_s"]
+        / results["fetch_urls_at_once_s"]
+    )
+
+    httpd.shutdown()
+    httpd.server_close()
+    report("fetch_assets", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,139 @@
+"""
+Benchmarks Gemini embedding throughput against the number of concurrent
+requests, using a local fake `batchEmbedContents` server which adds
+latency to each request and answers 429 above a requests-per-second limit.
+
+Example:
+    python benchmarks/gemini_embeddings.py --n-texts 5000 --concurrency 1 --concurrency 8
+"""
+
+from __future__ import annotations
+
+import collections
+import json
+import pathlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import hash_embed, report
+from cyclopts import App
+from google import genai
+from google.genai import types
+from manugen_ai.gemini_embeddings import AsyncGeminiEmbeddingClient
+
+app = App()
+
+
+def start_fake_server(latency_s: float, max_rps: float, dim: int):
+    """
+    Start a fake Gemini embedding server on localhost.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    lock = threading.Lock()
+    recent = collections.deque()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                now = time.monotonic()
+                while recent and now - recent[0] > 1.0:
+                    recent.popleft()
+                limited = len(recent) >= max_rps
+                if not limited:
+                    recent.append(now)
+
+            if limited:
+                status = 429
+                payload = {"error": {"code": 429, "message": "rate limited"}}
+            else:
+                time.sleep(latency_s)
+                status = 200
+                payload = {
+                    "embeddings": [
+                        {
+                            "values": hash_embed(
+                                request["content"]["parts"][0]["text"], dim
+                            ).tolist()
+                        }
+                        for request in body["requests"]
+                    ]
+                }
+
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+@app.default
+def main(
+    n_texts: int = 2_000,
+    concurrency: list[int] = [1, 2, 4, 8],
+    batch_size: int = 100,
+    latency_ms: float = 200.0,
+    max_rps: float = 20.0,
+    dim: int = 768,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the Gemini embedding client benchmark against a fake server.
+
+    Args:
+        n_texts: Number of texts to embed per run.
+        concurrency: Maximum requests in flight to compare.
+        batch_size: Texts per request.
+        latency_ms: Simulated latency of each request.
+        max_rps: Requests per second above which the server answers 429.
+        dim: Embedding size.
+        output: Optional path to write JSON results to.
+    """
+    texts = [f"synthetic abstract {i}" for i in range(n_texts)]
+    httpd = start_fake_server(latency_ms / 1000, max_rps, dim)
+    genai_client = genai.Client(
+        api_key="benchmark",
+        http_options=types.HttpOptions(
+            base_url=f"http://127.0.0.1:{httpd.server_port}"
+        ),
+    )
+    results = {
+        "n_texts": n_texts,
+        "batch_size": batch_size,
+        "latency_ms": latency_ms,
+        "max_rps": max_rps,
+    }
+
+    for max_concurrency in concurrency:
+        client = AsyncGeminiEmbeddingClient(
+            client=genai_client,
+            model="text-embedding-004",
+            max_concurrency=max_concurrency,
+            max_batch_size=batch_size,
+            max_retries=10,
+            initial_backoff_s=0.1,
+        )
+        start = time.perf_counter()
+        client.embed_sync(texts)
+        results[f"concurrency_{max_concurrency}"] = {
+            "wall_s": time.perf_counter() - start,
+            **client.throughput.summary(),
+        }
+
+    httpd.shutdown()
+    report("gemini_embeddings", results, output)
+
+
+if __name__ == "__main__":
+    app()
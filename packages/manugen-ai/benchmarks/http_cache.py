@@ -0,0 +1,97 @@
+"""
+Benchmarks repeat fetches with `fetch_url` through the on-disk HTTP
+response cache (see `manugen_ai.http_cache`): the latency of a first
+(cold) fetch of each URL, and of fetching them again when the responses
+are fresh (served from disk), must be revalidated (a 304 from the server)
+or can't be cached at all.
+
+A local server answers every request after `latency-ms`, standing in for
+a slow remote site.
+
+Example:
+    python benchmarks/http_cache.py --n-urls 50 --latency-ms 100 --body-kib 256
+"""
+
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import tempfile
+import time
+
+from common import latency_summary, report, start_slow_server
+from cyclopts import App
+from manugen_ai import http_client
+from manugen_ai.tools.tools import fetch_url
+
+app = App()
+
+# response headers of each kind of cached response
+CACHE_HEADERS = {
+    "fresh": {"Cache-Control": "max-age=3600"},
+    "revalidated": {"Cache-Control": "no-cache", "ETag": '"v1"'},
+    "uncacheable": {"Cache-Control": "no-store"},
+}
+
+
+async def fetch_each(urls: list[str]) -> list[float]:
+    """
+    Fetch URLs in turn, returning the latency of each fetch.
+    """
+    latencies = []
+    for url in urls:
+        start = time.perf_counter()
+        await fetch_url(url)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def fetch_cold_and_warm(urls: list[str]) -> dict:
+    """
+    Fetch each URL twice, summarizing the latency of each pass.
+    """
+    cold = await fetch_each(urls)
+    warm = await fetch_each(urls)
+    await http_client.get_http_client().aclose()
+    return {"cold": latency_summary(cold), "warm": latency_summary(warm)}
+
+
+@app.default
+def main(
+    n_urls: int = 50,
+    latency_ms: float = 100.0,
+    body_kib: int = 256,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the HTTP cache benchmark against a local slow server.
+
+    Args:
+        n_urls: Distinct URLs fetched.
+        latency_ms: Server latency per request.
+        body_kib: Size of each response.
+        output: Optional path to write JSON results to.
+    """
+    results = {"n_urls": n_urls, "latency_ms": latency_ms, "body_kib": body_kib}
+    http_client.USE_HTTP_CACHE = True
+
+    for mode, headers in CACHE_HEADERS.items():
+        httpd = start_slow_server(
+            latency_ms / 1000, b"x" * body_kib * 2**10, headers=headers
+        )
+        urls = [f"http://127.0.0.1:{httpd.server_port}/{i}" for i in range(n_urls)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # a new client with an empty cache
+            http_client.HTTP_CACHE_DIR = tmp_dir
+            http_client._HTTP_CLIENT = None
+            results[mode] = asyncio.run(fetch_cold_and_warm(urls))
+            results[mode]["cache"] = http_client.get_http_client().cache.summary()
+            http_client.get_http_client().cache.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+    report("http_cache", results, output)
+
+
+if __name__ == "__main__":
+    app()
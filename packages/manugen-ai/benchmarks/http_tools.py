@@ -0,0 +1,112 @@
+"""
+Benchmarks the network tools under concurrent agent sessions sharing one
+event loop, as sessions streaming from one uvicorn worker do: the former
+sync tool (`requests.get`, run on the event loop as ADK runs sync function
+tools) against the async `fetch_url` tool on the shared, pooled HTTP client.
+
+A local server answers every request after `latency-ms`, standing in for
+a slow remote site. A heartbeat task measures how late the event loop
+wakes it up.
+
+Example:
+    python benchmarks/http_tools.py --sessions 16 --fetches 5 --latency-ms 100
+"""
+
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import time
+
+import requests
+from common import heartbeat, latency_summary, report, start_slow_server
+from cyclopts import App
+from manugen_ai.http_client import get_http_client
+from manugen_ai.tools.tools import fetch_url
+
+app = App()
+
+
+async def sync_fetch_url(url: str) -> str:
+    """
+    The former sync tool, run on the event loop.
+    """
+    res = requests.get(url)
+    res.raise_for_status()
+    return res.text
+
+
+async def run_sessions(fetch, url: str, sessions: int, fetches: int, interval_s):
+    """
+    Run concurrent sessions fetching in turn while measuring loop lag.
+
+    Returns:
+        dict: Loop lag, fetch latency and throughput.
+    """
+    lags = []
+    latencies = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(stop, interval_s, lags))
+
+    async def session():
+        for _ in range(fetches):
+            start = time.perf_counter()
+            await fetch(url)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    await get_http_client().aclose()
+
+    return {
+        "loop_lag": {**latency_summary(lags), "max_ms": max(lags) * 1000},
+        "fetch_latency": latency_summary(latencies),
+        "fetches_per_s": sessions * fetches / elapsed,
+    }
+
+
+@app.default
+def main(
+    sessions: int = 16,
+    fetches: int = 5,
+    latency_ms: float = 100.0,
+    body_kib: int = 64,
+    heartbeat_ms: float = 5.0,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the network tool benchmark against a local slow server.
+
+    Args:
+        sessions: Concurrent sessions.
+        fetches: Fetches per session.
+        latency_ms: Server latency per request.
+        body_kib: Size of each response.
+        heartbeat_ms: Interval of the loop lag heartbeat.
+        output: Optional path to write JSON results to.
+    """
+    httpd = start_slow_server(latency_ms / 1000, b"x" * body_kib * 2**10)
+    url = f"http://127.0.0.1:{httpd.server_port}/page"
+    results = {
+        "sessions": sessions,
+        "fetches": fetches,
+        "latency_ms": latency_ms,
+        "body_kib": body_kib,
+        "max_connections_per_host": get_http_client().max_connections_per_host,
+    }
+
+    for mode, fetch in (("sync_tool", sync_fetch_url), ("async_tool", fetch_url)):
+        results[mode] = asyncio.run(
+            run_sessions(fetch, url, sessions, fetches, heartbeat_ms / 1000)
+        )
+
+    httpd.shutdown()
+    httpd.server_close()
+    report("http_tools", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,140 @@
+"""
+Benchmarks withdrarxiv index build throughput against corpus size for the
+previous `NOT IN` batch selection, the streaming checkpointed builder and its
+pipelined mode, using a deterministic stub embedder (with optional simulated
+encoder latency) so only the build itself is measured.
+
+Example:
+    python benchmarks/index_build.py --sizes 5000 --sizes 10000 --sizes 20000
+"""
+
+from __future__ import annotations
+
+import pathlib
+import tempfile
+import time
+
+import duckdb
+import pyarrow as pa
+from common import report, stub_embed_batch, write_synthetic_withdrarxiv_parquet
+from cyclopts import App
+from manugen_ai import data
+
+app = App()
+
+
+def make_stub_embed_batch(dim: int, latency_s: float):
+    """
+    Create a stub `embed_batch` which simulates per-batch encoder latency.
+    """
+
+    def embed_batch(texts, batch_size=4, use_cache=True):
+        if latency_s:
+            time.sleep(latency_s)
+        return stub_embed_batch(texts, dim)
+
+    return embed_batch
+
+
+def not_in_build(
+    db_path: str, parquet_path: str, dim: int, batch_size: int, embed_batch
+):
+    """
+    The previous build loop, which selects each batch with
+    `WHERE arxiv_id NOT IN (SELECT arxiv_id FROM embeddings)`.
+    """
+    conn = duckdb.connect(db_path)
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE papers AS
+        SELECT * FROM read_parquet('{parquet_path}')
+        """
+    )
+    conn.execute(
+        f"CREATE OR REPLACE TABLE embeddings (arxiv_id VARCHAR, embedding FLOAT[{dim}])"
+    )
+    while True:
+        batch_table = conn.execute(
+            f"""
+            SELECT arxiv_id, abstract
+            FROM papers
+            WHERE arxiv_id NOT IN (SELECT arxiv_id FROM embeddings)
+            LIMIT {batch_size}
+            """
+        ).fetch_arrow_table()
+        if batch_table.num_rows == 0:
+            break
+        embs = embed_batch(batch_table["abstract"].to_pylist())
+        batch_with_emb = batch_table.append_column(
+            "embedding", pa.array(embs.tolist(), type=pa.list_(pa.float32()))
+        )
+        conn.register("batch", batch_with_emb)
+        conn.execute("INSERT INTO embeddings SELECT arxiv_id, embedding FROM batch")
+        conn.unregister("batch")
+    conn.close()
+
+
+@app.default
+def main(
+    sizes: list[int] = [2_500, 5_000, 10_000],
+    dim: int = 256,
+    batch_size: int = 100,
+    encode_latency_ms: float = 20.0,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the index build benchmark on synthetic corpora.
+
+    Args:
+        sizes: Corpus sizes to build.
+        dim: Embedding size.
+        batch_size: Abstracts embedded per batch.
+        encode_latency_ms: Simulated encoder latency per batch.
+        output: Optional path to write JSON results to.
+    """
+    data.get_embedding_size = lambda: dim
+    data.embed_batch = make_stub_embed_batch(dim, encode_latency_ms / 1000)
+
+    results = {
+        "dim": dim,
+        "batch_size": batch_size,
+        "encode_latency_ms": encode_latency_ms,
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in sizes:
+            parquet_path = write_synthetic_withdrarxiv_parquet(
+                str(pathlib.Path(tmp_dir) / f"withdrarxiv_{n_rows}.parquet"), n_rows
+            )
+
+            start = time.perf_counter()
+            not_in_build(
+                str(pathlib.Path(tmp_dir) / f"not_in_{n_rows}.duckdb"),
+                parquet_path,
+                dim,
+                batch_size,
+                data.embed_batch,
+            )
+            not_in_s = time.perf_counter() - start
+            results[str(n_rows)] = {
+                "not_in_s": not_in_s,
+                "not_in_rows_per_s": n_rows / not_in_s,
+            }
+
+            for mode in ("streaming", "pipelined"):
+                start = time.perf_counter()
+                data.create_withdrarxiv_embeddings(
+                    target_db=str(pathlib.Path(tmp_dir) / f"{mode}_{n_rows}.duckdb"),
+                    export_matrix=False,
+                    batch_size=batch_size,
+                    parquet_path=parquet_path,
+                    pipelined=mode == "pipelined",
+                )
+                elapsed = time.perf_counter() - start
+                results[str(n_rows)][f"{mode}_s"] = elapsed
+                results[str(n_rows)][f"{mode}_rows_per_s"] = n_rows / elapsed
+
+    report("index_build", results, output)
+
+
+if __name__ == "__main__":
+    app()
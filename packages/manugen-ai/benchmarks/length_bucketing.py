@@ -0,0 +1,111 @@
+"""
+Benchmarks FlagEmbedding encoding throughput (real tokens per second) for
+texts of mixed lengths encoded in batches of their original order against
+length-bucketed batches.
+
+Both `BGEM3FlagModel` (FLAGEMBEDDING_BACKEND="torch") and
+`OnnxBgeM3Encoder` (FLAGEMBEDDING_BACKEND="onnx") sort the texts of one
+`encode` call by length into batches, so "original order" encodes each
+batch with its own call and "length bucketed" encodes every text in one.
+
+Example:
+    FLAGEMBEDDING_BACKEND=onnx python benchmarks/length_bucketing.py \\
+        --n-texts 512 --batch-size 16 --max-length 512
+"""
+
+from __future__ import annotations
+
+import pathlib
+import time
+
+import numpy as np
+from common import report
+from cyclopts import App
+from manugen_ai import data
+from manugen_ai.onnx_embeddings import padded_token_count
+
+app = App()
+
+
+def make_abstracts(n_texts: int, seed: int = 0):
+    """
+    Create abstract-like texts with a long-tailed length distribution.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = np.clip(rng.lognormal(mean=5.2, sigma=0.6, size=n_texts), 20, 2000)
+    return [
+        " ".join(f"word{j % 97}" for j in range(int(length))) + f" {i}"
+        for i, length in enumerate(lengths)
+    ]
+
+
+@app.default
+def main(
+    n_texts: int = 256,
+    batch_size: int = 16,
+    max_length: int | None = 512,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the length bucketing benchmark with the configured FlagEmbedding
+    model and backend.
+
+    Args:
+        n_texts: Number of synthetic abstracts.
+        batch_size: Texts encoded at once.
+        max_length: Maximum tokens per text.
+        output: Optional path to write JSON results to.
+    """
+    model = data.get_flag_embedding_model()
+    texts = make_abstracts(n_texts)
+    lengths = np.array(
+        [
+            len(ids)
+            for ids in model.tokenizer(
+                texts, truncation=bool(max_length), max_length=max_length
+            )["input_ids"]
+        ]
+    )
+    encode_kwargs = {"max_length": max_length} if max_length else {}
+    results = {
+        "backend": data.FLAGEMBEDDING_BACKEND,
+        "n_texts": n_texts,
+        "batch_size": batch_size,
+        "max_length": max_length,
+        "tokens": int(lengths.sum()),
+    }
+
+    # warm up
+    model.encode(texts[:batch_size], batch_size=batch_size, **encode_kwargs)
+
+    start = time.perf_counter()
+    for batch_start in range(0, n_texts, batch_size):
+        model.encode(
+            texts[batch_start : batch_start + batch_size],
+            batch_size=batch_size,
+            **encode_kwargs,
+        )
+    elapsed = time.perf_counter() - start
+    results["original_order"] = {
+        "seconds": elapsed,
+        "tokens_per_s": lengths.sum() / elapsed,
+        "padded_tokens": padded_token_count(lengths, batch_size),
+    }
+
+    start = time.perf_counter()
+    model.encode(texts, batch_size=batch_size, **encode_kwargs)
+    elapsed = time.perf_counter() - start
+    results["length_bucketed"] = {
+        "seconds": elapsed,
+        "tokens_per_s": lengths.sum() / elapsed,
+        "padded_tokens": padded_token_count(np.sort(lengths)[::-1], batch_size),
+    }
+    results["speedup"] = (
+        results["original_order"]["seconds"] / results["length_bucketed"]["seconds"]
+    )
+
+    report("length_bucketing", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,107 @@
+"""
+Benchmarks CPU throughput of BGE-M3 dense embeddings with FlagEmbedding's
+torch model against ONNX Runtime (fp32 and dynamic int8), and the cosine
+similarity of the ONNX vectors to the torch ones.
+
+Requires FlagEmbedding and the optional `onnx` dependencies; the model is
+exported to ONNX under `--onnx-dir` on first run.
+
+Example:
+    python benchmarks/onnx_embeddings.py --n-texts 128 --threads 8
+"""
+
+from __future__ import annotations
+
+import pathlib
+import time
+
+import numpy as np
+from common import report
+from cyclopts import App
+from manugen_ai import data
+
+app = App()
+
+
+def throughput(encode, texts, batch_size: int):
+    """
+    Encode texts once to warm up, then time a second pass.
+    """
+    encode(texts[:batch_size], batch_size=batch_size)
+    start = time.perf_counter()
+    vecs = encode(texts, batch_size=batch_size)["dense_vecs"]
+    elapsed = time.perf_counter() - start
+    return vecs, {"seconds": elapsed, "texts_per_s": len(texts) / elapsed}
+
+
+@app.default
+def main(
+    n_texts: int = 64,
+    batch_size: int = 8,
+    threads: int | None = None,
+    onnx_dir: pathlib.Path = pathlib.Path(data.FLAGEMBEDDING_ONNX_DIR),
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the ONNX Runtime embeddings benchmark.
+
+    Args:
+        n_texts: Number of synthetic abstracts to embed.
+        batch_size: Texts encoded at once.
+        threads: Intra-op threads for torch and ONNX Runtime (default: all cores).
+        onnx_dir: Where the ONNX export is (or will be) stored.
+        output: Optional path to write JSON results to.
+    """
+    results = {"n_texts": n_texts, "batch_size": batch_size, "threads": threads}
+    try:
+        import torch
+        from FlagEmbedding import BGEM3FlagModel
+        from manugen_ai.onnx_embeddings import OnnxBgeM3Encoder, export_bge_m3_onnx
+    except ImportError as e:
+        results["error"] = f"missing dependency: {e}"
+        report("onnx_embeddings", results, output)
+        return
+
+    texts = [
+        f"Synthetic abstract {i}. " + "We study retractions of preprints. " * (i % 20)
+        for i in range(n_texts)
+    ]
+
+    if threads:
+        torch.set_num_threads(threads)
+    torch_model = BGEM3FlagModel(
+        data.FLAGEMBEDDING_MODEL_OR_PATH,
+        cache_dir=data.FLAGEMBEDDING_CACHE_DIR,
+        use_fp16=False,
+        device="cpu",
+    )
+    torch_vecs, results["torch_fp32"] = throughput(
+        torch_model.encode, texts, batch_size
+    )
+    del torch_model
+
+    if not onnx_dir.is_dir():
+        export_bge_m3_onnx(
+            data.FLAGEMBEDDING_MODEL_OR_PATH,
+            str(onnx_dir),
+            cache_dir=data.FLAGEMBEDDING_CACHE_DIR,
+        )
+
+    for name, quantized in (("onnx_fp32", False), ("onnx_int8", True)):
+        encoder = OnnxBgeM3Encoder(
+            str(onnx_dir), quantized=quantized, intra_op_threads=threads
+        )
+        vecs, results[name] = throughput(encoder.encode, texts, batch_size)
+        cosine = np.sum(vecs * torch_vecs, axis=1) / (
+            np.linalg.norm(vecs, axis=1) * np.linalg.norm(torch_vecs, axis=1)
+        )
+        results[name]["min_cosine_to_torch"] = float(cosine.min())
+        results[name]["speedup_vs_torch"] = (
+            results[name]["texts_per_s"] / results["torch_fp32"]["texts_per_s"]
+        )
+
+    report("onnx_embeddings", results, output)
+
+
+if __name__ == "__main__":
+    app()
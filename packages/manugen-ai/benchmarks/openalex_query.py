@@ -0,0 +1,173 @@
+"""
+Benchmarks `openalex_query` against a local stand-in for the OpenAlex
+works API: the former single query for the whole topic string, which
+downloaded full Work records, against concurrent per-topic queries
+projected with `select=`, both on first use and when the topics are
+searched again (served from the HTTP cache).
+
+The server answers every request after `latency-ms` with `per-page`
+synthetic works, each with a full record's worth of fields unless the
+request selects some.
+
+Example:
+    python benchmarks/openalex_query.py --n-topics 5 --latency-ms 300
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import pathlib
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote_plus, urlparse
+
+from common import report
+from cyclopts import App
+from manugen_ai import http_client
+from manugen_ai.tools import tools
+
+app = App()
+
+
+def synthetic_work(topic: str, rank: int) -> dict:
+    """
+    Build a Work record with about the fields (and size) OpenAlex returns.
+    """
+    words = f"{topic} study finds results across samples".split()
+    return {
+        "id": f"https://openalex.org/W{abs(hash((topic, rank))) % 10**9}",
+        "doi": f"https://doi.org/10.1234/{rank}",
+        "title": f"A study of {topic} ({rank})",
+        "abstract_inverted_index": {w: [i] for i, w in enumerate(words)},
+        "authorships": [
+            {"author": {"display_name": f"Author {i}"}, "institutions": [{}] * 2}
+            for i in range(12)
+        ],
+        "referenced_works": [f"https://openalex.org/W{i}" for i in range(60)],
+        "concepts": [{"display_name": f"Concept {i}", "score": 0.5} for i in range(15)],
+        "counts_by_year": [{"year": 2000 + i, "cited_by_count": i} for i in range(20)],
+        "locations": [{"source": {"display_name": "Journal"}}] * 4,
+        "cited_by_count": 1000 - rank,
+    }
+
+
+def start_openalex_server(latency_s: float, counters: dict) -> ThreadingHTTPServer:
+    """
+    Serve synthetic works search results after `latency_s`, counting
+    requests and bytes sent in `counters`.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency_s)
+            query = parse_qs(urlparse(self.path).query)
+            topic = query["filter"][0].split(",is_retracted")[0].split(":", 1)[1]
+            works = [
+                synthetic_work(topic, rank)
+                for rank in range(int(query.get("per-page", ["25"])[0]))
+            ]
+            if "select" in query:
+                fields = query["select"][0].split(",")
+                works = [{field: w[field] for field in fields} for w in works]
+            body = json.dumps({"results": works}).encode("utf-8")
+            counters["requests"] += 1
+            counters["bytes"] += len(body)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+async def single_full_query(topics: str) -> int:
+    """
+    The former query: the whole topic string at once, full records.
+    """
+    response = await http_client.get_http_client().get(
+        f"{tools.OPENALEX_WORKS_URL}"
+        f"?filter=abstract.search:{quote_plus(topics)},is_retracted:false"
+        "&sort=cited_by_count:desc&per-page=3",
+        use_cache=False,
+    )
+    return len(response.json()["results"])
+
+
+async def per_topic_query(topics: str) -> int:
+    """
+    The current query: each topic at once, selected fields, deduplicated.
+    """
+    results = await tools.openalex_query(topics)
+    return sum(len(works) for works in results.values())
+
+
+@app.default
+def main(
+    n_topics: int = 5,
+    latency_ms: float = 300.0,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the OpenAlex query benchmark against a local stand-in server.
+
+    Args:
+        n_topics: Topics searched at once.
+        latency_ms: Server latency per request.
+        output: Optional path to write JSON results to.
+    """
+    counters = {"requests": 0, "bytes": 0}
+    httpd = start_openalex_server(latency_ms / 1000, counters)
+    tools.OPENALEX_WORKS_URL = f"http://127.0.0.1:{httpd.server_port}/works"
+    topics = ", ".join(f"topic {i}" for i in range(n_topics))
+    results = {"n_topics": n_topics, "latency_ms": latency_ms}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # a new client with an empty cache
+        http_client.USE_HTTP_CACHE = True
+        http_client.HTTP_CACHE_DIR = tmp_dir
+        http_client._HTTP_CLIENT = None
+
+        for mode, query in (
+            ("single_query_full_records", single_full_query),
+            ("per_topic_select_cold", per_topic_query),
+            ("per_topic_select_cached", per_topic_query),
+        ):
+            counters.update(requests=0, bytes=0)
+
+            async def run():
+                try:
+                    start = time.perf_counter()
+                    works = await query(topics)
+                    return works, time.perf_counter() - start
+                finally:
+                    await http_client.get_http_client().aclose()
+
+            works, elapsed = asyncio.run(run())
+            results[mode] = {
+                "wall_s": elapsed,
+                "works": works,
+                "requests": counters["requests"],
+                "bytes_downloaded": counters["bytes"],
+                "bytes_per_work": counters["bytes"] / works if works else 0.0,
+            }
+        http_client.get_http_client().cache.close()
+
+    httpd.shutdown()
+    httpd.server_close()
+    report("openalex_query", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,122 @@
+"""
+Benchmarks recall@k and latency of partitioned (IVF-style) search, which
+scans only the `nprobe` partitions nearest each query, against exact
+search over every embedding.
+
+Example:
+    python benchmarks/partitioned_search.py --n-rows 100000 --nprobe 4 --nprobe 16
+"""
+
+from __future__ import annotations
+
+import pathlib
+import tempfile
+import time
+
+import duckdb
+import numpy as np
+from common import (
+    CountingEmbedder,
+    build_synthetic_withdrarxiv_db,
+    latency_summary,
+    report,
+)
+from cyclopts import App
+from manugen_ai.search import WithdrarxivSearchEngine, create_embedding_partitions
+
+app = App()
+
+
+def timed_searches(engine: WithdrarxivSearchEngine, vectors, top_k: int, backend=None):
+    """
+    Run one search per vector and return latency samples in seconds.
+    """
+    samples = []
+    for vector in vectors:
+        start = time.perf_counter()
+        engine.search_vector(vector, top_k=top_k, backend=backend)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@app.default
+def main(
+    n_rows: int = 50_000,
+    dim: int = 1024,
+    n_clusters: int = 200,
+    n_partitions: int | None = None,
+    n_queries: int = 50,
+    top_k: int = 10,
+    nprobe: list[int] = [1, 4, 8, 16, 32],
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the partitioned search benchmark on a clustered synthetic corpus.
+
+    Args:
+        n_rows: Number of synthetic papers.
+        dim: Embedding size.
+        n_clusters: Number of topics the synthetic embeddings cluster around.
+        n_partitions: Number of k-means partitions (default: sqrt(n_rows)).
+        n_queries: Number of query vectors.
+        top_k: Number of neighbours compared per query.
+        nprobe: Partitions searched per query to evaluate.
+        output: Optional path to write JSON results to.
+    """
+    rng = np.random.default_rng(1)
+    results = {"n_rows": n_rows, "dim": dim, "top_k": top_k}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = build_synthetic_withdrarxiv_db(
+            str(pathlib.Path(tmp_dir) / "withdrarxiv_embeddings_bench.duckdb"),
+            n_rows=n_rows,
+            dim=dim,
+            n_clusters=n_clusters,
+        )
+
+        conn = duckdb.connect(db_path)
+        start = time.perf_counter()
+        results["n_partitions"] = create_embedding_partitions(
+            conn, embedding_size=dim, method="kmeans", n_partitions=n_partitions
+        )
+        results["partition_build_s"] = time.perf_counter() - start
+        # queries near corpus vectors, as for abstracts similar to a paper's
+        vectors = (
+            conn.execute(
+                f"SELECT embedding FROM embeddings USING SAMPLE {int(n_queries)} ROWS"
+            )
+            .fetch_arrow_table()
+            .column(0)
+            .combine_chunks()
+            .flatten()
+            .to_numpy()
+            .reshape(-1, dim)
+        )
+        conn.close()
+        vectors = vectors + rng.standard_normal(vectors.shape).astype(
+            np.float32
+        ) / np.sqrt(dim)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        embedder = CountingEmbedder(dim)
+        engine = WithdrarxivSearchEngine(
+            db_path, embed_fn=embedder, embedding_size=dim, backend="exact"
+        )
+        results["exact"] = latency_summary(timed_searches(engine, vectors, top_k))
+        engine.close()
+
+        for n in nprobe:
+            engine = WithdrarxivSearchEngine(
+                db_path, embed_fn=embedder, embedding_size=dim, nprobe=n
+            )
+            results[f"partitioned_nprobe_{n}"] = {
+                **latency_summary(timed_searches(engine, vectors, top_k)),
+                f"recall_at_{top_k}": engine.recall_at_k(vectors, top_k=top_k),
+            }
+            engine.close()
+
+    report("partitioned_search", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,251 @@
+"""
+Benchmarks the whole withdrarxiv retrieval stack on synthetic corpora of
+increasing size: build throughput of `create_withdrarxiv_embeddings`, the
+build time and size of each search backend's index, cold and warm query
+latency, and recall@k against exact search, for every search backend.
+
+Abstracts are embedded with a deterministic stub embedder (random unit
+vectors seeded by each text) and query vectors are random unit vectors,
+so the benchmark runs offline and repeated runs search the same corpus.
+Uniformly random vectors have no topics to cluster around, which makes
+them the hardest case for the approximate backends ("partitioned" and
+"hnsw"); their recall here is a lower bound for real abstracts.
+Write results with `--output` to compare them between releases.
+
+"Cold" latency is the time to open a search engine and answer its first
+query (loading matrices, partitions or the HNSW extension), with the
+database file likely still in the OS page cache from building it; "warm"
+latency is measured over the remaining queries.
+
+Example:
+    python benchmarks/retrieval_suite.py --sizes 10000 --sizes 100000 --output retrieval_suite.json
+"""
+
+from __future__ import annotations
+
+import datetime
+import importlib.metadata
+import os
+import pathlib
+import platform
+import tempfile
+import time
+
+import duckdb
+import numpy as np
+from common import (
+    CountingEmbedder,
+    hash_embed,
+    latency_summary,
+    recall,
+    report,
+    stub_embed_batch,
+    write_synthetic_withdrarxiv_parquet,
+)
+from cyclopts import App
+from manugen_ai import data
+from manugen_ai.search import (
+    WithdrarxivSearchEngine,
+    create_embedding_partitions,
+    create_hnsw_index,
+    export_compact_embeddings,
+    export_embedding_matrix,
+    get_compact_db_path,
+    get_matrix_path,
+    load_vss_extension,
+)
+
+app = App()
+
+
+def file_mb(path: str) -> float:
+    """
+    Size of a file in MiB.
+    """
+    return os.path.getsize(path) / 2**20
+
+
+def environment() -> dict:
+    """
+    Describe the versions and machine the benchmark ran with.
+    """
+    try:
+        version = importlib.metadata.version("manugen-ai")
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+    return {
+        "manugen_ai": version,
+        "duckdb": duckdb.__version__,
+        "numpy": np.__version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def build_index(db_path: str, backend: str, dim: int) -> str | None:
+    """
+    Build what a search backend needs in (or next to) the database.
+
+    Returns:
+        str: The database to search, or None if the backend can't be built.
+    """
+    if backend == "compact":
+        export_compact_embeddings(
+            db_path, compact_db_path=get_compact_db_path(db_path), embedding_size=dim
+        )
+        return db_path
+
+    conn = duckdb.connect(db_path)
+    try:
+        if backend == "matrix":
+            export_embedding_matrix(conn, get_matrix_path(db_path), embedding_size=dim)
+        elif backend == "hnsw":
+            if not load_vss_extension(conn):
+                return None
+            create_hnsw_index(conn)
+        elif backend == "partitioned":
+            create_embedding_partitions(conn, embedding_size=dim, method="kmeans")
+        conn.execute("CHECKPOINT")
+    finally:
+        conn.close()
+    return db_path
+
+
+def benchmark_backend(search_db_path: str, backend: str, dim: int, queries, top_k):
+    """
+    Open a search engine for a backend and time its queries.
+
+    Returns:
+        tuple: The results of each query and the latency measurements.
+    """
+    start = time.perf_counter()
+    engine = WithdrarxivSearchEngine(
+        search_db_path,
+        embed_fn=CountingEmbedder(dim),
+        embedding_size=dim,
+        backend=backend,
+    )
+    found = [engine.search_vector(queries[0], top_k=top_k)]
+    cold_s = time.perf_counter() - start
+
+    samples = []
+    for vector in queries[1:]:
+        start = time.perf_counter()
+        found.append(engine.search_vector(vector, top_k=top_k))
+        samples.append(time.perf_counter() - start)
+    resolved = engine.backend
+    engine.close()
+
+    return found, {
+        "resolved_backend": resolved,
+        "cold_ms": cold_s * 1000,
+        "warm": latency_summary(samples),
+    }
+
+
+@app.default
+def main(
+    sizes: list[int] = [10_000, 100_000, 1_000_000],
+    dim: int = 256,
+    n_queries: int = 100,
+    top_k: int = 10,
+    batch_size: int = 1000,
+    backends: list[str] = ["exact", "matrix", "compact", "partitioned", "hnsw"],
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the retrieval benchmark suite on synthetic corpora.
+
+    Args:
+        sizes: Corpus sizes to build and search.
+        dim: Embedding size (bge-m3's is 1024; smaller sizes keep the
+            1M-row corpus at a few GiB).
+        n_queries: Number of query vectors per backend.
+        top_k: Number of results per query, and the k of recall@k.
+        batch_size: Abstracts embedded and committed per build batch.
+        backends: Search backends to benchmark; exact search is always
+            run, as the reference for recall.
+        output: Optional path to write JSON results to.
+    """
+    data.get_embedding_size = lambda: dim
+    data.embed_batch = lambda texts, batch_size=4, use_cache=True: stub_embed_batch(
+        texts, dim
+    )
+
+    queries = np.stack(
+        [hash_embed(f"synthetic query {i}", dim) for i in range(n_queries)]
+    )
+    results = {
+        "environment": environment(),
+        "dim": dim,
+        "n_queries": n_queries,
+        "top_k": top_k,
+        "batch_size": batch_size,
+    }
+
+    for n_rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            parquet_path = write_synthetic_withdrarxiv_parquet(
+                str(pathlib.Path(tmp_dir) / "withdrarxiv.parquet"), n_rows
+            )
+            db_path = str(pathlib.Path(tmp_dir) / "withdrarxiv_embeddings.duckdb")
+
+            start = time.perf_counter()
+            data.create_withdrarxiv_embeddings(
+                target_db=db_path,
+                export_matrix=False,
+                batch_size=batch_size,
+                parquet_path=parquet_path,
+            )
+            build_s = time.perf_counter() - start
+            size_results = {
+                "build": {
+                    "seconds": build_s,
+                    "rows_per_s": n_rows / build_s,
+                    "db_mb": file_mb(db_path),
+                }
+            }
+
+            expected, size_results["exact"] = benchmark_backend(
+                db_path, "exact", dim, queries, top_k
+            )
+            size_results["exact"]["index_mb"] = 0.0
+
+            for backend in backends:
+                if backend == "exact":
+                    continue
+                db_mb = file_mb(db_path)
+                start = time.perf_counter()
+                search_db_path = build_index(db_path, backend, dim)
+                index_build_s = time.perf_counter() - start
+                if search_db_path is None:
+                    size_results[backend] = {"error": f"{backend} is not available"}
+                    continue
+
+                if backend == "compact":
+                    index_mb = file_mb(get_compact_db_path(db_path))
+                elif backend == "matrix":
+                    index_mb = file_mb(get_matrix_path(db_path))
+                else:
+                    index_mb = file_mb(db_path) - db_mb
+
+                found, size_results[backend] = benchmark_backend(
+                    search_db_path, backend, dim, queries, top_k
+                )
+                size_results[backend].update(
+                    {
+                        "index_build_s": index_build_s,
+                        "index_mb": index_mb,
+                        f"recall_at_{top_k}": recall(found, expected),
+                    }
+                )
+
+            results[str(n_rows)] = size_results
+
+    report("retrieval_suite", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,128 @@
+"""
+Benchmarks withdrarxiv search latency and embedding calls per search for the
+persistent search engine (exact DuckDB scan and memory-mapped matrix
+backends) against the previous per-call connection and `embed` UDF approach.
+
+Example:
+    python benchmarks/search_engine.py --n-rows 100000 --n-queries 50
+"""
+
+from __future__ import annotations
+
+import pathlib
+import tempfile
+import time
+
+import duckdb
+from common import (
+    CountingEmbedder,
+    build_synthetic_withdrarxiv_db,
+    latency_summary,
+    report,
+)
+from cyclopts import App
+from manugen_ai.search import (
+    WithdrarxivSearchEngine,
+    export_embedding_matrix,
+    get_matrix_path,
+)
+
+app = App()
+
+
+def udf_search(db_path: str, embed_fn: CountingEmbedder, query: str, top_k: int):
+    """
+    The previous search path: connect, register the `embed` UDF and
+    compute the query embedding from within SQL on every call.
+    """
+    conn = duckdb.connect(db_path)
+    conn.create_function(
+        "embed", embed_fn, [duckdb.typing.VARCHAR], f"FLOAT[{embed_fn.dim}]"
+    )
+    rows = conn.execute(
+        """
+        WITH topk AS (
+          SELECT
+            arxiv_id,
+            array_inner_product(embedding, embed($q)) AS similarity
+          FROM embeddings
+          ORDER BY similarity DESC
+          LIMIT $k
+        )
+        SELECT p.scrubbed_comments AS related_retraction_reasons
+        FROM topk
+        JOIN papers p USING(arxiv_id)
+        ORDER BY similarity DESC;
+        """,
+        {"q": query, "k": top_k},
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+@app.default
+def main(
+    n_rows: int = 20_000,
+    dim: int = 1024,
+    n_queries: int = 20,
+    top_k: int = 2,
+    embed_latency_ms: float = 5.0,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the search engine benchmark on a synthetic corpus.
+
+    Args:
+        n_rows: Number of synthetic papers.
+        dim: Embedding size.
+        n_queries: Number of searches per approach.
+        top_k: Number of results per search.
+        embed_latency_ms: Simulated latency of each embedding call.
+        output: Optional path to write JSON results to.
+    """
+    queries = [f"synthetic query {i}" for i in range(n_queries)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = build_synthetic_withdrarxiv_db(
+            str(pathlib.Path(tmp_dir) / "withdrarxiv_embeddings_bench.duckdb"),
+            n_rows=n_rows,
+            dim=dim,
+        )
+        results = {"n_rows": n_rows, "dim": dim, "top_k": top_k}
+
+        embedder = CountingEmbedder(dim, latency_s=embed_latency_ms / 1000)
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            udf_search(db_path, embedder, query, top_k)
+            samples.append(time.perf_counter() - start)
+        results["udf_per_call_connection"] = {
+            **latency_summary(samples),
+            "embed_calls_per_search": embedder.calls / n_queries,
+        }
+
+        conn = duckdb.connect(db_path)
+        export_embedding_matrix(conn, get_matrix_path(db_path), embedding_size=dim)
+        conn.close()
+
+        for backend in ("exact", "matrix"):
+            embedder = CountingEmbedder(dim, latency_s=embed_latency_ms / 1000)
+            engine = WithdrarxivSearchEngine(
+                db_path, embed_fn=embedder, embedding_size=dim, backend=backend
+            )
+            samples = []
+            for query in queries:
+                start = time.perf_counter()
+                engine.search(query, top_k=top_k)
+                samples.append(time.perf_counter() - start)
+            engine.close()
+            results[f"search_engine_{backend}"] = {
+                **latency_summary(samples),
+                "embed_calls_per_search": embedder.calls / n_queries,
+            }
+
+    report("search_engine", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,98 @@
+"""
+Benchmarks the speedup of the sharded multi-process withdrarxiv embeddings
+build against the number of worker processes.
+
+By default a CPU-bound stub encoder stands in for the embedding model (the
+worker processes are forked so they inherit it); pass `--no-stub` to encode
+with the configured embedding model instead.
+
+Example:
+    python benchmarks/sharded_build.py --n-rows 4000 --workers 1 --workers 2 --workers 4
+"""
+
+from __future__ import annotations
+
+import hashlib
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+from common import hash_embed, report, write_synthetic_withdrarxiv_parquet
+from cyclopts import App
+from manugen_ai import data
+
+app = App()
+
+
+def make_cpu_bound_embed_batch(dim: int, cost: int):
+    """
+    Create a stub `embed_batch` which spends `cost` hash rounds of
+    pure-Python CPU time per text, holding the GIL like a busy model would.
+    """
+
+    def embed_batch(texts, batch_size=4, use_cache=True):
+        for text in texts:
+            digest = text.encode("utf-8")
+            for _ in range(cost):
+                digest = hashlib.sha256(digest).digest()
+        return np.stack([hash_embed(text, dim) for text in texts])
+
+    return embed_batch
+
+
+@app.default
+def main(
+    n_rows: int = 2_000,
+    workers: list[int] = [1, 2, 4],
+    shard_size: int = 250,
+    dim: int = 256,
+    stub: bool = True,
+    stub_cost: int = 20_000,
+    output: pathlib.Path | None = None,
+):
+    """
+    Run the sharded build benchmark on a synthetic corpus.
+
+    Args:
+        n_rows: Number of synthetic papers.
+        workers: Worker process counts to compare.
+        shard_size: Papers per shard.
+        dim: Embedding size (stub encoder only).
+        stub: Whether to use the CPU-bound stub encoder.
+        stub_cost: Hash rounds per text for the stub encoder.
+        output: Optional path to write JSON results to.
+    """
+    if stub:
+        data.get_embedding_size = lambda: dim
+        data.embed_batch = make_cpu_bound_embed_batch(dim, stub_cost)
+        data._SHARD_MP_CONTEXT = "fork"
+
+    results = {"n_rows": n_rows, "shard_size": shard_size, "stub": stub}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parquet_path = write_synthetic_withdrarxiv_parquet(
+            str(pathlib.Path(tmp_dir) / "withdrarxiv.parquet"), n_rows
+        )
+        baseline_s = None
+        for n_workers in workers:
+            start = time.perf_counter()
+            data.create_withdrarxiv_embeddings(
+                target_db=str(pathlib.Path(tmp_dir) / f"workers_{n_workers}.duckdb"),
+                export_matrix=False,
+                parquet_path=parquet_path,
+                workers=n_workers,
+                shard_size=shard_size,
+            )
+            elapsed = time.perf_counter() - start
+            baseline_s = baseline_s or elapsed
+            results[f"workers_{n_workers}"] = {
+                "build_s": elapsed,
+                "rows_per_s": n_rows / elapsed,
+                "speedup": baseline_s / elapsed,
+            }
+
+    report("sharded_build", results, output)
+
+
+if __name__ == "__main__":
+    app()
@@ -2,7 +2,7 @@ import os
 
 from google.adk.agents import LlmAgent
 from manugen_ai.schema import METHODS_KEY, prepare_instructions
-from manugen_ai.tools.tools import fetch_url
+from manugen_ai.tools.tools import fetch_url, fetch_urls
 from manugen_ai.utils import get_llm
 
 from . import prompt
@@ -18,5 +18,5 @@ methods_agent = LlmAgent(
     instruction=prompt.PROMPT,
     before_agent_callback=prepare_instructions,
     output_key="methods",
-    tools=[fetch_url],
+    tools=[fetch_url, fetch_urls],
 )
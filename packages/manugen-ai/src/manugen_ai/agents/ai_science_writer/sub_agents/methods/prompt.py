@@ -19,7 +19,7 @@ provided and compare them with the current draft of the section; determine if yo
 drafting the section from scratch or editing an existing one.
 Keep in mind that if the instructions contain an URL to a text file (including also source code in a
 programming language) you can use the 'fetch_url' tool to retrieve the content and
-analyze it.
+analyze it; to retrieve several URLs, call the 'fetch_urls' tool once with all of them.
 2. If drafting from scratch, make sure you follow the guidelines below to properly structure
 this section.
 3. If editing an existing section, the "instructions" from the user below will contain 1) the current
@@ -15,7 +15,7 @@ import os
 from google.adk.agents import Agent, LoopAgent, SequentialAgent
 from google.adk.tools import FunctionTool
 from manugen_ai.agents.meta_agent import ResilientToolAgent
-from manugen_ai.data import search_withdrarxiv_embeddings
+from manugen_ai.data import asearch_withdrarxiv_embeddings
 from manugen_ai.tools.tools import openalex_query, parse_list
 from manugen_ai.utils import get_llm
 
@@ -27,8 +27,9 @@ parse_list_tool = FunctionTool(func=parse_list)
 openalex_tool = FunctionTool(func=openalex_query)
 
 # RAG-specific embedding & retraction tool
+# (async, so embedding and searching don't block other sessions' streams)
 embeddings_function = FunctionTool(
-    func=search_withdrarxiv_embeddings,
+    func=asearch_withdrarxiv_embeddings,
 )
 
 # Synthesize a concise abstract for embedding queries
@@ -49,10 +50,10 @@ agent_fetch_retractions = ResilientToolAgent(
         model=LLM,
         name="fetch_retractions",
         description=(
-            "Use `search_withdrarxiv_embeddings` on the synthesized abstract to get related retraction notices."
+            "Use `asearch_withdrarxiv_embeddings` on the synthesized abstract to get related retraction notices."
         ),
         instruction="""
-Call `search_withdrarxiv_embeddings` with `{synthesized_abstract}`.
+Call `asearch_withdrarxiv_embeddings` with `{synthesized_abstract}`.
 Return the mapping as `retraction_notices` (e.g., arXiv ID → retraction reason/details).
 """,
         tools=[embeddings_function],
@@ -9,15 +9,16 @@ from __future__ import annotations
 import json
 import os
 
-from google.adk.agents import Agent, LoopAgent, ParallelAgent, SequentialAgent
+from google.adk.agents import Agent, LoopAgent, SequentialAgent
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.tools import FunctionTool
 from manugen_ai.agents.meta_agent import (
+    FetchAssetsAgent,
     ResilientToolAgent,
     SectionWriterAgent,
     StopChecker,
 )
-from manugen_ai.tools.tools import exit_loop, fetch_url, json_conforms_to_schema
+from manugen_ai.tools.tools import json_conforms_to_schema
 from manugen_ai.utils import prepare_ollama_models_for_adk_state
 
 # Preconfigure Ollama models for ADK
@@ -132,39 +133,12 @@ parse_validate_repair_json = SequentialAgent(
     name="parse_validate_repair_json", sub_agents=[agent_parse, validate_repair_json]
 )
 
-agent_fetch = Agent(
-    model=DRAFT_LLM,
-    name="fetch_assets",
-    description="Fetch code and figure content from URLs.",
-    instruction="""
-You will receive a list of URLs in {parse_result[urls]}.
-Your job is to:
-
-1. Fetch each URL using tool fetch_url.
-2. Store a mapping of url → content in the state.
-3. Return a dictionary called 'assets' with this mapping.
-
-Only once all URLs are successfully fetched
-and the 'assets' dictionary is complete,
-then call the tool exit_loop to exit the loop.
-Do not call exit_loop unless all content is fetched
-successfully and returned as 'assets'.
-Do NOT attempt to use a tool called "fetch_assets".
-""",
-    tools=[FunctionTool(func=fetch_url), FunctionTool(func=exit_loop)],
-    output_key="assets",
-)
-
-
-loop_fetch = LoopAgent(
-    name="loop_fetch",
-    sub_agents=[ResilientToolAgent(agent_fetch, max_retries=3)],
-    max_iterations=5,
-)
+# fetch all URLs of the parsed outline at once, without a model turn per URL
+agent_fetch = FetchAssetsAgent(context_variable="improved_json", output_key="assets")
 
-parallel_setup = ParallelAgent(
+setup = SequentialAgent(
     name="setup",
-    sub_agents=[parse_validate_repair_json, loop_fetch],
+    sub_agents=[parse_validate_repair_json, agent_fetch],
 )
 
 # Draft individual sections
@@ -207,7 +181,7 @@ root_agent = SequentialAgent(
     name="paper_pipeline",
     description="Parse outline, fetch assets, draft sections, combine, review & refine.",
     sub_agents=[
-        parallel_setup,
+        setup,
         section_writer,
         agent_combine,
     ],
@@ -14,6 +14,8 @@ from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
 from pydantic import PrivateAttr
 
+from manugen_ai.tools.tools import fetch_urls
+
 
 class ResilientToolAgent(LlmAgent):
     """
@@ -150,3 +152,34 @@ class StopChecker(BaseAgent):
                 author=self.name,
                 actions=EventActions(escalate=True),
             )
+
+
+class FetchAssetsAgent(BaseAgent):
+    """
+    Fetches every URL of a parsed outline at once with `fetch_urls`,
+    without a model turn per URL, and stores the url → content mapping
+    in the session state.
+
+    URLs are read from the "urls" list of the JSON in the configured
+    context variable; invalid JSON yields no assets.
+    """
+
+    # these become configurable when you instantiate
+    context_variable: str = "improved_json"
+    output_key: str = "assets"
+
+    name: str = "fetch_assets"
+    description: str = "Fetch code and figure content from the outline's URLs."
+
+    async def _run_async_impl(self, ctx: InvocationContext):
+        try:
+            parsed = json.loads(ctx.session.state.get(self.context_variable, "{}"))
+            urls = [url for url in parsed.get("urls", []) if isinstance(url, str)]
+        except (json.JSONDecodeError, AttributeError, TypeError):
+            urls = []
+
+        assets = await fetch_urls(urls) if urls else {}
+        yield Event(
+            author=self.name,
+            actions=EventActions(state_delta={self.output_key: assets}),
+        )
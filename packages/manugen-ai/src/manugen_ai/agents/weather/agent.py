@@ -1,12 +1,14 @@
 import datetime
 from zoneinfo import ZoneInfo
 
-import requests
+import httpx
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 
+from manugen_ai.http_client import get_http_client
 
-def get_weather(city: str) -> dict:
+
+async def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city.
 
     Args:
@@ -22,7 +24,7 @@ def get_weather(city: str) -> dict:
         # Geocode the city using OpenStreetMap Nominatim API
         geocode_url = "https://nominatim.openstreetmap.org/search"
         geocode_params = {"q": city, "format": "json", "limit": 1}
-        geocode_response = requests.get(
+        geocode_response = await get_http_client().get(
             geocode_url, params=geocode_params, headers=common_headers
         )
         geocode_response.raise_for_status()
@@ -43,7 +45,7 @@ def get_weather(city: str) -> dict:
             "timezone": "auto",
             "temperature_unit": "fahrenheit",
         }
-        weather_response = requests.get(
+        weather_response = await get_http_client().get(
             weather_url, params=weather_params, headers=common_headers
         )
         weather_response.raise_for_status()
@@ -59,7 +61,7 @@ def get_weather(city: str) -> dict:
 
         return {"status": "success", "report": report}
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         return {"status": "error", "error_message": f"API request failed: {str(e)}"}
     except (KeyError, IndexError, ValueError) as e:
         return {
@@ -41,5 +41,122 @@ def manugen(content_dir: Path, output_dir: Path = None):
     print()
 
 
+@app.command
+def embedding_server(
+    url: str = None,
+    max_batch_size: int = None,
+    max_wait_ms: float = None,
+):
+    """
+    Run the embedding service, which loads the FlagEmbedding model once
+    and gathers concurrent embedding requests into micro-batches.
+
+    Processes with EMBEDDING_SERVICE_URL set request their embeddings from it.
+
+    Args:
+        url (str, optional): Where to listen, e.g. "http://127.0.0.1:8765" or
+            "unix:///tmp/manugen-embeddings.sock". Defaults to EMBEDDING_SERVICE_URL.
+        max_batch_size (int, optional): Texts encoded at most per micro-batch.
+            Defaults to EMBEDDING_SERVICE_MAX_BATCH_SIZE.
+        max_wait_ms (float, optional): Time a micro-batch waits for more requests.
+            Defaults to EMBEDDING_SERVICE_MAX_WAIT_MS.
+    """
+    from manugen_ai import data
+    from manugen_ai.embedding_service import (
+        create_embedding_app,
+        serve_embedding_app,
+    )
+
+    url = url or data.EMBEDDING_SERVICE_URL or "http://127.0.0.1:8765"
+    max_batch_size = max_batch_size or data.EMBEDDING_SERVICE_MAX_BATCH_SIZE
+    max_wait_ms = (
+        data.EMBEDDING_SERVICE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+    )
+
+    print(f"* Loading {data.FLAGEMBEDDING_MODEL_OR_PATH}...")
+    data.get_flag_embedding_model()
+    print(f"* Serving embeddings at {url}")
+
+    serve_embedding_app(
+        create_embedding_app(
+            lambda texts: data.encode_with_flag_embedding_model(
+                texts, batch_size=max_batch_size
+            ),
+            model_name=data.FLAGEMBEDDING_MODEL_OR_PATH,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+        ),
+        url,
+    )
+
+
+@app.command
+def publish_embeddings(db_path: Path, version: str, manifest_path: Path = None):
+    """
+    Publish a withdrarxiv embeddings database by writing its manifest;
+    running workers validate it and switch to it on their next search.
+
+    Args:
+        db_path (Path): The database to publish, in the manifest's directory
+            and under a file name not used by a previous version.
+        version (str): The database's version, e.g. "2025-06-01".
+        manifest_path (Path, optional): Where to write the manifest.
+            Defaults to WITHDRARXIV_MANIFEST_PATH or the manifest next to
+            the downloaded database.
+    """
+    from manugen_ai import data
+
+    manifest = data.publish_withdrarxiv_embeddings(
+        str(db_path),
+        version=version,
+        manifest_path=str(manifest_path) if manifest_path else None,
+    )
+    print(
+        f"* Published {manifest.db_file} version {manifest.version} "
+        f"({manifest.rows} embeddings of {manifest.model})"
+    )
+
+
+@app.command
+def load_embeddings_pgvector(db_path: Path = None):
+    """
+    Copy withdrarxiv papers and embeddings into Postgres with pgvector
+    (PGVECTOR_CONN_STRING) and index them with HNSW, for USE_PGVECTOR=1.
+
+    Args:
+        db_path (Path, optional): The DuckDB database to copy. Defaults to
+            the precomputed database for the embedding model being used.
+    """
+    from manugen_ai import data
+
+    n_rows = data.load_withdrarxiv_embeddings_into_pgvector(
+        str(db_path) if db_path else None
+    )
+    print(f"* Loaded {n_rows} embeddings into Postgres")
+
+
+@app.command
+def export_partitions(
+    db_path: Path = None, method: str = "kmeans", n_partitions: int = None
+):
+    """
+    Split withdrarxiv embeddings into partitions by arXiv subject or
+    k-means clusters for the "partitioned" search backend.
+
+    Args:
+        db_path (Path, optional): The DuckDB database to partition. Defaults
+            to the precomputed database for the embedding model being used.
+        method (str, optional): "subject" or "kmeans". Defaults to "kmeans".
+        n_partitions (int, optional): Number of k-means partitions.
+            Defaults to the square root of the number of papers.
+    """
+    from manugen_ai import data
+
+    n = data.export_withdrarxiv_partitions(
+        str(db_path) if db_path else None, method=method, n_partitions=n_partitions
+    )
+    print(f"* Split embeddings into {n} partitions")
+
+
 if __name__ == "__main__":
     app()
@@ -1,19 +1,69 @@
 # 1) Install required packages (run once in your environment)
 #    !pip install duckdb transformers FlagEmbedding polars
 
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import itertools
+import json
 import logging
+import multiprocessing
 import os
 import pathlib
+import queue
+import shutil
+import threading
+import time
+from typing import Any, Iterable, Iterator
 
 import duckdb
 import numpy as np
 import pyarrow as pa
+import pyarrow.parquet as pq
+
+from manugen_ai.embedding_cache import EmbeddingCache
+from manugen_ai.embedding_providers import (
+    EmbeddingProvider,
+    FlagEmbeddingProvider,
+    GeminiEmbeddingProvider,
+    HashingEmbeddingProvider,
+    create_embedding_provider,
+    register_embedding_provider,
+)
+from manugen_ai.embedding_service import EmbeddingServiceClient
+from manugen_ai.gemini_embeddings import AsyncGeminiEmbeddingClient
+from manugen_ai.manifest import (
+    EmbeddingDatabaseManifest,
+    get_manifest_path,
+    read_manifest,
+    validate_manifest,
+    write_manifest,
+)
+from manugen_ai.search import (
+    MATRIX_OFFSETS_TABLE,
+    PARTITION_CENTROIDS_TABLE,
+    PARTITIONED_EMBEDDINGS_TABLE,
+    PARTITIONS_TABLE,
+    WithdrarxivSearchEngine,
+    create_embedding_partitions,
+    create_hnsw_index,
+    export_compact_embeddings,
+    export_embedding_matrix,
+    get_compact_db_path,
+    get_matrix_path,
+)
+from manugen_ai.utils import download_file_if_not_available, file_lock
 
-from manugen_ai.utils import download_file_if_not_available
+logger = logging.getLogger(__name__)
 
 # if USE_GEMINI_EMBEDDINGS is 1, we'll use Google's GenAI API for embeddings,
 # otherwise we'll use the FlagEmbedding model (BAAI/bge-m3)
 USE_GEMINI_EMBEDDINGS = os.environ.get("USE_GEMINI_EMBEDDINGS", "1") == "1"
+# the embedding provider to use by name: "gemini", "bge-m3" (FlagEmbedding),
+# "hashing" (fast and deterministic, for tests and benchmarks) or any provider
+# added with register_embedding_provider(); overrides USE_GEMINI_EMBEDDINGS
+EMBEDDING_PROVIDER = os.environ.get("EMBEDDING_PROVIDER")
 
 # ----------------------------------------------------
 # --- Gemini embeddings setup
@@ -50,6 +100,41 @@ def get_genai_client():
     return _GENAI_CLIENT
 
 
+# requests in flight at once, and retries per request, for Gemini embeddings
+GEMINI_EMBEDDING_MAX_CONCURRENCY = int(
+    os.environ.get("GEMINI_EMBEDDING_MAX_CONCURRENCY", "4")
+)
+GEMINI_EMBEDDING_MAX_RETRIES = int(os.environ.get("GEMINI_EMBEDDING_MAX_RETRIES", "5"))
+
+# singleton for the async gemini embedding client
+# set the first time get_gemini_embedding_client() is called
+_GEMINI_EMBEDDING_CLIENT = None
+
+
+def get_gemini_embedding_client() -> AsyncGeminiEmbeddingClient:
+    """
+    Get the async, rate-limit-aware client for Gemini embeddings.
+
+    This function initializes the client if it has not been
+    created yet, so its throughput counters cover every call made
+    by this process.
+
+    Returns:
+        AsyncGeminiEmbeddingClient: The initialized embedding client.
+    """
+    global _GEMINI_EMBEDDING_CLIENT
+
+    if _GEMINI_EMBEDDING_CLIENT is None:
+        _GEMINI_EMBEDDING_CLIENT = AsyncGeminiEmbeddingClient(
+            client=get_genai_client(),
+            model=GEMINI_EMBEDDING_MODEL_NAME,
+            max_concurrency=GEMINI_EMBEDDING_MAX_CONCURRENCY,
+            max_retries=GEMINI_EMBEDDING_MAX_RETRIES,
+        )
+
+    return _GEMINI_EMBEDDING_CLIENT
+
+
 # ----------------------------------------------------
 # --- FlagEmbedding embeddings setup
 # ----------------------------------------------------
@@ -58,12 +143,61 @@ FLAGEMBEDDING_MODEL_OR_PATH = os.environ.get(
     "FLAGEMBEDDING_MODEL_OR_PATH", "BAAI/bge-m3"
 )
 FLAGEMBEDDING_CACHE_DIR = os.environ.get("FLAGEMBEDDING_CACHE_DIR", "/opt/model_cache/")
+# how to run the FlagEmbedding model: "torch" (FlagEmbedding's BGEM3FlagModel),
+# or "onnx" for CPU inference of an int8-quantized ONNX export through ONNX Runtime
+# (requires the `onnx` extra; see export_flag_embedding_model_to_onnx)
+FLAGEMBEDDING_BACKEND = os.environ.get("FLAGEMBEDDING_BACKEND", "torch")
+# where the ONNX export is stored
+FLAGEMBEDDING_ONNX_DIR = os.environ.get(
+    "FLAGEMBEDDING_ONNX_DIR",
+    str(
+        pathlib.Path(FLAGEMBEDDING_CACHE_DIR)
+        / "onnx"
+        / f"{FLAGEMBEDDING_MODEL_OR_PATH.split('/')[-1]}-int8"
+    ),
+)
+# threads ONNX Runtime uses within an operator (defaults to all cores)
+FLAGEMBEDDING_ONNX_THREADS = os.environ.get("FLAGEMBEDDING_ONNX_THREADS")
+# maximum tokens per text (e.g. 512 for abstracts); longer texts are truncated.
+# defaults to the model's own limit (8192 tokens for BAAI/bge-m3)
+FLAGEMBEDDING_MAX_LENGTH = (
+    int(os.environ["FLAGEMBEDDING_MAX_LENGTH"])
+    if os.environ.get("FLAGEMBEDDING_MAX_LENGTH")
+    else None
+)
 
 # singleton for the flagembedding model
 # set the first time get_flag_embedding_model() is called
 _EMBEDDING_MODEL = None
 
 
+def export_flag_embedding_model_to_onnx() -> str:
+    """
+    Export the FlagEmbedding model to ONNX under FLAGEMBEDDING_ONNX_DIR,
+    unless it has been exported already.
+
+    The export holds a file lock, so when several processes (e.g. uvicorn
+    workers) start at once one of them exports and the others wait for it.
+    backend/start_api_server.sh runs it before starting the workers.
+
+    Returns:
+        str: The directory of the ONNX export.
+    """
+    from manugen_ai.onnx_embeddings import export_bge_m3_onnx
+
+    onnx_dir = pathlib.Path(FLAGEMBEDDING_ONNX_DIR)
+    onnx_dir.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(f"{onnx_dir}.lock"):
+        if not onnx_dir.is_dir():
+            logger.info("Exporting %s to ONNX", FLAGEMBEDDING_MODEL_OR_PATH)
+            export_bge_m3_onnx(
+                FLAGEMBEDDING_MODEL_OR_PATH,
+                str(onnx_dir),
+                cache_dir=FLAGEMBEDDING_CACHE_DIR,
+            )
+    return str(onnx_dir)
+
+
 def get_flag_embedding_model():
     """
     Get the FlagEmbedding model for generating dense vector embeddings.
@@ -73,10 +207,23 @@ def get_flag_embedding_model():
     across calls.
 
     Returns:
-        BGEM3FlagModel: The initialized embedding model.
+        BGEM3FlagModel | OnnxBgeM3Encoder:
+          The initialized embedding model (an ONNX Runtime encoder
+          with the same `encode` interface if FLAGEMBEDDING_BACKEND is "onnx").
     """
     global _EMBEDDING_MODEL
 
+    if _EMBEDDING_MODEL is None and FLAGEMBEDDING_BACKEND == "onnx":
+        from manugen_ai.onnx_embeddings import OnnxBgeM3Encoder
+
+        export_flag_embedding_model_to_onnx()
+        _EMBEDDING_MODEL = OnnxBgeM3Encoder(
+            FLAGEMBEDDING_ONNX_DIR,
+            intra_op_threads=(
+                int(FLAGEMBEDDING_ONNX_THREADS) if FLAGEMBEDDING_ONNX_THREADS else None
+            ),
+        )
+
     if _EMBEDDING_MODEL is None:
         # import these here, as they're only needed when we're using BGE-M3
         import torch
@@ -97,28 +244,328 @@ def get_flag_embedding_model():
         _EMBEDDING_MODEL = BGEM3FlagModel(
             FLAGEMBEDDING_MODEL_OR_PATH,
             cache_dir=FLAGEMBEDDING_CACHE_DIR,
-            use_fp16=True,
+            # fp16 is slow (or silently upcast) on CPUs
+            use_fp16=device != "cpu",
             device=device,
         )
 
     return _EMBEDDING_MODEL
 
 
+# if EMBEDDING_SERVICE_URL is set (e.g. "http://127.0.0.1:8765" or
+# "unix:///tmp/manugen-embeddings.sock"), FlagEmbedding embeddings are requested
+# from an embedding service (see `manugen embedding-server`) which loads the model
+# once and micro-batches requests, instead of loading the model in every process
+EMBEDDING_SERVICE_URL = os.environ.get("EMBEDDING_SERVICE_URL")
+# micro-batching options for the embedding service
+EMBEDDING_SERVICE_MAX_BATCH_SIZE = int(
+    os.environ.get("EMBEDDING_SERVICE_MAX_BATCH_SIZE", "32")
+)
+EMBEDDING_SERVICE_MAX_WAIT_MS = float(
+    os.environ.get("EMBEDDING_SERVICE_MAX_WAIT_MS", "5")
+)
+
+# singleton for the embedding service client
+# set the first time get_embedding_service_client() is called
+_EMBEDDING_SERVICE_CLIENT = None
+
+
+def get_embedding_service_client() -> EmbeddingServiceClient:
+    """
+    Get the client for the embedding service at EMBEDDING_SERVICE_URL.
+
+    Returns:
+        EmbeddingServiceClient: The initialized client.
+    """
+    global _EMBEDDING_SERVICE_CLIENT
+
+    if _EMBEDDING_SERVICE_CLIENT is None:
+        _EMBEDDING_SERVICE_CLIENT = EmbeddingServiceClient(EMBEDDING_SERVICE_URL)
+
+    return _EMBEDDING_SERVICE_CLIENT
+
+
+def encode_with_flag_embedding_model(
+    texts: list[str], batch_size: int = 4, max_length: int | None = None
+) -> np.ndarray:
+    """
+    Encode texts with the FlagEmbedding model loaded in this process.
+
+    Both `BGEM3FlagModel` and `OnnxBgeM3Encoder` sort texts by token
+    length into batches themselves, so little compute is spent on
+    padding, and return the embeddings in the original order.
+
+    Args:
+        texts (list[str]):
+          A list of input texts to embed.
+        batch_size (int, optional):
+          Number of texts the model encodes at once. Defaults to 4.
+        max_length (int, optional):
+          Maximum tokens per text; longer texts are truncated.
+          Defaults to FLAGEMBEDDING_MAX_LENGTH, or the model's own limit.
+
+    Returns:
+        np.ndarray:
+          A float32 array with one dense vector per text.
+    """
+    max_length = max_length or FLAGEMBEDDING_MAX_LENGTH
+    encode_kwargs = {"max_length": max_length} if max_length else {}
+    return (
+        get_flag_embedding_model()
+        .encode(texts, batch_size=batch_size, **encode_kwargs)["dense_vecs"]
+        .astype(np.float32)
+    )
+
+
+def _encode_with_flag_embedding(texts: list[str], batch_size: int = 4) -> np.ndarray:
+    """
+    Encode texts with the FlagEmbedding model, through the embedding
+    service when EMBEDDING_SERVICE_URL is set.
+    """
+    if EMBEDDING_SERVICE_URL:
+        return get_embedding_service_client().embed(texts)
+    return encode_with_flag_embedding_model(texts, batch_size=batch_size)
+
+
+# processes encoding texts with the FlagEmbedding model for async callers
+# (such as the async withdrarxiv search tool), so encoding doesn't hold this
+# process's GIL. Each process loads its own model, so with several uvicorn
+# workers prefer the embedding service (EMBEDDING_SERVICE_URL); by default (0)
+# texts are encoded in a thread of this process, off the event loop
+FLAGEMBEDDING_ASYNC_PROCESSES = int(
+    os.environ.get("FLAGEMBEDDING_ASYNC_PROCESSES", "0")
+)
+
+# singleton for the FlagEmbedding process pool
+# set the first time get_flag_embedding_executor() is called
+_FLAG_EMBEDDING_EXECUTOR = None
+_FLAG_EMBEDDING_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_flag_embedding_executor() -> concurrent.futures.ProcessPoolExecutor | None:
+    """
+    Get the pool of processes encoding texts with the FlagEmbedding
+    model for async callers.
+
+    Returns:
+        concurrent.futures.ProcessPoolExecutor | None:
+          The initialized pool, or None when FLAGEMBEDDING_ASYNC_PROCESSES
+          is 0 or embeddings come from the embedding service, whose client
+          is called from a worker thread instead.
+    """
+    global _FLAG_EMBEDDING_EXECUTOR
+
+    if EMBEDDING_SERVICE_URL or FLAGEMBEDDING_ASYNC_PROCESSES < 1:
+        return None
+
+    with _FLAG_EMBEDDING_EXECUTOR_LOCK:
+        if _FLAG_EMBEDDING_EXECUTOR is None:
+            _FLAG_EMBEDDING_EXECUTOR = concurrent.futures.ProcessPoolExecutor(
+                max_workers=FLAGEMBEDDING_ASYNC_PROCESSES,
+                mp_context=multiprocessing.get_context(_SHARD_MP_CONTEXT),
+                initializer=_init_shard_worker,
+                initargs=(
+                    max(1, (os.cpu_count() or 1) // FLAGEMBEDDING_ASYNC_PROCESSES),
+                ),
+            )
+
+    return _FLAG_EMBEDDING_EXECUTOR
+
+
+# ----------------------------------------------------
+# --- Embedding providers
+# ----------------------------------------------------
+
+# embedding size of the "hashing" provider
+HASHING_EMBEDDING_SIZE = int(os.environ.get("HASHING_EMBEDDING_SIZE", "256"))
+
+register_embedding_provider(
+    "gemini",
+    lambda: GeminiEmbeddingProvider(
+        get_gemini_embedding_client,
+        model_name=GEMINI_EMBEDDING_MODEL_NAME,
+        max_concurrency=GEMINI_EMBEDDING_MAX_CONCURRENCY,
+    ),
+)
+register_embedding_provider(
+    "bge-m3",
+    lambda: FlagEmbeddingProvider(
+        FLAGEMBEDDING_MODEL_OR_PATH,
+        encode_fn=_encode_with_flag_embedding,
+        max_length=FLAGEMBEDDING_MAX_LENGTH,
+        get_executor=get_flag_embedding_executor,
+    ),
+)
+register_embedding_provider(
+    "hashing", lambda: HashingEmbeddingProvider(HASHING_EMBEDDING_SIZE)
+)
+
+# providers created so far, by name
+# set the first time get_embedding_provider() is called for each name
+_EMBEDDING_PROVIDERS = {}
+_EMBEDDING_PROVIDERS_LOCK = threading.Lock()
+
+
+def get_embedding_provider_name() -> str:
+    """
+    Get the name of the embedding provider being used: EMBEDDING_PROVIDER,
+    or "gemini" or "bge-m3" depending on USE_GEMINI_EMBEDDINGS.
+    """
+    if EMBEDDING_PROVIDER:
+        return EMBEDDING_PROVIDER
+    return "gemini" if USE_GEMINI_EMBEDDINGS else "bge-m3"
+
+
+def get_embedding_provider(name: str | None = None) -> EmbeddingProvider:
+    """
+    Get an embedding provider, creating it the first time it is used.
+
+    Args:
+        name (str, optional): The provider's registry name.
+            Defaults to the provider being used.
+
+    Returns:
+        EmbeddingProvider: The provider.
+    """
+    name = name or get_embedding_provider_name()
+
+    with _EMBEDDING_PROVIDERS_LOCK:
+        if name not in _EMBEDDING_PROVIDERS:
+            _EMBEDDING_PROVIDERS[name] = create_embedding_provider(name)
+
+    return _EMBEDDING_PROVIDERS[name]
+
+
 # ----------------------------------------------------
 # --- General Withdrarxiv Encoding and Search
 # ----------------------------------------------------
 
+# which backend search_withdrarxiv_embeddings() uses; "auto" uses the HNSW
+# index when the database has one, then the exported embedding matrix, and
+# falls back to exact search otherwise
+WITHDRARXIV_SEARCH_BACKEND = os.environ.get("WITHDRARXIV_SEARCH_BACKEND", "auto")
+# candidate list size for HNSW searches (higher is slower but more accurate)
+WITHDRARXIV_HNSW_EF_SEARCH = os.environ.get("WITHDRARXIV_HNSW_EF_SEARCH")
+# partitions searched per query when the database is partitioned
+# (see export_withdrarxiv_partitions; higher is slower but more accurate)
+WITHDRARXIV_NPROBE = int(os.environ.get("WITHDRARXIV_NPROBE", "8"))
+
+# if WITHDRARXIV_COMPACT_EMBEDDINGS is 1, search the withdrarxiv embeddings
+# database through compact first-pass vectors held in memory (see
+# export_withdrarxiv_compact_db), downloaded from
+# WITHDRARXIV_COMPACT_EMBEDDINGS_URL when it is set. Candidates are reranked
+# with the full database's float32 embeddings, so the full database is
+# downloaded too: this saves memory per worker, not download size
+WITHDRARXIV_COMPACT_EMBEDDINGS = (
+    os.environ.get("WITHDRARXIV_COMPACT_EMBEDDINGS", "0") == "1"
+)
+WITHDRARXIV_COMPACT_EMBEDDINGS_URL = os.environ.get(
+    "WITHDRARXIV_COMPACT_EMBEDDINGS_URL"
+)
+# first-pass vectors of the compact database: int8 or float16, keeping
+# their leading WITHDRARXIV_COMPACT_DIM components (all when unset)
+WITHDRARXIV_COMPACT_DTYPE = os.environ.get("WITHDRARXIV_COMPACT_DTYPE", "int8")
+WITHDRARXIV_COMPACT_DIM = (
+    int(os.environ["WITHDRARXIV_COMPACT_DIM"])
+    if os.environ.get("WITHDRARXIV_COMPACT_DIM")
+    else None
+)
+# first-pass candidates reranked per query with their float32 embeddings
+WITHDRARXIV_COMPACT_RERANK_CANDIDATES = int(
+    os.environ.get("WITHDRARXIV_COMPACT_RERANK_CANDIDATES", "100")
+)
+
+# manifest naming the current withdrarxiv embeddings database (see
+# publish_withdrarxiv_embeddings), by default next to the downloaded one;
+# when it exists, searches use the database it names and switch to a
+# newly published one on their next query
+WITHDRARXIV_MANIFEST_PATH = os.environ.get("WITHDRARXIV_MANIFEST_PATH")
+# whether to verify a published database's checksum before searching it
+WITHDRARXIV_MANIFEST_VERIFY_CHECKSUM = (
+    os.environ.get("WITHDRARXIV_MANIFEST_VERIFY_CHECKSUM", "1") == "1"
+)
+
+# if USE_PGVECTOR is 1, withdrarxiv papers and embeddings are searched in
+# Postgres with pgvector (loaded by create_withdrarxiv_embeddings or
+# load_withdrarxiv_embeddings_into_pgvector) rather than in a local
+# DuckDB database, so backend nodes need no local copy of the embeddings
+USE_PGVECTOR = os.environ.get("USE_PGVECTOR", "0") == "1"
+# Postgres connection string, defaulting to the ADK session database
+PGVECTOR_CONN_STRING = os.environ.get(
+    "PGVECTOR_CONN_STRING", os.environ.get("SESSION_DB_CONN_STRING")
+)
+# most pooled Postgres connections per process
+PGVECTOR_MAX_CONNECTIONS = int(os.environ.get("PGVECTOR_MAX_CONNECTIONS", "10"))
+# search backend: "hnsw" (pgvector's HNSW index) or "exact"
+PGVECTOR_SEARCH_BACKEND = os.environ.get("PGVECTOR_SEARCH_BACKEND", "hnsw")
+
+
+# if USE_EMBEDDING_CACHE is 1, embed() and embed_batch() reuse embeddings
+# of texts seen before, stored by (model name, text hash) in EMBEDDING_CACHE_PATH,
+# by default in the user's cache directory rather than the (possibly
+# read-only) installed package
+USE_EMBEDDING_CACHE = os.environ.get("USE_EMBEDDING_CACHE", "1") == "1"
+EMBEDDING_CACHE_PATH = os.environ.get(
+    "EMBEDDING_CACHE_PATH",
+    str(
+        pathlib.Path(os.environ.get("XDG_CACHE_HOME", pathlib.Path.home() / ".cache"))
+        / "manugen_ai"
+        / "embedding_cache.sqlite"
+    ),
+)
+# number of embeddings kept in memory in front of the cache database
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.environ.get("EMBEDDING_CACHE_MEMORY_SIZE", "4096"))
+
+# singleton for the embedding cache
+# set the first time get_embedding_cache() is called
+_EMBEDDING_CACHE = None
+_EMBEDDING_CACHE_LOCK = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """
+    Get the embedding cache shared by embed() and embed_batch().
+
+    Its `summary()` reports the cache's hit rate so far.
+
+    Returns:
+        EmbeddingCache | None:
+          The initialized cache, or None if USE_EMBEDDING_CACHE is disabled.
+    """
+    global _EMBEDDING_CACHE
+
+    if not USE_EMBEDDING_CACHE:
+        return None
+
+    with _EMBEDDING_CACHE_LOCK:
+        if _EMBEDDING_CACHE is None:
+            _EMBEDDING_CACHE = EmbeddingCache(
+                EMBEDDING_CACHE_PATH, memory_size=EMBEDDING_CACHE_MEMORY_SIZE
+            )
+
+    return _EMBEDDING_CACHE
+
 
 def get_model_name() -> str:
     """
     Get the name of the embedding model being used.
     """
-    if USE_GEMINI_EMBEDDINGS:
-        # use the gemini model name
-        return GEMINI_EMBEDDING_MODEL_NAME
-    else:
-        # Extract model name from path
-        return FLAGEMBEDDING_MODEL_OR_PATH.split("/")[-1]
+    return get_embedding_provider().model_name
+
+
+def _encode_texts(texts: list[str], batch_size: int = 4) -> np.ndarray:
+    """
+    Encode texts with the configured embedding model, without caching.
+    """
+    return get_embedding_provider().encode_batch(texts, batch_size=batch_size)
+
+
+async def _aencode_texts(texts: list[str], batch_size: int = 4) -> np.ndarray:
+    """
+    Encode texts with the configured embedding model, without caching
+    or blocking the event loop.
+    """
+    return await get_embedding_provider().aencode_batch(texts, batch_size=batch_size)
 
 
 def embed(text: str) -> np.ndarray:
@@ -138,28 +585,24 @@ def embed(text: str) -> np.ndarray:
         >>> vec.shape
         (768,)
     """
-    if USE_GEMINI_EMBEDDINGS:
-        embeddings = (
-            get_genai_client()
-            .models.embed_content(model=GEMINI_EMBEDDING_MODEL_NAME, contents=[text])
-            .embeddings[0]
-            .values
-        )
+    return embed_batch([text])[0]
 
-        vec = np.array(embeddings, dtype=np.float32)
-    else:
-        vec = get_flag_embedding_model().encode([text], batch_size=4)["dense_vecs"][0]
-
-    return vec.astype(np.float32)
 
-
-def embed_batch(texts: list[str]) -> np.ndarray:
+def embed_batch(
+    texts: list[str], batch_size: int = 4, use_cache: bool = True
+) -> np.ndarray:
     """
     Generate dense vector embeddings for a batch of texts.
 
     Args:
         texts (list[str]):
           A list of input texts to embed.
+        batch_size (int, optional):
+          Number of texts the FlagEmbedding model encodes at once.
+          Defaults to 4.
+        use_cache (bool, optional):
+          Whether to reuse and store embeddings in the embedding cache
+          (when it is enabled). Defaults to True.
 
     Returns:
         np.ndarray:
@@ -171,23 +614,59 @@ def embed_batch(texts: list[str]) -> np.ndarray:
         >>> vecs.shape
         (2, 1024)
     """
-    if USE_GEMINI_EMBEDDINGS:
-        embeddings = [
-            x.values
-            for x in get_genai_client()
-            .models.embed_content(model=GEMINI_EMBEDDING_MODEL_NAME, contents=texts)
-            .embeddings
-        ]
-        embs = np.array(embeddings, dtype=np.float32)
-    else:
-        embs = get_flag_embedding_model().encode(texts, batch_size=4)["dense_vecs"]
+    cache = get_embedding_cache() if use_cache else None
+    if cache is None:
+        return _encode_texts(texts, batch_size=batch_size)
+
+    return cache.get_or_embed(
+        get_embedding_provider().cache_model,
+        texts,
+        functools.partial(_encode_texts, batch_size=batch_size),
+        embedding_size=get_embedding_size(),
+    )
+
 
-    return embs.astype(np.float32)
+async def aembed_batch(
+    texts: list[str], batch_size: int = 4, use_cache: bool = True
+) -> np.ndarray:
+    """
+    Generate dense vector embeddings for a batch of texts
+    without blocking the event loop.
+
+    Gemini embeddings are requested concurrently through the
+    async embedding client; FlagEmbedding encodes in a worker thread.
+
+    Args:
+        texts (list[str]):
+          A list of input texts to embed.
+        batch_size (int, optional):
+          Number of texts the FlagEmbedding model encodes at once.
+          Defaults to 4.
+        use_cache (bool, optional):
+          Whether to reuse and store embeddings in the embedding cache
+          (when it is enabled). Defaults to True.
+
+    Returns:
+        np.ndarray:
+          A NumPy array of shape (n, d) containing the dense vector
+          representations of the input texts.
+    """
+    cache = get_embedding_cache() if use_cache else None
+    if cache is None:
+        return await _aencode_texts(texts, batch_size=batch_size)
+
+    return await cache.aget_or_embed(
+        get_embedding_provider().cache_model,
+        texts,
+        functools.partial(_aencode_texts, batch_size=batch_size),
+        embedding_size=get_embedding_size(),
+    )
 
 
 def get_embedding_size() -> int:
     """
-    Get the size of the dense vector embeddings.
+    Get the size of the dense vector embeddings of the embedding
+    provider being used.
 
     BAAI/bge-m3 embeddings have 1024 components ,
     while Gemini embeddings have 768.
@@ -195,11 +674,438 @@ def get_embedding_size() -> int:
     Returns:
         int: The size of the dense vector embeddings,
     """
-    return 768 if USE_GEMINI_EMBEDDINGS else 1024
+    return get_embedding_provider().dimension
+
+
+def _has_table(conn: duckdb.DuckDBPyConnection, table_name: str) -> bool:
+    """
+    Check whether a table exists in a DuckDB database.
+    """
+    return bool(
+        conn.execute(
+            "SELECT count(*) FROM duckdb_tables() WHERE table_name = $name",
+            {"name": table_name},
+        ).fetchone()[0]
+    )
+
+
+def _withdrarxiv_build_inputs(parquet_path: str) -> dict[str, Any]:
+    """
+    Describe the inputs of a withdrarxiv embeddings build, which a build
+    must share with an interrupted one to resume it.
+    """
+    return {
+        "parquet_path": str(pathlib.Path(parquet_path).resolve()),
+        "parquet_mtime": os.stat(parquet_path).st_mtime,
+        "model_name": get_model_name(),
+        "embedding_size": get_embedding_size(),
+    }
+
+
+def _can_resume_withdrarxiv_build(
+    conn: duckdb.DuckDBPyConnection, build_inputs: dict[str, Any]
+) -> bool:
+    """
+    Check whether a database holds an unfinished withdrarxiv embeddings
+    build with the same inputs, logging why it doesn't otherwise.
+    """
+    if not all(
+        _has_table(conn, table)
+        for table in ("papers", "embeddings", "build_checkpoint")
+    ):
+        return False
+    columns = {
+        row[0]
+        for row in conn.execute(
+            """
+            SELECT column_name FROM duckdb_columns()
+            WHERE table_name = 'build_checkpoint'
+            """
+        ).fetchall()
+    }
+    if not columns.issuperset([*build_inputs, "completed"]):
+        logger.info("Rebuilding withdrarxiv embeddings from an older build format")
+        return False
+    checkpoint = dict(
+        zip(
+            [*build_inputs, "completed"],
+            conn.execute(
+                f"SELECT {', '.join(build_inputs)}, completed FROM build_checkpoint"
+            ).fetchone(),
+        )
+    )
+    changed = [
+        name for name, value in build_inputs.items() if checkpoint[name] != value
+    ]
+    if changed:
+        logger.info(
+            "Rebuilding withdrarxiv embeddings, as the build's %s changed",
+            ", ".join(changed),
+        )
+        return False
+    if checkpoint["completed"]:
+        logger.info("Rebuilding withdrarxiv embeddings of a finished build")
+        return False
+    return True
+
+
+def _write_embedding_batch(
+    conn: duckdb.DuckDBPyConnection,
+    arxiv_ids: pa.Array,
+    embs: np.ndarray,
+    last_rowid: int,
+) -> None:
+    """
+    Insert a batch of embeddings and advance the build checkpoint to the
+    last `papers` rowid of the batch within a single transaction, so an
+    interrupted build never records rows it did not store (or vice versa).
+    """
+    # wrap the embedding buffer as a FixedSizeList (FLOAT[n]) column directly,
+    # avoiding a round trip through Python lists
+    embs = np.ascontiguousarray(embs, dtype=np.float32)
+    embedding_column = pa.FixedSizeListArray.from_arrays(
+        pa.array(embs.ravel()), embs.shape[1]
+    )
+    batch = pa.table({"arxiv_id": arxiv_ids, "embedding": embedding_column})
+
+    conn.register("batch", batch)
+    conn.begin()
+    try:
+        conn.execute(
+            """
+            INSERT INTO embeddings
+            SELECT arxiv_id, embedding
+            FROM batch
+            """
+        )
+        conn.execute(
+            """
+            UPDATE build_checkpoint
+            SET last_rowid = $last_rowid, updated_at = now()
+            """,
+            {"last_rowid": last_rowid},
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.unregister("batch")
+
+
+def _prefetch(iterable: Iterable[Any], maxsize: int) -> Iterator[Any]:
+    """
+    Consume an iterable in a background thread, handing its items over
+    through a bounded queue so the producer runs ahead of the consumer by
+    at most `maxsize` items. Exceptions raised by the producer are raised
+    again in the consumer.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        # retry so the producer notices when the consumer has gone away
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((done, e))
+        else:
+            put((done, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def _read_pending_papers(
+    conn: duckdb.DuckDBPyConnection, last_rowid: int, batch_size: int
+) -> Iterator[pa.RecordBatch]:
+    """
+    Walk the papers after the checkpointed rowid once, in rowid order,
+    as Arrow record batches (on a separate cursor, so embeddings can be
+    inserted while the rows stream).
+    """
+    reader = (
+        conn.cursor()
+        .execute(
+            """
+            SELECT rowid, arxiv_id, abstract
+            FROM papers
+            WHERE rowid > $last_rowid
+            ORDER BY rowid
+            """,
+            {"last_rowid": last_rowid},
+        )
+        .fetch_record_batch(batch_size)
+    )
+    return (batch for batch in reader if batch.num_rows > 0)
+
+
+class _BuildProgress:
+    """
+    Log the progress and throughput of an embeddings build.
+    """
+
+    def __init__(self, done_rows: int, total_rows: int):
+        self.done_rows = done_rows
+        self.total_rows = total_rows
+        self.built_rows = 0
+        self.start = time.perf_counter()
+
+    def update(self, n_rows: int) -> None:
+        self.built_rows += n_rows
+        elapsed = time.perf_counter() - self.start
+        logger.info(
+            "Embedded %d/%d withdrarxiv abstracts (%.1f rows/s)",
+            self.done_rows + self.built_rows,
+            self.total_rows,
+            self.built_rows / elapsed if elapsed else 0.0,
+        )
+
+
+def _encode_batches(
+    batches: Iterable[pa.RecordBatch], encode_batch_size: int, group_size: int
+) -> Iterator[tuple[pa.RecordBatch, np.ndarray]]:
+    """
+    Embed the abstracts of record batches, `group_size` batches per
+    `embed_batch` call, yielding each batch with its embeddings.
+    """
+    batches = iter(batches)
+    while group := list(itertools.islice(batches, group_size)):
+        embs = embed_batch(
+            [text for batch in group for text in batch.column("abstract").to_pylist()],
+            batch_size=encode_batch_size,
+            # every abstract is embedded once, so don't fill the cache with them
+            use_cache=False,
+        )
+        offset = 0
+        for batch in group:
+            yield batch, embs[offset : offset + batch.num_rows]
+            offset += batch.num_rows
+
+
+def _embed_papers_streaming(
+    conn: duckdb.DuckDBPyConnection,
+    last_rowid: int,
+    batch_size: int,
+    encode_batch_size: int,
+    pipelined: bool,
+    queue_size: int,
+    progress: _BuildProgress,
+) -> None:
+    """
+    Embed pending papers batch by batch in this process, optionally
+    overlapping reading, encoding and writing.
+    """
+    batches = _read_pending_papers(conn, last_rowid, batch_size)
+    if pipelined:
+        batches = _prefetch(batches, maxsize=queue_size)
+    encoded = _encode_batches(
+        batches,
+        encode_batch_size=encode_batch_size,
+        # let remote providers (e.g. Gemini) keep several requests in flight
+        group_size=get_embedding_provider().max_concurrency,
+    )
+    if pipelined:
+        encoded = _prefetch(encoded, maxsize=queue_size)
+
+    for batch_table, embs in encoded:
+        _write_embedding_batch(
+            conn,
+            arxiv_ids=batch_table.column("arxiv_id"),
+            embs=embs,
+            last_rowid=batch_table.column("rowid")[-1].as_py(),
+        )
+        progress.update(batch_table.num_rows)
+
+
+# multiprocessing start method for sharded builds (and FlagEmbedding process
+# pools); spawn avoids forking a process which may already hold torch (or CUDA)
+# state
+_SHARD_MP_CONTEXT = "spawn"
+
+
+def _init_shard_worker(threads: int) -> None:
+    """
+    Prepare a worker process which embeds texts (for sharded builds or
+    async callers): split the CPU threads between workers and load the
+    embedding model once.
+    """
+    global FLAGEMBEDDING_ONNX_THREADS
+
+    if get_embedding_provider_name() == "bge-m3":
+        if FLAGEMBEDDING_BACKEND == "onnx":
+            FLAGEMBEDDING_ONNX_THREADS = threads
+        else:
+            import torch
+
+            torch.set_num_threads(threads)
+        get_flag_embedding_model()
+
+
+def _embed_shard(
+    shard_path: str,
+    arxiv_ids: list[str],
+    texts: list[str],
+    encode_batch_size: int,
+) -> str:
+    """
+    Embed one shard of papers in a worker process and write it to a
+    Parquet file (atomically, so a partial shard is never merged).
+    """
+    embs = np.ascontiguousarray(
+        embed_batch(texts, batch_size=encode_batch_size, use_cache=False),
+        dtype=np.float32,
+    )
+    table = pa.table(
+        {
+            "arxiv_id": arxiv_ids,
+            "embedding": pa.FixedSizeListArray.from_arrays(
+                pa.array(embs.ravel()), embs.shape[1]
+            ),
+        }
+    )
+    tmp_path = f"{shard_path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, shard_path)
+
+    return shard_path
+
+
+def _merge_embedding_shard(
+    conn: duckdb.DuckDBPyConnection, shard_path: str, last_rowid: int
+) -> None:
+    """
+    Insert a shard's embeddings and advance the build checkpoint in a
+    single transaction.
+    """
+    conn.begin()
+    try:
+        conn.execute(
+            f"""
+            INSERT INTO embeddings
+            SELECT arxiv_id, embedding::FLOAT[{get_embedding_size()}]
+            FROM read_parquet($shard_path)
+            """,
+            {"shard_path": shard_path},
+        )
+        conn.execute(
+            """
+            UPDATE build_checkpoint
+            SET last_rowid = $last_rowid, updated_at = now()
+            """,
+            {"last_rowid": last_rowid},
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _embed_papers_sharded(
+    conn: duckdb.DuckDBPyConnection,
+    last_rowid: int,
+    shards_dir: pathlib.Path,
+    workers: int,
+    shard_size: int,
+    encode_batch_size: int,
+    progress: _BuildProgress,
+) -> None:
+    """
+    Embed pending papers in a pool of worker processes, one Parquet file
+    per shard of `shard_size` papers, then merge the shards into the
+    `embeddings` table in rowid order.
+
+    Shards written by an interrupted build are reused rather than
+    encoded again.
+    """
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    shards = []
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(_SHARD_MP_CONTEXT),
+        initializer=_init_shard_worker,
+        initargs=(max(1, (os.cpu_count() or 1) // workers),),
+    ) as pool:
+        # futures of shards being encoded, mapped to their number of rows
+        pending = {}
+        for batch in _read_pending_papers(conn, last_rowid, shard_size):
+            rowids = batch.column("rowid")
+            shard_path = str(
+                shards_dir
+                / f"shard_{rowids[0].as_py():012d}_{rowids[-1].as_py():012d}.parquet"
+            )
+            shards.append((shard_path, rowids[-1].as_py()))
+            if pathlib.Path(shard_path).is_file():
+                progress.update(batch.num_rows)
+                continue
+
+            # keep a bounded number of shards in flight
+            if len(pending) >= 2 * workers:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    future.result()
+                    progress.update(pending.pop(future))
+
+            future = pool.submit(
+                _embed_shard,
+                shard_path,
+                batch.column("arxiv_id").to_pylist(),
+                batch.column("abstract").to_pylist(),
+                encode_batch_size,
+            )
+            pending[future] = batch.num_rows
+
+        for future in concurrent.futures.as_completed(pending):
+            future.result()
+            progress.update(pending[future])
+
+    for shard_path, shard_last_rowid in shards:
+        _merge_embedding_shard(conn, shard_path, shard_last_rowid)
+        os.remove(shard_path)
+    shutil.rmtree(shards_dir, ignore_errors=True)
 
 
 def create_withdrarxiv_embeddings(
     target_db: str = "withdrarxiv_embeddings.duckdb",
+    create_hnsw: bool = False,
+    export_matrix: bool = True,
+    batch_size: int = 100,
+    resume: bool = True,
+    parquet_path: str = None,
+    pipelined: bool = False,
+    encode_batch_size: int = 4,
+    queue_size: int = 4,
+    workers: int = 1,
+    shard_size: int = 1000,
+    load_pgvector: bool = None,
+    partitions: str = None,
+    n_partitions: int = None,
 ) -> str:
     """
     Create and store vector embeddings for the withdrarxiv dataset in a
@@ -211,10 +1117,59 @@ def create_withdrarxiv_embeddings(
     database. Embeddings are computed in batches and stored in a separate
     table for efficient retrieval and similarity search.
 
+    The `papers` table is walked once, in rowid order, and the last rowid
+    stored is checkpointed (in a `build_checkpoint` table) together with
+    each batch. A build that crashed or was killed resumes after the last
+    committed batch, and total build time grows linearly with the corpus.
+    Only an unfinished build from the same Parquet file (path and
+    modification time), model and embedding size is resumed; any other
+    database is rebuilt from scratch.
+
+    With `pipelined=True`, reading batches from DuckDB, encoding them and
+    writing embeddings run concurrently (a reader thread, an encoder
+    thread and the writer), connected by bounded queues, so the model or
+    the embedding API stays busy while batches are read and stored.
+
+    With `workers > 1`, papers are split into shards of `shard_size` which
+    are encoded by a pool of worker processes (each loading the embedding
+    model once) into Parquet files next to the database, then merged into
+    the `embeddings` table once all shards are encoded.
+
     Args:
         target_db (str, optional): Path to the DuckDB database where
             embeddings will be stored. Defaults to
             "src/manugen_ai/data/withdrarxiv_embeddings.duckdb".
+        create_hnsw (bool, optional): Whether to also build an HNSW
+            index over the embeddings (through DuckDB's `vss` extension)
+            for approximate search. Defaults to False.
+        export_matrix (bool, optional): Whether to also export the
+            embeddings as a memory-mappable `.npy` matrix next to the
+            database for the "matrix" search backend. Defaults to True.
+        batch_size (int, optional): Number of abstracts embedded and
+            committed per batch. Defaults to 100.
+        resume (bool, optional): Whether to resume an interrupted build
+            of `target_db` with the same inputs rather than starting from
+            scratch. Defaults to True.
+        parquet_path (str, optional): Path to the withdrarxiv Parquet
+            data. Defaults to "src/manugen_ai/data/withdrarxiv.parquet".
+        pipelined (bool, optional): Whether to overlap reading, encoding
+            and writing batches. Defaults to False.
+        encode_batch_size (int, optional): Number of abstracts the
+            FlagEmbedding model encodes at once. Defaults to 4.
+        queue_size (int, optional): Maximum number of batches waiting
+            between pipeline stages. Defaults to 4.
+        workers (int, optional): Number of worker processes encoding
+            shards of papers. Defaults to 1 (encode in this process).
+        shard_size (int, optional): Number of papers per shard when
+            `workers > 1`. Defaults to 1000.
+        load_pgvector (bool, optional): Whether to also copy the papers
+            and embeddings into Postgres with pgvector once built.
+            Defaults to USE_PGVECTOR.
+        partitions (str, optional): Also split the embeddings into
+            partitions by "subject" or "kmeans" clusters for the
+            "partitioned" search backend. Defaults to None (don't).
+        n_partitions (int, optional): Number of k-means partitions.
+            Defaults to the square root of the number of papers.
 
     Returns:
         str: The path to the DuckDB database containing the paper metadata
@@ -239,107 +1194,159 @@ def create_withdrarxiv_embeddings(
         target_db = f"withdrarxiv_embeddings_{get_model_name()}.duckdb"
 
     # Connect to (or create) your DuckDB database
-    conn = duckdb.connect(str(pathlib.Path(__file__).parent / "data" / target_db))
+    target_db_path = str(pathlib.Path(__file__).parent / "data" / target_db)
+    conn = duckdb.connect(target_db_path)
 
     # The data are preloaded manually due to download restrictions
     # from huggingface.
     # Download is available from:
     # https://huggingface.co/datasets/darpa-scify/withdrarxiv/
     # resolve/refs%2Fconvert%2Fparquet/default/train/0000.parquet?download=true
-    parquet_path = str(pathlib.Path(__file__).parent / "data" / "withdrarxiv.parquet")
-
-    # Create a DuckDB table "papers" from your Parquet
-    conn.execute(
-        f"""
-        CREATE OR REPLACE TABLE papers AS
-        SELECT
-          arxiv_id,
-          title,
-          abstract,
-          subjects,
-          scrubbed_comments,
-          category
-        FROM read_parquet('{parquet_path}')
-        WHERE category not in
-          ('subsumed by another publication',
-          'reason not specified')
-        """
-    )
-
-    conn.execute(
-        f"""
-        CREATE OR REPLACE TABLE embeddings (
-          arxiv_id VARCHAR,
-          embedding FLOAT[{get_embedding_size()}]
-        );
-        """
-    )
+    if parquet_path is None:
+        parquet_path = str(
+            pathlib.Path(__file__).parent / "data" / "withdrarxiv.parquet"
+        )
 
-    conn.create_function(
-        "embed", embed, [duckdb.typing.VARCHAR], f"FLOAT[{get_embedding_size()}]"
-    )
+    try:
+        build_inputs = _withdrarxiv_build_inputs(parquet_path)
+        resuming = resume and _can_resume_withdrarxiv_build(conn, build_inputs)
+
+        if not resuming:
+            # tables derived from the embeddings of an earlier build
+            for table in (
+                MATRIX_OFFSETS_TABLE,
+                PARTITIONS_TABLE,
+                PARTITION_CENTROIDS_TABLE,
+                PARTITIONED_EMBEDDINGS_TABLE,
+            ):
+                conn.execute(f"DROP TABLE IF EXISTS {table};")
+
+            # Create a DuckDB table "papers" from your Parquet
+            conn.execute(
+                f"""
+                CREATE OR REPLACE TABLE papers AS
+                SELECT
+                  arxiv_id,
+                  title,
+                  abstract,
+                  subjects,
+                  scrubbed_comments,
+                  category
+                FROM read_parquet('{parquet_path}')
+                WHERE category not in
+                  ('subsumed by another publication',
+                  'reason not specified')
+                """
+            )
 
-    # Batch-compute embeddings for every abstract
-    batch_size = 100
-    conn.cursor()
-    while True:
-        batch_table = conn.execute(
-            f"""
-        SELECT arxiv_id, abstract
-        FROM papers
-        WHERE arxiv_id NOT IN (SELECT arxiv_id FROM embeddings)
-        LIMIT {batch_size}
-        """
-        ).fetch_arrow_table()
+            conn.execute(
+                f"""
+                CREATE OR REPLACE TABLE embeddings (
+                  arxiv_id VARCHAR,
+                  embedding FLOAT[{get_embedding_size()}]
+                );
+                """
+            )
 
-        if batch_table.num_rows == 0:
-            break
+            # rowid of the last paper whose embedding has been stored, with
+            # the inputs of the build, so only the same build is resumed
+            conn.execute(
+                """
+                CREATE OR REPLACE TABLE build_checkpoint AS
+                SELECT
+                  -1::BIGINT AS last_rowid,
+                  $parquet_path::VARCHAR AS parquet_path,
+                  $parquet_mtime::DOUBLE AS parquet_mtime,
+                  $model_name::VARCHAR AS model_name,
+                  $embedding_size::INTEGER AS embedding_size,
+                  false AS completed,
+                  now() AS updated_at;
+                """,
+                build_inputs,
+            )
 
-        texts = batch_table["abstract"].to_pylist()
-        embs = embed_batch(texts)
+        last_rowid = conn.execute("SELECT last_rowid FROM build_checkpoint").fetchone()[
+            0
+        ]
+        total_rows = conn.execute("SELECT count(*) FROM papers").fetchone()[0]
+        done_rows = conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        if resuming:
+            logger.info(
+                "Resuming withdrarxiv embeddings build at %d/%d rows",
+                done_rows,
+                total_rows,
+            )
 
-        embedding_column = pa.array(embs.tolist(), type=pa.list_(pa.float32()))
-        batch_with_emb = batch_table.append_column("embedding", embedding_column)
+        progress = _BuildProgress(done_rows=done_rows, total_rows=total_rows)
+        if workers > 1:
+            shards_dir = pathlib.Path(f"{target_db_path}.shards")
+            if not resuming:
+                shutil.rmtree(shards_dir, ignore_errors=True)
+            _embed_papers_sharded(
+                conn,
+                last_rowid=last_rowid,
+                shards_dir=shards_dir,
+                workers=workers,
+                shard_size=shard_size,
+                encode_batch_size=encode_batch_size,
+                progress=progress,
+            )
+        else:
+            _embed_papers_streaming(
+                conn,
+                last_rowid=last_rowid,
+                batch_size=batch_size,
+                encode_batch_size=encode_batch_size,
+                pipelined=pipelined,
+                queue_size=queue_size,
+                progress=progress,
+            )
 
-        # Register and insert only id + embedding
-        conn.register("batch", batch_with_emb)
         conn.execute(
-            """
-        INSERT INTO embeddings
-        SELECT arxiv_id, embedding
-        FROM batch
-        """
+            "UPDATE build_checkpoint SET completed = true, updated_at = now();"
         )
-        conn.unregister("batch")
 
-    # ensure we close the connection
-    conn.close()
+        if _GEMINI_EMBEDDING_CLIENT is not None:
+            logger.info(
+                "Gemini embedding throughput: %s",
+                _GEMINI_EMBEDDING_CLIENT.throughput.summary(),
+            )
+
+        if create_hnsw:
+            create_hnsw_index(conn)
+
+        if partitions:
+            create_embedding_partitions(
+                conn,
+                embedding_size=get_embedding_size(),
+                method=partitions,
+                n_partitions=n_partitions,
+            )
+
+        if export_matrix:
+            export_embedding_matrix(
+                conn,
+                matrix_path=get_matrix_path(target_db_path),
+                embedding_size=get_embedding_size(),
+            )
+    finally:
+        # ensure we close the connection
+        conn.close()
+
+    if USE_PGVECTOR if load_pgvector is None else load_pgvector:
+        load_withdrarxiv_embeddings_into_pgvector(target_db_path)
 
     # return the target database path
     return target_db
 
 
-# Define a helper to search top-k papers by abstract similarity
-def search_withdrarxiv_embeddings(query: str, top_k: int = 2):
+def get_withdrarxiv_db_path() -> str:
     """
-    Search for papers related to a given abstract query using vector similarity.
-
-    Args:
-        query (str):
-          The abstract or query string to
-          search for similar papers.
-        top_k (int, optional):
-          The number of top similar papers to return.
-          Defaults to 2.
+    Get the local path to the precomputed withdrarxiv embeddings database
+    for the embedding model being used, downloading it if needed.
 
     Returns:
-        Dict[str, str]:
-          A dictionary containing the related
-          retraction reasons for the top matching papers.
-
-    Example:
-        >>> df = search_abstract("deep learning for protein folding", top_k=3)
-        >>> print(df.head())
+        str: The path to the DuckDB database.
     """
 
     # retrieve a precomputed embeddings database based on the model we're using
@@ -360,45 +1367,561 @@ def search_withdrarxiv_embeddings(query: str, top_k: int = 2):
             f"No embeddings file exists for model {model_name}, please run the embedding creation first."
         )
 
-    # construct path to the DuckDB database
-    target_db_path = str(
+    return download_file_if_not_available(
+        local_path=_get_withdrarxiv_local_db_path(model_name),
+        download_url=src_url,
+        # optionally verify the download against a known checksum
+        sha256=os.environ.get("WITHDRARXIV_EMBEDDINGS_SHA256") or None,
+    )
+
+
+def _get_withdrarxiv_local_db_path(model_name: str) -> str:
+    """
+    Get where the precomputed withdrarxiv embeddings database
+    for an embedding model is stored.
+    """
+    return str(
         pathlib.Path(__file__).parent
         / "data"
         / f"withdrarxiv_embeddings_{model_name}.duckdb"
     )
 
-    target_db = download_file_if_not_available(
-        local_path=target_db_path,
-        download_url=src_url,
-    )
 
-    conn = duckdb.connect(target_db)
-    conn.create_function(
-        "embed", embed, [duckdb.typing.VARCHAR], f"FLOAT[{get_embedding_size()}]"
+def export_withdrarxiv_partitions(
+    db_path: str = None, method: str = "kmeans", n_partitions: int = None
+) -> int:
+    """
+    Split the embeddings of a withdrarxiv database into partitions by
+    top-level arXiv subject or k-means clusters, for the "partitioned"
+    search backend, e.g. for a precomputed database that was downloaded.
+
+    Args:
+        db_path (str, optional): Path to the DuckDB database. Defaults to
+            the precomputed database for the embedding model being used.
+        method (str, optional): "subject" or "kmeans". Defaults to "kmeans".
+        n_partitions (int, optional): Number of k-means partitions.
+            Defaults to the square root of the number of papers.
+
+    Returns:
+        int: The number of partitions.
+    """
+    db_path = db_path or get_withdrarxiv_db_path()
+
+    conn = duckdb.connect(db_path)
+    try:
+        return create_embedding_partitions(
+            conn,
+            embedding_size=get_embedding_size(),
+            method=method,
+            n_partitions=n_partitions,
+        )
+    finally:
+        conn.close()
+
+
+def get_withdrarxiv_compact_db_path() -> str:
+    """
+    Get the local path to the compact first-pass vectors of the
+    withdrarxiv embeddings database for the embedding model being used,
+    downloading them from WITHDRARXIV_COMPACT_EMBEDDINGS_URL or building
+    them from the full database if needed.
+
+    Returns:
+        str: The path to the compact DuckDB database.
+    """
+    compact_db_path = get_compact_db_path(
+        _get_withdrarxiv_local_db_path(get_model_name())
     )
 
-    q = {"q": query, "k": top_k}
-    df = (
-        conn.execute(
-            """
-            WITH topk AS (
-              SELECT
-                arxiv_id,
-                array_inner_product(embedding, embed($q)) AS similarity
-              FROM embeddings
-              ORDER BY similarity DESC
-              LIMIT $k
-            )
-            SELECT
-              p.scrubbed_comments as related_retraction_reasons
-            FROM topk
-            JOIN papers p USING(arxiv_id)
-            ORDER BY similarity DESC;
-            """,
-            q,
+    if pathlib.Path(compact_db_path).is_file():
+        return compact_db_path
+    if WITHDRARXIV_COMPACT_EMBEDDINGS_URL:
+        return download_file_if_not_available(
+            local_path=compact_db_path,
+            download_url=WITHDRARXIV_COMPACT_EMBEDDINGS_URL,
+            sha256=os.environ.get("WITHDRARXIV_COMPACT_EMBEDDINGS_SHA256") or None,
         )
-        .df()
-        .to_json(orient="records")
+    return export_withdrarxiv_compact_db(compact_db_path=compact_db_path)
+
+
+def export_withdrarxiv_embedding_matrix(db_path: str = None) -> str:
+    """
+    Export the embeddings of a withdrarxiv database as a memory-mappable
+    `.npy` matrix (with an `embedding_offsets` table) for the "matrix"
+    search backend, e.g. for a precomputed database that was downloaded.
+
+    Args:
+        db_path (str, optional): Path to the DuckDB database. Defaults to
+            the precomputed database for the embedding model being used.
+
+    Returns:
+        str: The path to the exported matrix.
+    """
+    db_path = db_path or get_withdrarxiv_db_path()
+
+    conn = duckdb.connect(db_path)
+    matrix_path = export_embedding_matrix(
+        conn,
+        matrix_path=get_matrix_path(db_path),
+        embedding_size=get_embedding_size(),
     )
     conn.close()
-    return df
+
+    return matrix_path
+
+
+def export_withdrarxiv_compact_db(
+    db_path: str = None, compact_db_path: str = None
+) -> str:
+    """
+    Write the compact first-pass vectors of a withdrarxiv embeddings
+    database for the "compact" search backend, as WITHDRARXIV_COMPACT_DTYPE
+    vectors of WITHDRARXIV_COMPACT_DIM components.
+
+    Args:
+        db_path (str, optional): Path to the DuckDB database. Defaults to
+            the precomputed database for the embedding model being used.
+        compact_db_path (str, optional): Where to write the compact
+            database. Defaults to `get_compact_db_path(db_path)`.
+
+    Returns:
+        str: The path to the compact database.
+    """
+    db_path = db_path or get_withdrarxiv_db_path()
+
+    return export_compact_embeddings(
+        db_path,
+        compact_db_path=compact_db_path or get_compact_db_path(db_path),
+        embedding_size=get_embedding_size(),
+        dtype=WITHDRARXIV_COMPACT_DTYPE,
+        dim=WITHDRARXIV_COMPACT_DIM,
+    )
+
+
+def get_withdrarxiv_manifest_path() -> str:
+    """
+    Get the path of the manifest naming the current withdrarxiv
+    embeddings database for the embedding model being used.
+    """
+    return WITHDRARXIV_MANIFEST_PATH or get_manifest_path(
+        _get_withdrarxiv_local_db_path(get_model_name())
+    )
+
+
+def publish_withdrarxiv_embeddings(
+    db_path: str, version: str, manifest_path: str = None
+) -> EmbeddingDatabaseManifest:
+    """
+    Publish a withdrarxiv embeddings database by writing its manifest;
+    running workers switch to it on their next search (through its
+    compact first-pass vectors, when they are exported next to it).
+
+    Args:
+        db_path (str): The database to publish, in the manifest's directory
+            and under a file name not used by a previous version.
+        version (str): The database's version.
+        manifest_path (str, optional): Where to write the manifest.
+            Defaults to `get_withdrarxiv_manifest_path()`.
+
+    Returns:
+        EmbeddingDatabaseManifest: The written manifest.
+    """
+    return write_manifest(
+        manifest_path or get_withdrarxiv_manifest_path(),
+        db_path=db_path,
+        version=version,
+        model=get_model_name(),
+        embedding_size=get_embedding_size(),
+    )
+
+
+def _get_manifest_stat(manifest_path: str) -> tuple | None:
+    """
+    Identify the current version of a manifest file
+    without reading it, or None if it doesn't exist.
+    """
+    try:
+        stat = os.stat(manifest_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def load_withdrarxiv_embeddings_into_pgvector(db_path: str = None) -> int:
+    """
+    Copy the papers and embeddings of a withdrarxiv DuckDB database into
+    Postgres (PGVECTOR_CONN_STRING) with an HNSW index, for USE_PGVECTOR.
+
+    Args:
+        db_path (str, optional): Path to the DuckDB database. Defaults to
+            the precomputed database for the embedding model being used.
+
+    Returns:
+        int: The number of embeddings loaded.
+    """
+    from manugen_ai.pgvector_search import (
+        get_pgvector_table_names,
+        load_duckdb_into_pgvector,
+    )
+
+    db_path = db_path or get_withdrarxiv_db_path()
+    tables = get_pgvector_table_names(get_model_name())
+
+    return load_duckdb_into_pgvector(
+        db_path,
+        dsn=PGVECTOR_CONN_STRING,
+        papers_table=tables["papers"],
+        embeddings_table=tables["embeddings"],
+        embedding_size=get_embedding_size(),
+    )
+
+
+def _create_pgvector_search_engine():
+    """
+    Create a search engine for the withdrarxiv embeddings in Postgres.
+    """
+    from manugen_ai.pgvector_search import (
+        PgvectorSearchEngine,
+        get_pgvector_table_names,
+    )
+
+    tables = get_pgvector_table_names(get_model_name())
+
+    return PgvectorSearchEngine(
+        dsn=PGVECTOR_CONN_STRING,
+        embed_fn=embed,
+        embed_batch_fn=embed_batch,
+        embedding_size=get_embedding_size(),
+        papers_table=tables["papers"],
+        embeddings_table=tables["embeddings"],
+        backend=PGVECTOR_SEARCH_BACKEND,
+        hnsw_ef_search=(
+            int(WITHDRARXIV_HNSW_EF_SEARCH) if WITHDRARXIV_HNSW_EF_SEARCH else None
+        ),
+        max_connections=PGVECTOR_MAX_CONNECTIONS,
+    )
+
+
+def _create_withdrarxiv_search_engine(db_path: str) -> WithdrarxivSearchEngine:
+    """
+    Create a search engine for a withdrarxiv embeddings database.
+    """
+    return WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=embed,
+        embed_batch_fn=embed_batch,
+        embedding_size=get_embedding_size(),
+        backend=WITHDRARXIV_SEARCH_BACKEND,
+        hnsw_ef_search=(
+            int(WITHDRARXIV_HNSW_EF_SEARCH) if WITHDRARXIV_HNSW_EF_SEARCH else None
+        ),
+        compact_rerank_candidates=WITHDRARXIV_COMPACT_RERANK_CANDIDATES,
+        nprobe=WITHDRARXIV_NPROBE,
+    )
+
+
+# singleton for the withdrarxiv search engine
+# set the first time get_withdrarxiv_search_engine() is called,
+# and replaced when a new database is published in the manifest
+_SEARCH_ENGINE = None
+# the manifest version (see _get_manifest_stat) _SEARCH_ENGINE was created for
+_SEARCH_ENGINE_MANIFEST_STAT = None
+# thread validating and loading a newly published database, if any
+_SEARCH_ENGINE_SWITCH = None
+_SEARCH_ENGINE_LOCK = threading.Lock()
+
+
+def _create_withdrarxiv_manifest_search_engine(
+    manifest_path: str,
+) -> WithdrarxivSearchEngine:
+    """
+    Validate the database named by a manifest and create a search engine for it.
+    """
+    manifest = read_manifest(manifest_path)
+    db_path = validate_manifest(
+        manifest_path,
+        manifest,
+        model=get_model_name(),
+        embedding_size=get_embedding_size(),
+        verify_checksum=WITHDRARXIV_MANIFEST_VERIFY_CHECKSUM,
+    )
+    engine = _create_withdrarxiv_search_engine(db_path)
+    logger.info(
+        "Searching withdrarxiv embeddings version %s (%s)", manifest.version, db_path
+    )
+    return engine
+
+
+def _switch_withdrarxiv_search_engine(manifest_path: str, manifest_stat: tuple):
+    """
+    Switch to the database named by a changed manifest, retiring the
+    previous engine, or keep the previous one if the database is invalid.
+    """
+    global _SEARCH_ENGINE, _SEARCH_ENGINE_MANIFEST_STAT
+
+    try:
+        engine = _create_withdrarxiv_manifest_search_engine(manifest_path)
+    except (OSError, ValueError, duckdb.Error) as e:
+        logger.error("Not switching withdrarxiv embeddings: %s", e)
+        engine = None
+
+    with _SEARCH_ENGINE_LOCK:
+        previous = _SEARCH_ENGINE
+        if engine is not None:
+            _SEARCH_ENGINE = engine
+        _SEARCH_ENGINE_MANIFEST_STAT = manifest_stat
+
+    if engine is not None and previous is not None:
+        # closed once the searches still using it are done
+        previous.retire()
+
+
+def get_withdrarxiv_search_engine():
+    """
+    Get the search engine for the withdrarxiv embeddings database.
+
+    The engine (and its read-only DuckDB connection) is created once per
+    process and reused across calls, so searches don't pay for opening
+    the database each time.
+
+    When a manifest exists (see `publish_withdrarxiv_embeddings`), the
+    engine searches the database it names once the manifest is validated.
+    Each call checks whether the manifest changed, and if so, validates
+    and loads the newly published database in a background thread while
+    searches continue on the current engine. Once loaded, searches switch
+    to the new engine, and the previous one is closed when the searches
+    using it (see `_use_withdrarxiv_search_engine`) are done. A new
+    database which fails validation is logged and ignored.
+
+    With USE_PGVECTOR, the engine searches Postgres instead, through a
+    pool of connections shared by its searches.
+
+    Returns:
+        WithdrarxivSearchEngine | PgvectorSearchEngine:
+            The initialized search engine.
+    """
+    global _SEARCH_ENGINE, _SEARCH_ENGINE_MANIFEST_STAT, _SEARCH_ENGINE_SWITCH
+
+    if USE_PGVECTOR:
+        with _SEARCH_ENGINE_LOCK:
+            if _SEARCH_ENGINE is None:
+                _SEARCH_ENGINE = _create_pgvector_search_engine()
+        return _SEARCH_ENGINE
+
+    manifest_path = get_withdrarxiv_manifest_path()
+    manifest_stat = _get_manifest_stat(manifest_path)
+    engine = _SEARCH_ENGINE
+    if engine is not None and manifest_stat in (None, _SEARCH_ENGINE_MANIFEST_STAT):
+        return engine
+
+    with _SEARCH_ENGINE_LOCK:
+        if _SEARCH_ENGINE is None:
+            # nothing to search yet, so load the database in this thread
+            if manifest_stat is None:
+                db_path = get_withdrarxiv_db_path()
+                if WITHDRARXIV_COMPACT_EMBEDDINGS:
+                    # exported or downloaded next to the database, where
+                    # the engine finds them
+                    get_withdrarxiv_compact_db_path()
+                _SEARCH_ENGINE = _create_withdrarxiv_search_engine(db_path)
+            else:
+                _SEARCH_ENGINE = _create_withdrarxiv_manifest_search_engine(
+                    manifest_path
+                )
+            _SEARCH_ENGINE_MANIFEST_STAT = manifest_stat
+        elif _SEARCH_ENGINE_SWITCH is None or not _SEARCH_ENGINE_SWITCH.is_alive():
+            # validating a database reads all of it, so do it (and load
+            # the database) without holding up this search
+            _SEARCH_ENGINE_SWITCH = threading.Thread(
+                target=_switch_withdrarxiv_search_engine,
+                args=(manifest_path, manifest_stat),
+                name="withdrarxiv-switch",
+                daemon=True,
+            )
+            _SEARCH_ENGINE_SWITCH.start()
+        return _SEARCH_ENGINE
+
+
+@contextlib.contextmanager
+def _use_withdrarxiv_search_engine():
+    """
+    Get the search engine for a search, keeping it open until the search
+    is done even if a newly published database replaces it meanwhile.
+    """
+    engine = get_withdrarxiv_search_engine()
+    if USE_PGVECTOR:
+        yield engine
+        return
+
+    # the engine may have been replaced, and closed, since it was returned
+    while not engine.acquire():
+        replacement = get_withdrarxiv_search_engine()
+        if replacement is engine:
+            raise RuntimeError("The withdrarxiv search engine was closed.")
+        engine = replacement
+    try:
+        yield engine
+    finally:
+        engine.release()
+
+
+# threads running withdrarxiv searches for async callers; DuckDB releases the
+# GIL while it scans, so searches run in parallel off the event loop
+WITHDRARXIV_SEARCH_THREADS = int(os.environ.get("WITHDRARXIV_SEARCH_THREADS", "4"))
+
+# singleton for the search thread pool
+# set the first time get_withdrarxiv_search_executor() is called
+_SEARCH_EXECUTOR = None
+_SEARCH_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_withdrarxiv_search_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """
+    Get the pool of threads running withdrarxiv searches for async callers.
+
+    Returns:
+        concurrent.futures.ThreadPoolExecutor: The initialized pool.
+    """
+    global _SEARCH_EXECUTOR
+
+    with _SEARCH_EXECUTOR_LOCK:
+        if _SEARCH_EXECUTOR is None:
+            _SEARCH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+                max_workers=WITHDRARXIV_SEARCH_THREADS,
+                thread_name_prefix="withdrarxiv-search",
+            )
+
+    return _SEARCH_EXECUTOR
+
+
+def _format_search_results(results: list[dict[str, Any]]) -> str:
+    """
+    Format withdrarxiv search results as the JSON returned by the search tools.
+    """
+    return json.dumps(
+        [
+            {"related_retraction_reasons": result["related_retraction_reasons"]}
+            for result in results
+        ]
+    )
+
+
+# Define a helper to search top-k papers by abstract similarity
+def search_withdrarxiv_embeddings(query: str, top_k: int = 2):
+    """
+    Search for papers related to a given abstract query using vector similarity.
+
+    Args:
+        query (str):
+          The abstract or query string to
+          search for similar papers.
+        top_k (int, optional):
+          The number of top similar papers to return.
+          Defaults to 2.
+
+    Returns:
+        str:
+          A JSON list of records containing the related
+          retraction reasons for the top matching papers.
+
+    Example:
+        >>> results = search_withdrarxiv_embeddings(
+        ...     "deep learning for protein folding", top_k=3
+        ... )
+        >>> print(results)
+    """
+
+    with _use_withdrarxiv_search_engine() as engine:
+        results = engine.search(query, top_k=top_k)
+
+    return _format_search_results(results)
+
+
+def _search_withdrarxiv_vector(vector: np.ndarray, top_k: int):
+    """
+    Search the withdrarxiv embeddings with a query embedding.
+    """
+    with _use_withdrarxiv_search_engine() as engine:
+        return engine.search_vector(vector, top_k=top_k)
+
+
+async def asearch_withdrarxiv_embeddings(query: str, top_k: int = 2) -> str:
+    """
+    Search for papers related to a given abstract query using vector similarity.
+
+    Args:
+        query (str):
+          The abstract or query string to
+          search for similar papers.
+        top_k (int, optional):
+          The number of top similar papers to return.
+          Defaults to 2.
+
+    Returns:
+        str:
+          A JSON list of records containing the related
+          retraction reasons for the top matching papers.
+
+    Example:
+        >>> results = await asearch_withdrarxiv_embeddings(
+        ...     "deep learning for protein folding", top_k=3
+        ... )
+        >>> print(results)
+    """
+    # the async counterpart of search_withdrarxiv_embeddings() for agent tools:
+    # the query is embedded by the async Gemini client or in the FlagEmbedding
+    # process pool, and the search (including opening the database)
+    # runs in the search thread pool, so the event loop keeps serving other
+    # sessions meanwhile
+    vector = (await aembed_batch([query]))[0]
+    results = await asyncio.get_running_loop().run_in_executor(
+        get_withdrarxiv_search_executor(),
+        _search_withdrarxiv_vector,
+        vector,
+        top_k,
+    )
+
+    return _format_search_results(results)
+
+
+def search_withdrarxiv_embeddings_batch(queries: list[str], top_k: int = 2):
+    """
+    Search for papers related to each of several abstract queries at once.
+
+    All queries are embedded with a single `embed_batch` call and scored
+    together, which is much faster than calling
+    `search_withdrarxiv_embeddings` per query for audits of many
+    manuscripts or paragraph-level retrieval over long drafts.
+
+    Args:
+        queries (list[str]):
+          The abstracts or query strings to
+          search for similar papers.
+        top_k (int, optional):
+          The number of top similar papers to return per query.
+          Defaults to 2.
+
+    Returns:
+        str:
+          A JSON list with one list of records per query (in query order),
+          containing the related retraction reasons for its top matching papers.
+
+    Example:
+        >>> results = search_withdrarxiv_embeddings_batch(
+        ...     ["deep learning for protein folding", "CRISPR screens"], top_k=3
+        ... )
+        >>> print(results)
+    """
+
+    with _use_withdrarxiv_search_engine() as engine:
+        results = engine.search_batch(queries, top_k=top_k)
+
+    return json.dumps(
+        [
+            [
+                {"related_retraction_reasons": result["related_retraction_reasons"]}
+                for result in query_results
+            ]
+            for query_results in results
+        ]
+    )
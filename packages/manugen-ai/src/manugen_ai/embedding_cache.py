@@ -0,0 +1,227 @@
+"""
+Content-addressed cache for text embeddings.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import hashlib
+import pathlib
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def hash_text(text: str) -> str:
+    """
+    Hash a text for use as an embedding cache key.
+
+    Args:
+        text (str): The text to hash.
+
+    Returns:
+        str: The hex SHA-256 digest of the UTF-8 encoded text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Cache embeddings by (model name, text hash) in a SQLite database,
+    with an in-memory LRU of recently used embeddings in front of it.
+
+    Args:
+        path (str): Path to the SQLite database (created if needed).
+        memory_size (int): Embeddings kept in the in-memory LRU.
+    """
+
+    def __init__(self, path: str, memory_size: int = 4096):
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.memory_size = memory_size
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+              model TEXT NOT NULL,
+              text_hash TEXT NOT NULL,
+              embedding BLOB NOT NULL,
+              PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _remember(self, key: Tuple[str, str], embedding: np.ndarray) -> None:
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up the cached embeddings of texts.
+
+        Args:
+            model (str): The embedding model name.
+            texts (List[str]): The texts to look up.
+
+        Returns:
+            List[Optional[np.ndarray]]: The embedding of each text,
+            or None when it isn't cached.
+        """
+        keys = [(model, hash_text(text)) for text in texts]
+        found = {}
+        with self._lock:
+            from_memory = {key for key in keys if key in self._memory}
+            for key in from_memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+
+            on_disk = list({text_hash for _, text_hash in keys} - {h for _, h in found})
+            # stay below SQLite's limit on bound parameters
+            for start in range(0, len(on_disk), 500):
+                chunk = on_disk[start : start + 500]
+                rows = self._conn.execute(
+                    f"""
+                    SELECT text_hash, embedding FROM embeddings
+                    WHERE model = ? AND text_hash IN ({",".join("?" * len(chunk))})
+                    """,
+                    [model, *chunk],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    key = (model, text_hash)
+                    found[key] = np.frombuffer(blob, dtype=np.float32).copy()
+                    self._remember(key, found[key])
+
+            for key in keys:
+                if key in from_memory:
+                    self.memory_hits += 1
+                elif key in found:
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+
+        return [found.get(key) for key in keys]
+
+    def put_many(self, model: str, texts: List[str], embeddings: np.ndarray) -> None:
+        """
+        Store the embeddings of texts.
+
+        Args:
+            model (str): The embedding model name.
+            texts (List[str]): The embedded texts.
+            embeddings (np.ndarray): One embedding per text.
+        """
+        rows = [
+            (model, hash_text(text), np.asarray(embedding, dtype=np.float32))
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [(m, h, embedding.tobytes()) for m, h, embedding in rows],
+            )
+            self._conn.commit()
+            for m, h, embedding in rows:
+                self._remember((m, h), embedding)
+
+    def _plan(self, model: str, texts: List[str]):
+        cached = self.get_many(model, texts)
+        # embed each missing text once, even if it's repeated in the batch
+        missing = list(dict.fromkeys(t for t, e in zip(texts, cached) if e is None))
+        return cached, missing
+
+    def _assemble(
+        self,
+        model: str,
+        texts: List[str],
+        cached: List[Optional[np.ndarray]],
+        missing: List[str],
+        embeddings: np.ndarray,
+        embedding_size: Optional[int],
+    ) -> np.ndarray:
+        if not texts:
+            return np.empty((0, embedding_size or 0), dtype=np.float32)
+        if missing:
+            self.put_many(model, missing, embeddings)
+            computed = dict(zip(missing, embeddings))
+            cached = [
+                computed[text] if embedding is None else embedding
+                for text, embedding in zip(texts, cached)
+            ]
+        return np.array(cached, dtype=np.float32)
+
+    def get_or_embed(
+        self,
+        model: str,
+        texts: List[str],
+        embed_fn: Callable[[List[str]], np.ndarray],
+        embedding_size: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Get the embeddings of texts, embedding only those not cached.
+
+        Args:
+            model (str): The embedding model name.
+            texts (List[str]): The texts to embed.
+            embed_fn (Callable): Embeds a list of texts.
+            embedding_size (int, optional): Components per embedding,
+                giving the shape of the result for no texts.
+
+        Returns:
+            np.ndarray: A float32 array with one embedding per text.
+        """
+        cached, missing = self._plan(model, texts)
+        embeddings = embed_fn(missing) if missing else None
+        return self._assemble(model, texts, cached, missing, embeddings, embedding_size)
+
+    async def aget_or_embed(
+        self,
+        model: str,
+        texts: List[str],
+        embed_fn: Callable[[List[str]], Awaitable[np.ndarray]],
+        embedding_size: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Like `get_or_embed`, but awaiting an async `embed_fn`, with the
+        cache's SQLite reads and writes run in a worker thread so they
+        don't block the event loop.
+        """
+        cached, missing = await asyncio.to_thread(self._plan, model, texts)
+        embeddings = await embed_fn(missing) if missing else None
+        return await asyncio.to_thread(
+            self._assemble, model, texts, cached, missing, embeddings, embedding_size
+        )
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Summarize the cache's hits and misses so far.
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "lookups": lookups,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self) -> None:
+        """
+        Close the SQLite connection.
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,304 @@
+"""
+Embedding providers: interchangeable text embedding models behind one
+interface, selected by name from a registry.
+
+`manugen_ai.data` registers the built-in providers ("gemini", "bge-m3"
+and "hashing") and picks one with EMBEDDING_PROVIDER. Other providers can
+be added with `register_embedding_provider` without changing the
+functions which embed texts, build the withdrarxiv database or search it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import re
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+class EmbeddingProvider:
+    """
+    A text embedding model.
+
+    Subclasses implement `encode_batch`; `encode` and `aencode_batch`
+    default to calling it (the latter in a worker thread). Providers
+    should load models or create API clients on first use rather than
+    when they are created.
+    """
+
+    # registry name, e.g. "bge-m3"
+    name: str = ""
+
+    @property
+    def model_name(self) -> str:
+        """
+        Name of the embedding model, used in withdrarxiv database file
+        names and manifests.
+        """
+        raise NotImplementedError
+
+    @property
+    def dimension(self) -> int:
+        """
+        Number of components in each embedding.
+        """
+        raise NotImplementedError
+
+    @property
+    def cache_model(self) -> str:
+        """
+        Name of the embedding model in embedding cache keys; it includes
+        any option which changes the embeddings.
+        """
+        return self.model_name
+
+    @property
+    def max_concurrency(self) -> int:
+        """
+        Number of batches worth embedding in one `encode_batch` call so
+        that requests overlap (e.g. for a remote API).
+        """
+        return 1
+
+    def encode(self, text: str) -> np.ndarray:
+        """
+        Embed one text.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            np.ndarray: A float32 vector of shape (dimension,).
+        """
+        return self.encode_batch([text])[0]
+
+    def encode_batch(self, texts: List[str], batch_size: int = 4) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            batch_size (int, optional): Number of texts a local model
+                encodes at once. Defaults to 4.
+
+        Returns:
+            np.ndarray: A float32 array of shape (len(texts), dimension).
+        """
+        raise NotImplementedError
+
+    async def aencode_batch(self, texts: List[str], batch_size: int = 4) -> np.ndarray:
+        """
+        Embed a batch of texts without blocking the event loop.
+        """
+        return await asyncio.to_thread(self.encode_batch, texts, batch_size)
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """
+    Gemini embeddings through an `AsyncGeminiEmbeddingClient`.
+
+    Args:
+        get_client (Callable[[], AsyncGeminiEmbeddingClient]):
+            Returns the (shared) embedding client; called on first use.
+        model_name (str): The Gemini embedding model.
+        dimension (int, optional): Embedding size. Defaults to 768.
+        max_concurrency (int, optional): Requests the client keeps in
+            flight. Defaults to 1.
+    """
+
+    name = "gemini"
+
+    def __init__(
+        self,
+        get_client: Callable,
+        model_name: str,
+        dimension: int = 768,
+        max_concurrency: int = 1,
+    ):
+        self.get_client = get_client
+        self._model_name = model_name
+        self._dimension = dimension
+        self._max_concurrency = max_concurrency
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    def encode_batch(self, texts: List[str], batch_size: int = 4) -> np.ndarray:
+        return self.get_client().embed_sync(texts).astype(np.float32)
+
+    async def aencode_batch(self, texts: List[str], batch_size: int = 4) -> np.ndarray:
+        return (await self.get_client().embed(texts)).astype(np.float32)
+
+
+class FlagEmbeddingProvider(EmbeddingProvider):
+    """
+    A FlagEmbedding model such as BAAI/bge-m3, run in this process or by
+    an embedding service.
+
+    Args:
+        model_or_path (str): Hugging Face model name or local path.
+        encode_fn (Callable[[List[str], int], np.ndarray]):
+            Encodes texts with the model given a batch size.
+        dimension (int, optional): Embedding size. Defaults to 1024.
+        max_length (int, optional): Maximum tokens per text, if texts
+            are truncated. Defaults to None.
+        get_executor (Callable[[], Executor | None], optional):
+            Returns the executor `aencode_batch` runs `encode_fn` in, e.g.
+            a process pool so encoding doesn't hold this process's GIL
+            (`encode_fn` must then be picklable). Defaults to None, or
+            when it returns None, a worker thread.
+    """
+
+    name = "bge-m3"
+
+    def __init__(
+        self,
+        model_or_path: str,
+        encode_fn: Callable[[List[str], int], np.ndarray],
+        dimension: int = 1024,
+        max_length: int | None = None,
+        get_executor: Callable[[], concurrent.futures.Executor | None] | None = None,
+    ):
+        self.model_or_path = model_or_path
+        self.encode_fn = encode_fn
+        self._dimension = dimension
+        self.max_length = max_length
+        self.get_executor = get_executor
+
+    @property
+    def model_name(self) -> str:
+        return self.model_or_path.split("/")[-1]
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    @property
+    def cache_model(self) -> str:
+        # truncation changes long texts' embeddings
+        if self.max_length:
+            return f"{self.model_name}@max_length={self.max_length}"
+        return self.model_name
+
+    def encode_batch(self, texts: List[str], batch_size: int = 4) -> np.ndarray:
+        return self.encode_fn(texts, batch_size).astype(np.float32)
+
+    async def aencode_batch(self, texts: List[str], batch_size: int = 4) -> np.ndarray:
+        executor = self.get_executor() if self.get_executor else None
+        if executor is None:
+            return await super().aencode_batch(texts, batch_size)
+        embs = await asyncio.get_running_loop().run_in_executor(
+            executor, self.encode_fn, texts, batch_size
+        )
+        return embs.astype(np.float32)
+
+
+@functools.lru_cache(maxsize=2**16)
+def _hash_word(word: str) -> int:
+    """
+    Hash a word to a 64-bit integer, the same in every process.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    A fast, deterministic embedding for tests and benchmarks which needs
+    no model, network or GPU.
+
+    Each lowercased word is hashed to a component and a sign (the
+    "hashing trick"), and the counts are normalized to a unit vector, so
+    texts sharing words have similar embeddings and every process embeds
+    a text the same way. It doesn't capture meaning; don't use it to
+    search the withdrarxiv database in production.
+
+    Args:
+        dimension (int, optional): Embedding size. Defaults to 256.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimension: int = 256):
+        self._dimension = dimension
+
+    @property
+    def model_name(self) -> str:
+        return f"hashing-{self._dimension}"
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode_batch(self, texts: List[str], batch_size: int = 4) -> np.ndarray:
+        embs = np.zeros((len(texts), self._dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                digest = _hash_word(word)
+                embs[row, digest % self._dimension] += 1.0 if digest >> 63 else -1.0
+        norms = np.linalg.norm(embs, axis=1, keepdims=True)
+        return embs / np.where(norms > 0, norms, 1.0)
+
+    async def aencode_batch(self, texts: List[str], batch_size: int = 4) -> np.ndarray:
+        return self.encode_batch(texts, batch_size)
+
+
+# factories creating each registered provider, by name
+_PROVIDER_FACTORIES: Dict[str, Callable[[], EmbeddingProvider]] = {}
+
+
+def register_embedding_provider(
+    name: str, factory: Callable[[], EmbeddingProvider]
+) -> None:
+    """
+    Register (or replace) an embedding provider.
+
+    Args:
+        name (str): The name the provider is selected by,
+            e.g. with EMBEDDING_PROVIDER.
+        factory (Callable[[], EmbeddingProvider]): Creates the provider
+            (cheaply; models should load on first use).
+    """
+    _PROVIDER_FACTORIES[name] = factory
+
+
+def get_embedding_provider_names() -> List[str]:
+    """
+    Get the names of the registered embedding providers.
+    """
+    return sorted(_PROVIDER_FACTORIES)
+
+
+def create_embedding_provider(name: str) -> EmbeddingProvider:
+    """
+    Create a registered embedding provider.
+
+    Args:
+        name (str): The provider's registry name.
+
+    Returns:
+        EmbeddingProvider: The new provider.
+
+    Raises:
+        ValueError: If no provider is registered under `name`.
+    """
+    if name not in _PROVIDER_FACTORIES:
+        raise ValueError(
+            f"Unknown embedding provider {name}, "
+            f"expected one of {get_embedding_provider_names()}."
+        )
+    return _PROVIDER_FACTORIES[name]()
@@ -0,0 +1,302 @@
+"""
+Embedding sidecar service: one process loads the embedding model and
+serves `embed()` requests from other processes (e.g. uvicorn workers),
+gathering concurrent requests into dynamic micro-batches.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextlib
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+import numpy as np
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+def parse_service_url(url: str) -> Tuple[str, str | None]:
+    """
+    Split an embedding service URL into an HTTP base URL and,
+    for `unix://` URLs, the path of the Unix socket.
+
+    Args:
+        url (str): e.g. "http://127.0.0.1:8765" or "unix:///tmp/embed.sock".
+
+    Returns:
+        Tuple[str, str | None]: The base URL and the socket path (or None).
+    """
+    if url.startswith("unix://"):
+        return "http://embedding-service", url[len("unix://") :]
+    return url.rstrip("/"), None
+
+
+class EmbedRequest(BaseModel):
+    """
+    Body of a request to the embedding service's /embed route.
+    """
+
+    texts: List[str]
+
+
+class MicroBatcher:
+    """
+    Gather concurrent embedding requests into micro-batches.
+
+    The first pending request opens a batch, which is encoded as soon as
+    it holds `max_batch_size` texts or `max_wait_ms` have passed. Batches
+    are encoded one at a time on a single worker thread, so the model is
+    never called concurrently and the event loop stays responsive.
+
+    Args:
+        encode_fn (Callable[[List[str]], np.ndarray]): Encodes a list of texts.
+        max_batch_size (int): Texts encoded at most per batch.
+        max_wait_ms (float): Time a batch waits for more requests once opened.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self.batches = 0
+        self.texts = 0
+        self._queue = None
+        self._task = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def start(self) -> None:
+        """
+        Start gathering requests on the running event loop.
+        """
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop gathering requests and release the encoding thread.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts as part of the next micro-batch(es).
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            np.ndarray: A float32 array with one embedding per text.
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future))
+            futures.append(future)
+        return np.array(await asyncio.gather(*futures), dtype=np.float32)
+
+    async def _next_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            texts = [text for text, _ in batch]
+            try:
+                embs = await loop.run_in_executor(self._executor, self.encode_fn, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            for (_, future), emb in zip(batch, embs):
+                if not future.done():
+                    future.set_result(emb)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Summarize the batches encoded so far.
+        """
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+        }
+
+
+def create_embedding_app(
+    encode_fn: Callable[[List[str]], np.ndarray],
+    model_name: str,
+    max_batch_size: int = 32,
+    max_wait_ms: float = 5.0,
+):
+    """
+    Create the embedding service's FastAPI app.
+
+    Routes:
+        - POST /embed with `{"texts": [...]}` returns `{"embeddings": [[...]]}`.
+        - GET /health returns the model name and micro-batching counters.
+
+    Args:
+        encode_fn (Callable[[List[str]], np.ndarray]): Encodes a list of texts.
+        model_name (str): Name of the embedding model, reported by /health.
+        max_batch_size (int): Texts encoded at most per micro-batch.
+        max_wait_ms (float): Time a micro-batch waits for more requests.
+
+    Returns:
+        fastapi.FastAPI: The app.
+    """
+    from fastapi import FastAPI, Response
+
+    batcher = MicroBatcher(
+        encode_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+    )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        batcher.start()
+        yield
+        await batcher.stop()
+
+    app = FastAPI(title="Manugen AI embedding service", lifespan=lifespan)
+    app.state.batcher = batcher
+
+    @app.post("/embed")
+    async def embed(request: EmbedRequest):
+        embs = await batcher.embed(request.texts)
+        # serialize directly, skipping FastAPI's much slower jsonable_encoder
+        return Response(
+            content=json.dumps({"embeddings": embs.tolist()}),
+            media_type="application/json",
+        )
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "model": model_name, **batcher.summary()}
+
+    return app
+
+
+def serve_embedding_app(app, url: str) -> None:
+    """
+    Serve an embedding service app on a localhost HTTP or `unix://` URL.
+
+    Args:
+        app (fastapi.FastAPI): The app, from `create_embedding_app`.
+        url (str): Where to listen, as for `parse_service_url`.
+    """
+    import uvicorn
+
+    base_url, uds = parse_service_url(url)
+    if uds is not None:
+        uvicorn.run(app, uds=uds, log_level="warning")
+    else:
+        parsed = httpx.URL(base_url)
+        uvicorn.run(app, host=parsed.host, port=parsed.port, log_level="warning")
+
+
+class EmbeddingServiceClient:
+    """
+    Embed texts through an embedding service.
+
+    Args:
+        url (str): The service URL, as for `parse_service_url`.
+        timeout_s (float): Timeout for each request.
+    """
+
+    def __init__(self, url: str, timeout_s: float = 60.0):
+        self.url = url
+        base_url, uds = parse_service_url(url)
+        # retry connecting, e.g. while the service is still loading its model
+        transport = httpx.HTTPTransport(uds=uds, retries=3)
+        self._client = httpx.Client(
+            base_url=base_url, transport=transport, timeout=timeout_s
+        )
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts with the service's model.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            np.ndarray: A float32 array with one embedding per text.
+        """
+        response = self._client.post("/embed", json={"texts": list(texts)})
+        response.raise_for_status()
+        return np.array(response.json()["embeddings"], dtype=np.float32)
+
+    def health(self) -> Dict:
+        """
+        Get the service's model name and micro-batching counters.
+        """
+        response = self._client.get("/health")
+        response.raise_for_status()
+        return response.json()
+
+    def wait_until_ready(
+        self, timeout_s: float = 600.0, interval_s: float = 0.5
+    ) -> Dict:
+        """
+        Wait until the service answers its health check, e.g. while it is
+        still loading its model after being started.
+
+        Args:
+            timeout_s (float): Longest time to wait.
+            interval_s (float): Time between health checks.
+
+        Returns:
+            Dict: The service's health, as for `health`.
+
+        Raises:
+            TimeoutError: If the service isn't ready within `timeout_s`.
+        """
+        deadline = time.monotonic() + timeout_s
+        while True:
+            try:
+                return self.health()
+            except httpx.TransportError as e:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(
+                        f"Embedding service at {self.url} not ready "
+                        f"after {timeout_s}s: {e}"
+                    ) from e
+                time.sleep(interval_s)
+
+    def close(self) -> None:
+        """
+        Close the underlying HTTP connections.
+        """
+        self._client.close()
@@ -0,0 +1,444 @@
+"""
+Content-type-aware extraction of fetched web resources for prompts:
+HTML becomes readable Markdown (without scripts, styles or navigation),
+JSON and other text is kept as is, images and other binary content are
+described by their metadata, and everything is cut to a token budget.
+"""
+
+from __future__ import annotations
+
+import codecs
+import io
+import logging
+import mimetypes
+import re
+import threading
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Tuple
+from urllib.parse import urljoin
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# rough number of characters per token of English text and Markdown, used
+# to estimate tokens without a model's tokenizer
+CHARS_PER_TOKEN = 4
+
+# bytes of a body decoded and parsed at a time
+CHUNK_SIZE = 2**16
+
+# bytes of an untyped body checked for text before it is decoded
+SNIFF_SIZE = 2**12
+
+# appended to content cut to the token budget
+TRUNCATION_NOTE = "\n\n[... truncated to about {max_tokens} tokens]"
+
+# elements whose content never belongs in a prompt
+SKIPPED_TAGS = {
+    "aside",
+    "button",
+    "canvas",
+    "footer",
+    "form",
+    "head",
+    "iframe",
+    "nav",
+    "noscript",
+    "script",
+    "select",
+    "style",
+    "svg",
+    "template",
+}
+# elements which start a new line
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "blockquote",
+    "br",
+    "dd",
+    "div",
+    "dl",
+    "dt",
+    "figcaption",
+    "figure",
+    "hr",
+    "li",
+    "main",
+    "ol",
+    "p",
+    "section",
+    "table",
+    "tr",
+    "ul",
+}
+# elements without an end tag
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: About one token per CHARS_PER_TOKEN characters.
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """
+    Cut a text to about `max_tokens` tokens, at a whitespace if possible.
+
+    Args:
+        text (str): The text.
+        max_tokens (int): The token budget.
+
+    Returns:
+        Tuple[str, bool]: The text, with a note when it was cut, and
+        whether it was cut.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text, False
+    cut = text.rfind(" ", max_chars // 2, max_chars)
+    return (
+        text[: cut if cut > 0 else max_chars].rstrip()
+        + TRUNCATION_NOTE.format(max_tokens=max_tokens),
+        True,
+    )
+
+
+class HtmlToMarkdown(HTMLParser):
+    """
+    Convert HTML to Markdown text as it's fed, keeping headings, lists,
+    links, images and code, and dropping scripts, styles, navigation and
+    other page furniture.
+
+    Args:
+        base_url (str, optional): URL relative links are resolved against.
+        max_chars (int, optional): Characters after which the rest of the
+            page is ignored; `full` is then True. Defaults to no limit.
+    """
+
+    def __init__(self, base_url: str = "", max_chars: int | None = None):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.max_chars = max_chars
+        self.title = ""
+        self.parts: List[str] = []
+        self.length = 0
+        self.full = False
+        self._skip_depth = 0
+        self._in_title = False
+        self._pre_depth = 0
+        self._links: List[str | None] = []
+
+    def _emit(self, text: str) -> None:
+        if self.full or not text:
+            return
+        self.parts.append(text)
+        self.length += len(text)
+        if self.max_chars is not None and self.length >= self.max_chars:
+            self.full = True
+
+    def _newline(self, count: int = 1) -> None:
+        self._emit("\n" * count)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, str | None]]) -> None:
+        if tag == "title":
+            self._in_title = True
+        if tag in SKIPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+
+        attributes = dict(attrs)
+        if re.fullmatch(r"h[1-6]", tag):
+            self._newline(2)
+            self._emit("#" * int(tag[1]) + " ")
+        elif tag == "li":
+            self._newline()
+            self._emit("- ")
+        elif tag == "pre":
+            self._pre_depth += 1
+            self._newline(2)
+            self._emit("```\n")
+        elif tag == "code" and not self._pre_depth:
+            self._emit("`")
+        elif tag in ("strong", "b"):
+            self._emit("**")
+        elif tag in ("em", "i"):
+            self._emit("*")
+        elif tag == "a":
+            href = attributes.get("href")
+            # keep links to other pages or files, not in-page anchors or scripts
+            if href and not href.startswith(("#", "javascript:")):
+                self._links.append(urljoin(self.base_url, href))
+                self._emit("[")
+            else:
+                self._links.append(None)
+        elif tag == "img" and attributes.get("src"):
+            self._emit(
+                f"![{attributes.get('alt') or ''}]"
+                f"({urljoin(self.base_url, attributes['src'])})"
+            )
+        elif tag in ("td", "th"):
+            self._emit("| ")
+        elif tag in BLOCK_TAGS:
+            self._newline(2 if tag == "p" else 1)
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, str | None]]) -> None:
+        # e.g. <br/>, which has no content or end tag
+        self.handle_starttag(tag, attrs)
+        if tag in SKIPPED_TAGS and tag not in VOID_TAGS:
+            self._skip_depth -= 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title":
+            self._in_title = False
+        if tag in SKIPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self._skip_depth = max(self._skip_depth - 1, 0)
+            return
+        if self._skip_depth:
+            return
+
+        if re.fullmatch(r"h[1-6]", tag):
+            self._newline(2)
+        elif tag == "pre" and self._pre_depth:
+            self._pre_depth -= 1
+            self._emit("\n```")
+            self._newline(2)
+        elif tag == "code" and not self._pre_depth:
+            self._emit("`")
+        elif tag in ("strong", "b"):
+            self._emit("**")
+        elif tag in ("em", "i"):
+            self._emit("*")
+        elif tag == "a" and self._links:
+            href = self._links.pop()
+            if href is not None:
+                self._emit(f"]({href})")
+        elif tag in ("td", "th"):
+            self._emit(" ")
+        elif tag == "tr":
+            self._emit("|")
+        elif tag in BLOCK_TAGS and tag != "li":
+            self._newline(2 if tag == "p" else 1)
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth:
+            return
+        if self._pre_depth:
+            self._emit(data)
+            return
+        text = re.sub(r"\s+", " ", data)
+        if not self.parts or self.parts[-1].endswith("\n"):
+            # don't indent lines, which Markdown reads as code
+            text = text.lstrip()
+        self._emit(text)
+
+    def markdown(self) -> str:
+        """
+        The Markdown converted so far, with the page title as a heading
+        unless the page starts with one.
+        """
+        text = "".join(self.parts)
+        # tidy the whitespace left around blocks
+        text = re.sub(r"[ \t]+\n", "\n", text)
+        text = re.sub(r"\n{3,}", "\n\n", text).strip()
+        title = re.sub(r"\s+", " ", self.title).strip()
+        if title and not text.startswith("#"):
+            text = f"# {title}\n\n{text}"
+        return text
+
+
+def _media_type(response: httpx.Response) -> str:
+    media_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+    if not media_type:
+        # guess from the URL's file extension
+        media_type = mimetypes.guess_type(str(response.url.path))[0] or ""
+    return media_type.lower()
+
+
+def _looks_like_text(response: httpx.Response) -> bool:
+    # untyped bodies are text only if their start has no NUL bytes and
+    # decodes cleanly
+    head = response.content[:SNIFF_SIZE]
+    if b"\x00" in head:
+        return False
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+    try:
+        # not final, so a character cut at the end of the sniffed bytes is fine
+        decoder.decode(head)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
+def _iter_text(response: httpx.Response) -> Iterable[str]:
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(
+        errors="replace"
+    )
+    for chunk in response.iter_bytes(CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def _image_metadata(response: httpx.Response, media_type: str) -> str:
+    lines = [
+        f"Image: {response.url}",
+        f"Content-Type: {media_type}",
+        f"Size: {len(response.content)} bytes",
+    ]
+    try:
+        # only needed for images; reads just the image's header
+        from PIL import Image
+
+        with Image.open(io.BytesIO(response.content)) as image:
+            lines.append(f"Dimensions: {image.width}x{image.height} pixels")
+            lines.append(f"Format: {image.format}, mode {image.mode}")
+    except Exception as e:  # noqa: BLE001
+        logger.debug("Couldn't read the metadata of %s: %s", response.url, e)
+    return "\n".join(lines)
+
+
+class ExtractionStats:
+    """
+    Count the bytes fetched and the (estimated) tokens extracted from
+    them, by kind of content.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds: Dict[str, Dict[str, int]] = {}
+
+    def record(self, kind: str, bytes_in: int, tokens_out: int, truncated: bool):
+        """
+        Record one extraction.
+        """
+        with self._lock:
+            counts = self._kinds.setdefault(
+                kind, {"extractions": 0, "bytes_in": 0, "tokens_out": 0, "truncated": 0}
+            )
+            counts["extractions"] += 1
+            counts["bytes_in"] += bytes_in
+            counts["tokens_out"] += tokens_out
+            counts["truncated"] += int(truncated)
+
+    def summary(self) -> Dict:
+        """
+        Summarize the bytes in and tokens out so far, overall and by kind.
+        """
+        with self._lock:
+            kinds = {kind: dict(counts) for kind, counts in self._kinds.items()}
+        total = {
+            key: sum(counts[key] for counts in kinds.values())
+            for key in ("extractions", "bytes_in", "tokens_out", "truncated")
+        }
+        return {
+            **total,
+            "bytes_per_token": (
+                total["bytes_in"] / total["tokens_out"] if total["tokens_out"] else 0.0
+            ),
+            "by_kind": kinds,
+        }
+
+
+# bytes in and tokens out of every extraction in this process
+EXTRACTION_STATS = ExtractionStats()
+
+
+def extract_content(response: httpx.Response, max_tokens: int = 8000) -> str:
+    """
+    Extract the prompt-worthy content of a fetched resource, by its
+    content type, within a token budget.
+
+    - HTML: Markdown of the page's readable text, links and images.
+    - JSON and other text: as is.
+    - Images: metadata (type, size and dimensions), never the binary.
+    - Other binary content: a note of its type and size. Content of an
+      unknown type is text only if it has no NUL bytes and decodes cleanly.
+
+    HTML is decoded and converted a chunk at a time, and the rest of a
+    page is skipped once the budget is spent.
+
+    Args:
+        response (httpx.Response): The response, with its body read.
+        max_tokens (int, optional): Largest number of (estimated) tokens
+            returned. Defaults to 8000.
+
+    Returns:
+        str: The extracted content.
+    """
+    media_type = _media_type(response)
+    # leave room for the truncation note
+    max_chars = max_tokens * CHARS_PER_TOKEN + 1
+
+    if media_type in ("text/html", "application/xhtml+xml"):
+        kind = "html"
+        parser = HtmlToMarkdown(base_url=str(response.url), max_chars=max_chars)
+        for text in _iter_text(response):
+            parser.feed(text)
+            if parser.full:
+                break
+        parser.close()
+        content = parser.markdown()
+    elif media_type.startswith("image/"):
+        kind = "image"
+        content = _image_metadata(response, media_type)
+    elif (
+        media_type.startswith("text/")
+        or media_type.endswith(("json", "+xml", "/xml", "javascript", "yaml"))
+        or (not media_type and _looks_like_text(response))
+    ):
+        kind = "json" if media_type.endswith("json") else "text"
+        content = response.text
+    else:
+        kind = "binary"
+        content = (
+            f"Binary content ({media_type or 'unknown type'}, "
+            f"{len(response.content)} bytes) "
+            f"from {response.url} is not included."
+        )
+
+    content, truncated = truncate_to_tokens(content, max_tokens)
+    if kind == "html" and parser.full and not truncated:
+        # the rest of the page wasn't converted
+        content += TRUNCATION_NOTE.format(max_tokens=max_tokens)
+        truncated = True
+    tokens_out = estimate_tokens(content)
+    EXTRACTION_STATS.record(kind, len(response.content), tokens_out, truncated)
+    logger.debug(
+        "Extracted %s from %s: %d bytes in, about %d tokens out%s",
+        kind,
+        response.url,
+        len(response.content),
+        tokens_out,
+        " (truncated)" if truncated else "",
+    )
+    return content
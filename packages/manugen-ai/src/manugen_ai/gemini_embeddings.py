@@ -0,0 +1,240 @@
+"""
+Async, rate-limit-aware client for Gemini text embeddings.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Dict, List
+
+import numpy as np
+from google.genai import errors
+
+logger = logging.getLogger(__name__)
+
+# the Gemini API accepts at most this many texts per batchEmbedContents call
+GEMINI_MAX_BATCH_SIZE = 100
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Check whether an error from the GenAI API is worth retrying
+    (rate limited or a server-side failure).
+
+    Args:
+        error (Exception): The raised error.
+
+    Returns:
+        bool: True for HTTP 429 and 5xx API errors.
+    """
+    return isinstance(error, errors.APIError) and (
+        error.code == 429 or error.code >= 500
+    )
+
+
+class EmbeddingThroughput:
+    """
+    Counters describing the work done by an embedding client.
+    """
+
+    def __init__(self):
+        self.texts = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.busy_s = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, **counts: float) -> None:
+        """
+        Add to one or more counters.
+        """
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Summarize the counters, including texts and requests per second
+        of time spent embedding.
+        """
+        with self._lock:
+            return {
+                "texts": self.texts,
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "busy_s": self.busy_s,
+                "texts_per_s": self.texts / self.busy_s if self.busy_s else 0.0,
+                "requests_per_s": self.requests / self.busy_s if self.busy_s else 0.0,
+            }
+
+
+class AsyncGeminiEmbeddingClient:
+    """
+    Embed texts with Gemini using concurrent `batchEmbedContents` calls.
+
+    Texts are split into requests of at most `max_batch_size` texts,
+    at most `max_concurrency` requests are in flight per event loop, and
+    rate limited (429) or failed (5xx) requests are retried with
+    exponential backoff and full jitter.
+
+    Args:
+        client (google.genai.Client): The GenAI client to call.
+        model (str): The embedding model name.
+        max_concurrency (int): Requests in flight at once per event loop.
+        max_batch_size (int): Texts sent per request.
+        max_retries (int): Retries per request before giving up.
+        initial_backoff_s (float): Backoff ceiling for the first retry.
+        max_backoff_s (float): Upper bound for the backoff ceiling.
+    """
+
+    def __init__(
+        self,
+        client,
+        model: str,
+        max_concurrency: int = 4,
+        max_batch_size: int = GEMINI_MAX_BATCH_SIZE,
+        max_retries: int = 5,
+        initial_backoff_s: float = 1.0,
+        max_backoff_s: float = 60.0,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if not 1 <= max_batch_size <= GEMINI_MAX_BATCH_SIZE:
+            raise ValueError(
+                f"max_batch_size must be between 1 and {GEMINI_MAX_BATCH_SIZE}"
+            )
+
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.initial_backoff_s = initial_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.throughput = EmbeddingThroughput()
+        # asyncio semaphores are bound to the loop they're first used in
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._semaphores_lock = threading.Lock()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            if loop not in self._semaphores:
+                self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return self._semaphores[loop]
+
+    def _backoff_s(self, attempt: int) -> float:
+        return random.uniform(
+            0, min(self.max_backoff_s, self.initial_backoff_s * 2**attempt)
+        )
+
+    async def _embed_request(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed one request worth of texts, retrying on 429 and 5xx errors.
+        """
+        semaphore = self._semaphore()
+        attempt = 0
+        while True:
+            async with semaphore:
+                try:
+                    response = await self.client.aio.models.embed_content(
+                        model=self.model, contents=texts
+                    )
+                except Exception as e:
+                    if not is_retryable_error(e) or attempt >= self.max_retries:
+                        self.throughput.add(failures=1)
+                        raise
+                    error = e
+                else:
+                    self.throughput.add(requests=1, texts=len(texts))
+                    return [embedding.values for embedding in response.embeddings]
+
+            # back off outside the semaphore so other requests can proceed
+            delay = self._backoff_s(attempt)
+            logger.warning(
+                "Gemini embedding request failed (%s), retrying in %.2fs",
+                error,
+                delay,
+            )
+            self.throughput.add(retries=1)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts concurrently, preserving their order.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            np.ndarray: A float32 array of shape (len(texts), dim).
+        """
+        start = time.perf_counter()
+        try:
+            chunks = await asyncio.gather(
+                *(
+                    self._embed_request(texts[i : i + self.max_batch_size])
+                    for i in range(0, len(texts), self.max_batch_size)
+                )
+            )
+        finally:
+            self.throughput.add(busy_s=time.perf_counter() - start)
+
+        return np.array(
+            [values for chunk in chunks for values in chunk], dtype=np.float32
+        )
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts from synchronous code.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            np.ndarray: A float32 array of shape (len(texts), dim).
+        """
+        return run_coroutine_sync(self.embed(texts))
+
+
+def run_coroutine_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    When called from a thread which already runs an event loop (for
+    example within an agent), the coroutine runs on its own loop in a
+    separate thread rather than failing.
+
+    Args:
+        coro: The coroutine to run.
+
+    Returns:
+        The coroutine's result.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def target():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
@@ -0,0 +1,427 @@
+"""
+On-disk cache for HTTP responses, so agent tools serve repeated fetches
+(protocols, figure links, repository READMEs) locally.
+
+Responses are indexed by URL in a SQLite database and their bodies are
+stored once per content hash in files next to it. Freshness follows the
+response's Cache-Control (or Expires) headers; stale responses with an
+ETag or Last-Modified header are revalidated with a conditional GET, and
+the least recently used responses are evicted once the bodies exceed a
+size limit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+# longest freshness guessed from Last-Modified, when a response has no
+# Cache-Control max-age or Expires header
+MAX_HEURISTIC_FRESHNESS_S = 24 * 60 * 60
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    """
+    Parse a Cache-Control header into its (lowercased) directives.
+
+    Args:
+        value (str): The header value, e.g. 'max-age=60, must-revalidate'.
+
+    Returns:
+        Dict[str, Optional[str]]: Each directive's value, or None for
+        directives without one.
+    """
+    directives = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _parse_http_date(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: httpx.Headers, now: float) -> float:
+    """
+    Seconds a response stays fresh after it's received (RFC 9111, 4.2).
+
+    Uses s-maxage or max-age, then Expires, then 10% of the time since
+    Last-Modified (at most a day). Responses marked no-cache are never
+    fresh, so they're revalidated on every use.
+
+    Args:
+        headers (httpx.Headers): The response headers.
+        now (float): When the response was received, as a Unix time.
+
+    Returns:
+        float: The remaining freshness lifetime, or 0 if the response
+        is already stale.
+    """
+    directives = parse_cache_control(headers.get("Cache-Control", ""))
+    if "no-cache" in directives:
+        return 0.0
+
+    age = float(headers["Age"]) if headers.get("Age", "").isdigit() else 0.0
+    date = _parse_http_date(headers.get("Date")) or now
+    for directive in ("s-maxage", "max-age"):
+        if (directives.get(directive) or "").isdigit():
+            lifetime = float(directives[directive])
+            break
+    else:
+        expires = _parse_http_date(headers.get("Expires"))
+        last_modified = _parse_http_date(headers.get("Last-Modified"))
+        if "Expires" in headers:
+            # an invalid Expires date means already expired
+            lifetime = expires - date if expires is not None else 0.0
+        elif last_modified is not None:
+            lifetime = min(
+                (date - last_modified) / 10, float(MAX_HEURISTIC_FRESHNESS_S)
+            )
+        else:
+            lifetime = 0.0
+
+    return max(lifetime - age, 0.0)
+
+
+class HttpCache:
+    """
+    Cache GET responses in a directory: an index in a SQLite database and
+    one file per distinct body, named by its SHA-256 hash.
+
+    Only 200 responses are stored, and only when they may be reused:
+    Cache-Control no-store and Vary: * responses are skipped, as are
+    responses which are never fresh and can't be revalidated. Responses
+    are keyed by URL alone, as the HTTP client sends the same headers
+    with every request.
+
+    Args:
+        path (str): Directory of the cache (created if needed).
+        max_bytes (int): Total size of the stored bodies above which the
+            least recently used responses are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 2**20):
+        self.path = pathlib.Path(path)
+        self.content_path = self.path / "content"
+        self.content_path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path / "index.sqlite"), check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+              url TEXT PRIMARY KEY,
+              content_hash TEXT NOT NULL,
+              size INTEGER NOT NULL,
+              status INTEGER NOT NULL,
+              headers TEXT NOT NULL,
+              expires_at REAL NOT NULL,
+              last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _content_file(self, content_hash: str) -> pathlib.Path:
+        return self.content_path / content_hash[:2] / content_hash
+
+    def _delete(self, url: str) -> None:
+        # call with the lock held; removes the body once no response uses it
+        row = self._conn.execute(
+            "SELECT content_hash FROM responses WHERE url = ?", [url]
+        ).fetchone()
+        if row is None:
+            return
+        self._conn.execute("DELETE FROM responses WHERE url = ?", [url])
+        (shared,) = self._conn.execute(
+            "SELECT COUNT(*) FROM responses WHERE content_hash = ?", [row[0]]
+        ).fetchone()
+        if not shared:
+            self._content_file(row[0]).unlink(missing_ok=True)
+
+    def lookup(self, url: str) -> tuple[httpx.Response, bool] | None:
+        """
+        Look up the cached response to a URL, marking it as recently used.
+
+        Args:
+            url (str): The requested URL.
+
+        Returns:
+            tuple[httpx.Response, bool] | None: The cached response and
+            whether it's still fresh, or None when it isn't cached.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT content_hash, status, headers, expires_at
+                FROM responses WHERE url = ?
+                """,
+                [url],
+            ).fetchone()
+            if row is None:
+                return None
+            content_hash, status, headers, expires_at = row
+            try:
+                body = self._content_file(content_hash).read_bytes()
+            except FileNotFoundError:
+                # e.g. evicted by another process
+                self._delete(url)
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE url = ?", [now, url]
+            )
+            self._conn.commit()
+
+        response = httpx.Response(
+            status,
+            headers=json.loads(headers),
+            content=body,
+            request=httpx.Request("GET", url),
+        )
+        return response, now < expires_at
+
+    def store(
+        self, url: str, response: httpx.Response, ttl_s: float | None = None
+    ) -> bool:
+        """
+        Store the response to a URL, if it may be reused, evicting the
+        least recently used responses when the cache is full.
+
+        Args:
+            url (str): The requested URL.
+            response (httpx.Response): The response, with its body read.
+            ttl_s (float, optional): Seconds the response stays fresh,
+                instead of as its headers allow (e.g. for APIs which don't
+                send Cache-Control headers). Defaults to None.
+
+        Returns:
+            bool: Whether the response was stored.
+        """
+        now = time.time()
+        directives = parse_cache_control(response.headers.get("Cache-Control", ""))
+        lifetime = (
+            ttl_s if ttl_s is not None else freshness_lifetime(response.headers, now)
+        )
+        revalidatable = (
+            "ETag" in response.headers or "Last-Modified" in response.headers
+        )
+        body = response.content
+        if (
+            response.status_code != 200
+            or "no-store" in directives
+            or response.headers.get("Vary", "").strip() == "*"
+            or not (lifetime or revalidatable)
+            or len(body) > self.max_bytes
+        ):
+            return False
+
+        content_hash = hashlib.sha256(body).hexdigest()
+        content_file = self._content_file(content_hash)
+        with self._lock:
+            if not content_file.exists():
+                content_file.parent.mkdir(exist_ok=True)
+                # write and rename, so readers never see a partial body
+                tmp_file = content_file.with_suffix(f".{os.getpid()}.tmp")
+                tmp_file.write_bytes(body)
+                os.replace(tmp_file, content_file)
+            self._delete(url)
+            self._conn.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    url,
+                    content_hash,
+                    len(body),
+                    response.status_code,
+                    json.dumps(response.headers.multi_items()),
+                    now + lifetime,
+                    now,
+                ],
+            )
+            self.stores += 1
+            self._evict()
+            self._conn.commit()
+        return True
+
+    def _evict(self) -> None:
+        # call with the lock held
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) "
+            "FROM (SELECT DISTINCT content_hash, size FROM responses)"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        for url, size, content_hash in self._conn.execute(
+            "SELECT url, size, content_hash FROM responses ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._delete(url)
+            (shared,) = self._conn.execute(
+                "SELECT COUNT(*) FROM responses WHERE content_hash = ?",
+                [content_hash],
+            ).fetchone()
+            if not shared:
+                total -= size
+            self.evictions += 1
+
+    def refresh(
+        self,
+        url: str,
+        cached: httpx.Response,
+        not_modified: httpx.Response,
+        ttl_s: float | None = None,
+    ) -> httpx.Response:
+        """
+        Update a cached response with the headers of a 304 Not Modified
+        response to its revalidation.
+
+        Args:
+            url (str): The requested URL.
+            cached (httpx.Response): The cached response.
+            not_modified (httpx.Response): The 304 response.
+            ttl_s (float, optional): Seconds the response stays fresh,
+                instead of as its headers allow. Defaults to None.
+
+        Returns:
+            httpx.Response: The cached response with the updated headers.
+        """
+        now = time.time()
+        headers = httpx.Headers(cached.headers)
+        for name, value in not_modified.headers.items():
+            # the 304 doesn't describe the cached body
+            if name.lower() not in ("content-length", "content-encoding"):
+                headers[name] = value
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET headers = ?, expires_at = ? WHERE url = ?",
+                [
+                    json.dumps(headers.multi_items()),
+                    now
+                    + (
+                        ttl_s if ttl_s is not None else freshness_lifetime(headers, now)
+                    ),
+                    url,
+                ],
+            )
+            self._conn.commit()
+
+        return httpx.Response(
+            cached.status_code,
+            headers=headers,
+            content=cached.content,
+            request=cached.request,
+        )
+
+    async def get_or_fetch(
+        self,
+        url: str,
+        fetch: Callable[[Dict[str, str]], Awaitable[httpx.Response]],
+        ttl_s: float | None = None,
+    ) -> httpx.Response:
+        """
+        Get the response to a URL from the cache while it's fresh,
+        otherwise fetch it (conditionally, if the cached response can be
+        revalidated) and cache it.
+
+        The database and files are read and written in a worker thread,
+        so the event loop isn't blocked on disk.
+
+        Args:
+            url (str): The requested URL.
+            fetch (Callable): Sends the GET request with the given
+                extra (conditional) headers and reads the response.
+            ttl_s (float, optional): Seconds a fetched response stays
+                fresh, instead of as its headers allow. Defaults to None.
+
+        Returns:
+            httpx.Response: The cached or fetched response.
+        """
+        cached = await asyncio.to_thread(self.lookup, url)
+        if cached is not None and cached[1]:
+            with self._lock:
+                self.hits += 1
+                self.bytes_served += len(cached[0].content)
+            return cached[0]
+
+        conditional = {}
+        if cached is not None:
+            if "ETag" in cached[0].headers:
+                conditional["If-None-Match"] = cached[0].headers["ETag"]
+            if "Last-Modified" in cached[0].headers:
+                conditional["If-Modified-Since"] = cached[0].headers["Last-Modified"]
+
+        response = await fetch(conditional)
+        if response.status_code == 304 and cached is not None:
+            refreshed = await asyncio.to_thread(
+                self.refresh, url, cached[0], response, ttl_s
+            )
+            with self._lock:
+                self.revalidations += 1
+                self.bytes_served += len(refreshed.content)
+            return refreshed
+
+        with self._lock:
+            self.misses += 1
+        await asyncio.to_thread(self.store, url, response, ttl_s)
+        return response
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Summarize the cache's hits and misses so far.
+        """
+        with self._lock:
+            served = self.hits + self.revalidations
+            lookups = served + self.misses
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), "
+                "(SELECT COALESCE(SUM(size), 0) "
+                "FROM (SELECT DISTINCT content_hash, size FROM responses)) "
+                "FROM responses"
+            ).fetchone()
+            return {
+                "lookups": lookups,
+                "hits": self.hits,
+                "revalidations": self.revalidations,
+                "misses": self.misses,
+                "hit_rate": served / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "bytes_served": self.bytes_served,
+                "entries": entries,
+                "bytes": size,
+            }
+
+    def close(self) -> None:
+        """
+        Close the SQLite connection.
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,252 @@
+"""
+Shared async HTTP client for agent tools: pooled keep-alive connections,
+per-host concurrency limits, connect and read timeouts, a cap on the
+size of response bodies, which are streamed and abandoned once too large,
+and an on-disk response cache (see `manugen_ai.http_cache`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import pathlib
+import threading
+import weakref
+from typing import Any, Dict
+
+import httpx
+
+from manugen_ai.http_cache import HttpCache
+
+# connections kept open (and reused) across all hosts
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+# requests in flight at once to any one host
+HTTP_MAX_CONNECTIONS_PER_HOST = int(
+    os.environ.get("HTTP_MAX_CONNECTIONS_PER_HOST", "8")
+)
+# seconds to wait to connect, and between bytes of a response
+HTTP_CONNECT_TIMEOUT_S = float(os.environ.get("HTTP_CONNECT_TIMEOUT_S", "5"))
+HTTP_READ_TIMEOUT_S = float(os.environ.get("HTTP_READ_TIMEOUT_S", "20"))
+# largest response body read, in bytes
+HTTP_MAX_RESPONSE_BYTES = int(os.environ.get("HTTP_MAX_RESPONSE_BYTES", str(5 * 2**20)))
+# if USE_HTTP_CACHE is 1, responses are cached in HTTP_CACHE_DIR as their
+# Cache-Control headers allow and revalidated with conditional requests,
+# evicting the least recently used once they exceed HTTP_CACHE_MAX_BYTES;
+# by default in the user's cache directory rather than the (possibly
+# read-only) installed package
+USE_HTTP_CACHE = os.environ.get("USE_HTTP_CACHE", "1") == "1"
+HTTP_CACHE_DIR = os.environ.get(
+    "HTTP_CACHE_DIR",
+    str(
+        pathlib.Path(os.environ.get("XDG_CACHE_HOME", pathlib.Path.home() / ".cache"))
+        / "manugen_ai"
+        / "http_cache"
+    ),
+)
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(256 * 2**20)))
+
+USER_AGENT = "manugen-ai (https://github.com/pivlab/manugen-ai)"
+
+
+class ResponseTooLargeError(Exception):
+    """
+    Raised when a response body is larger than allowed.
+    """
+
+
+class AsyncHttpClient:
+    """
+    An async HTTP client shared by agent tools.
+
+    One `httpx.AsyncClient` (and its connection pool) is kept per event
+    loop, as its connections are bound to the loop they were opened on.
+
+    Args:
+        max_connections (int): Connections kept open across all hosts.
+        max_connections_per_host (int): Requests in flight per host.
+        connect_timeout_s (float): Seconds to wait to connect.
+        read_timeout_s (float): Seconds to wait between bytes of a response.
+        max_response_bytes (int): Largest response body read.
+        transport (httpx.AsyncBaseTransport, optional): Transport for the
+            underlying clients, e.g. for tests.
+        cache (HttpCache, optional): Cache of responses. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_connections_per_host: int = 8,
+        connect_timeout_s: float = 5.0,
+        read_timeout_s: float = 20.0,
+        max_response_bytes: int = 5 * 2**20,
+        transport: httpx.AsyncBaseTransport | None = None,
+        cache: HttpCache | None = None,
+    ):
+        if max_connections_per_host < 1:
+            raise ValueError("max_connections_per_host must be at least 1")
+
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout_s,
+            read=read_timeout_s,
+            write=read_timeout_s,
+            # waiting for a pooled connection
+            pool=connect_timeout_s + read_timeout_s,
+        )
+        self.max_response_bytes = max_response_bytes
+        self.transport = transport
+        self.cache = cache
+        # clients and semaphores are bound to the loop they're first used in
+        self._clients = weakref.WeakKeyDictionary()
+        self._host_semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._clients:
+                self._clients[loop] = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                    headers={"User-Agent": USER_AGENT},
+                    transport=self.transport,
+                )
+            return self._clients[loop]
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._host_semaphores.setdefault(loop, {})
+            if host not in semaphores:
+                semaphores[host] = asyncio.Semaphore(self.max_connections_per_host)
+            return semaphores[host]
+
+    async def get(
+        self,
+        url: str,
+        params: Dict[str, Any] | None = None,
+        headers: Dict[str, str] | None = None,
+        max_bytes: int | None = None,
+        use_cache: bool = True,
+        cache_ttl_s: float | None = None,
+    ) -> httpx.Response:
+        """
+        Send a GET request and read its (decoded) body, or get the
+        response from the cache.
+
+        Args:
+            url (str): The URL to request.
+            params (Dict[str, Any], optional): Query parameters.
+            headers (Dict[str, str], optional): Extra request headers.
+            max_bytes (int, optional): Largest body to read. Defaults to
+                the client's `max_response_bytes`.
+            use_cache (bool, optional): Whether to use the client's cache,
+                if it has one. Defaults to True.
+            cache_ttl_s (float, optional): Seconds the response is reused
+                from the cache, instead of as its Cache-Control headers
+                allow. Defaults to None.
+
+        Returns:
+            httpx.Response: The response, with its body read.
+
+        Raises:
+            ResponseTooLargeError: If the body is larger than `max_bytes`.
+            httpx.HTTPError: If the request fails or times out.
+        """
+        if self.cache is None or not use_cache:
+            return await self._fetch(url, params, headers, max_bytes)
+
+        async def fetch(conditional: Dict[str, str]) -> httpx.Response:
+            return await self._fetch(
+                url, params, {**(headers or {}), **conditional}, max_bytes
+            )
+
+        # (httpx.URL(url, params=...) would replace the URL's own query)
+        key = str(httpx.URL(url).copy_merge_params(params)) if params else url
+        return await self.cache.get_or_fetch(key, fetch, ttl_s=cache_ttl_s)
+
+    async def _fetch(
+        self,
+        url: str,
+        params: Dict[str, Any] | None,
+        headers: Dict[str, str] | None,
+        max_bytes: int | None,
+    ) -> httpx.Response:
+        max_bytes = max_bytes or self.max_response_bytes
+        async with self._host_semaphore(httpx.URL(url).host):
+            async with self._client().stream(
+                "GET", url, params=params, headers=headers
+            ) as response:
+                content_length = response.headers.get("Content-Length", "")
+                if content_length.isdigit() and int(content_length) > max_bytes:
+                    raise ResponseTooLargeError(
+                        f"{url} is {content_length} bytes, "
+                        f"larger than the {max_bytes} bytes allowed"
+                    )
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) > max_bytes:
+                        raise ResponseTooLargeError(
+                            f"{url} is larger than the {max_bytes} bytes allowed"
+                        )
+
+        # the body is already decoded, so drop the headers describing its encoding
+        response_headers = httpx.Headers(response.headers)
+        for name in ("Content-Encoding", "Content-Length", "Transfer-Encoding"):
+            response_headers.pop(name, None)
+        return httpx.Response(
+            response.status_code,
+            headers=response_headers,
+            content=bytes(body),
+            request=response.request,
+        )
+
+    async def aclose(self) -> None:
+        """
+        Close the client used by the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.pop(loop, None)
+            self._host_semaphores.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+# singleton for the shared http client
+# set the first time get_http_client() is called
+_HTTP_CLIENT = None
+_HTTP_CLIENT_LOCK = threading.Lock()
+
+
+def get_http_client() -> AsyncHttpClient:
+    """
+    Get the async HTTP client shared by agent tools.
+
+    Returns:
+        AsyncHttpClient: The initialized client.
+    """
+    global _HTTP_CLIENT
+
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is None:
+            _HTTP_CLIENT = AsyncHttpClient(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_connections_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+                connect_timeout_s=HTTP_CONNECT_TIMEOUT_S,
+                read_timeout_s=HTTP_READ_TIMEOUT_S,
+                max_response_bytes=HTTP_MAX_RESPONSE_BYTES,
+                cache=(
+                    HttpCache(HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES)
+                    if USE_HTTP_CACHE
+                    else None
+                ),
+            )
+
+    return _HTTP_CLIENT
@@ -0,0 +1,163 @@
+"""
+Versioned manifests for withdrarxiv embedding databases.
+
+A manifest is a small JSON file naming the current database file along
+with its version, embedding model, embedding size, row count and
+checksum. Publishing a new database writes it under a new file name and
+then atomically replaces the manifest, so running workers can switch to
+it on their next search while in-flight searches finish on the old one.
+"""
+
+from __future__ import annotations
+
+import datetime
+import os
+import pathlib
+
+import duckdb
+from pydantic import BaseModel
+
+from manugen_ai.utils import sha256_file
+
+
+class EmbeddingDatabaseManifest(BaseModel):
+    """
+    Describes a published withdrarxiv embeddings database.
+    """
+
+    # identifies the database, e.g. "2025-06-01"
+    version: str
+    # embedding model the database was built with, e.g. "bge-m3"
+    model: str
+    embedding_size: int
+    rows: int
+    sha256: str
+    # database file name, relative to the manifest's directory
+    db_file: str
+    created_at: str
+
+
+def get_manifest_path(db_path: str) -> str:
+    """
+    Get the manifest path for a database path,
+    e.g. `withdrarxiv_embeddings_bge-m3.manifest.json`.
+    """
+    return str(pathlib.Path(db_path).with_suffix(".manifest.json"))
+
+
+def count_embedding_rows(db_path: str) -> int:
+    """
+    Count the embeddings in an embeddings database.
+    """
+    conn = duckdb.connect(db_path, read_only=True)
+    try:
+        return conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def write_manifest(
+    manifest_path: str,
+    db_path: str,
+    version: str,
+    model: str,
+    embedding_size: int,
+) -> EmbeddingDatabaseManifest:
+    """
+    Describe a database in a manifest, atomically replacing any previous
+    manifest so readers see either the old or the new one.
+
+    The database must be in the manifest's directory and must not be
+    modified once published; publish changes under a new file name.
+
+    Args:
+        manifest_path (str): Where to write the manifest.
+        db_path (str): The database to publish.
+        version (str): The database's version.
+        model (str): Embedding model the database was built with.
+        embedding_size (int): Number of components in each embedding.
+
+    Returns:
+        EmbeddingDatabaseManifest: The written manifest.
+    """
+    db_file = pathlib.Path(db_path)
+    if db_file.resolve().parent != pathlib.Path(manifest_path).resolve().parent:
+        raise ValueError(f"{db_path} must be in the same directory as {manifest_path}.")
+
+    manifest = EmbeddingDatabaseManifest(
+        version=version,
+        model=model,
+        embedding_size=embedding_size,
+        rows=count_embedding_rows(db_path),
+        sha256=sha256_file(db_path),
+        db_file=db_file.name,
+        created_at=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    )
+
+    tmp_path = f"{manifest_path}.tmp"
+    pathlib.Path(tmp_path).write_text(manifest.model_dump_json(indent=2))
+    os.replace(tmp_path, manifest_path)
+
+    return manifest
+
+
+def read_manifest(manifest_path: str) -> EmbeddingDatabaseManifest:
+    """
+    Read a manifest written by `write_manifest`.
+    """
+    return EmbeddingDatabaseManifest.model_validate_json(
+        pathlib.Path(manifest_path).read_text()
+    )
+
+
+def validate_manifest(
+    manifest_path: str,
+    manifest: EmbeddingDatabaseManifest,
+    model: str,
+    embedding_size: int,
+    verify_checksum: bool = True,
+) -> str:
+    """
+    Check that a manifest matches the embedding model being used and
+    that the database it names matches the manifest.
+
+    Args:
+        manifest_path (str): Path of the manifest.
+        manifest (EmbeddingDatabaseManifest): The manifest's contents.
+        model (str): Embedding model being used.
+        embedding_size (int): Number of components in each embedding.
+        verify_checksum (bool, optional): Also check the database's
+            SHA-256 digest, which reads the whole file. Defaults to True.
+
+    Returns:
+        str: The path to the database.
+
+    Raises:
+        ValueError: If the manifest or its database don't match.
+    """
+    db_path = str(pathlib.Path(manifest_path).parent / manifest.db_file)
+
+    if manifest.model != model:
+        raise ValueError(
+            f"Manifest {manifest_path} is for model {manifest.model}, "
+            f"but {model} is being used."
+        )
+    if manifest.embedding_size != embedding_size:
+        raise ValueError(
+            f"Manifest {manifest_path} has embedding size "
+            f"{manifest.embedding_size}, expected {embedding_size}."
+        )
+    if not pathlib.Path(db_path).is_file():
+        raise ValueError(f"Database {db_path} named by {manifest_path} is missing.")
+    rows = count_embedding_rows(db_path)
+    if rows != manifest.rows:
+        raise ValueError(
+            f"Database {db_path} has {rows} embeddings, "
+            f"but its manifest lists {manifest.rows}."
+        )
+    if verify_checksum and sha256_file(db_path) != manifest.sha256:
+        raise ValueError(
+            f"Database {db_path} doesn't match the checksum in {manifest_path}."
+        )
+
+    return db_path
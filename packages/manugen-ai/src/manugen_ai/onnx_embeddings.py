@@ -0,0 +1,220 @@
+"""
+CPU inference for BGE-M3 dense embeddings through ONNX Runtime,
+with dynamic int8 quantization.
+
+Requires the optional `onnx` dependencies (`onnxruntime` and `onnx`);
+exporting the model additionally uses `torch` and `transformers`, which
+FlagEmbedding already depends on.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pathlib
+import shutil
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# file names of the exported graphs within an ONNX model directory
+ONNX_FP32_MODEL = "model.onnx"
+ONNX_INT8_MODEL = "model_int8.onnx"
+
+
+def export_bge_m3_onnx(
+    model_name_or_path: str,
+    output_dir: str,
+    cache_dir: Optional[str] = None,
+    quantize: bool = True,
+    opset: int = 17,
+) -> str:
+    """
+    Export BGE-M3's transformer to ONNX and, optionally, quantize its
+    weights to int8 with dynamic quantization.
+
+    The graph takes `input_ids` and `attention_mask` and returns the last
+    hidden state; dense embeddings are its normalized CLS vectors, as for
+    `BGEM3FlagModel`. The tokenizer is saved alongside the graph.
+
+    Args:
+        model_name_or_path (str): Hugging Face model name or local path.
+        output_dir (str): Directory to write the graphs and tokenizer to.
+        cache_dir (str, optional): Hugging Face cache directory.
+        quantize (bool): Also write an int8-quantized graph.
+        opset (int): ONNX opset version.
+
+    Returns:
+        str: The output directory.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    output_path = pathlib.Path(output_dir)
+    # a directory per process, so concurrent exports don't remove each other's
+    tmp_path = output_path.with_name(f"{output_path.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name_or_path, cache_dir=cache_dir)
+    model = AutoModel.from_pretrained(model_name_or_path, cache_dir=cache_dir).eval()
+    tokenizer.save_pretrained(tmp_path)
+
+    sample = tokenizer(["an example abstract"], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            str(tmp_path / ONNX_FP32_MODEL),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+        )
+
+    if quantize:
+        quantize_dynamic(
+            str(tmp_path / ONNX_FP32_MODEL),
+            str(tmp_path / ONNX_INT8_MODEL),
+            weight_type=QuantType.QInt8,
+            # graphs of a model this size can exceed protobuf's 2GB limit
+            use_external_data_format=True,
+        )
+
+    shutil.rmtree(output_path, ignore_errors=True)
+    tmp_path.rename(output_path)
+    return str(output_path)
+
+
+def padded_token_count(lengths: np.ndarray, batch_size: int) -> int:
+    """
+    Count the tokens a model processes for texts encoded in the given
+    order, when each batch is padded to its longest text.
+
+    Args:
+        lengths (np.ndarray): Token length of each text, in encoding order.
+        batch_size (int): Number of texts encoded at once.
+
+    Returns:
+        int: The number of tokens including padding.
+    """
+    return int(
+        sum(
+            lengths[start : start + batch_size].max(initial=0)
+            * len(lengths[start : start + batch_size])
+            for start in range(0, len(lengths), batch_size)
+        )
+    )
+
+
+class OnnxBgeM3Encoder:
+    """
+    Encode texts into BGE-M3 dense embeddings with ONNX Runtime on CPU.
+
+    `encode` mirrors `BGEM3FlagModel.encode` for dense vectors, so the
+    encoder can stand in for the FlagEmbedding model and its vectors
+    are compatible with existing bge-m3 withdrarxiv databases.
+
+    Args:
+        model_dir (str): Directory written by `export_bge_m3_onnx`.
+        quantized (bool): Use the int8-quantized graph.
+        intra_op_threads (int, optional): Threads ONNX Runtime uses within
+            an operator. Defaults to ONNX Runtime's choice (all cores).
+        max_length (int): Maximum tokens per text; longer texts are truncated.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = True,
+        intra_op_threads: Optional[int] = None,
+        max_length: int = 8192,
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_dir = model_dir
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(
+                pathlib.Path(model_dir)
+                / (ONNX_INT8_MODEL if quantized else ONNX_FP32_MODEL)
+            ),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 4,
+        max_length: Optional[int] = None,
+        **kwargs,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Encode texts into normalized dense embeddings, in batches of
+        texts of similar token length.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            batch_size (int): Texts run through the graph at once.
+            max_length (int, optional): Maximum tokens per text.
+                Defaults to the encoder's `max_length`.
+
+        Returns:
+            Dict[str, np.ndarray]: `dense_vecs`, a float32 array of shape
+            (len(texts), 1024).
+        """
+        if not texts:
+            return {"dense_vecs": np.empty((0, 1024), dtype=np.float32)}
+
+        max_length = max_length or self.max_length
+        input_ids = self.tokenizer(list(texts), truncation=True, max_length=max_length)[
+            "input_ids"
+        ]
+        lengths = np.array([len(ids) for ids in input_ids])
+        # encode longest first, as BGEM3FlagModel does, so each batch holds
+        # texts of similar length (and a batch too large for memory fails
+        # early), then return the embeddings in the original order
+        order = np.argsort(-lengths, kind="stable")
+
+        dense_vecs = np.empty((len(texts), 1024), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = order[start : start + batch_size]
+            tokens = self.tokenizer.pad(
+                {"input_ids": [input_ids[i] for i in batch]},
+                padding=True,
+                return_tensors="np",
+            )
+            (hidden,) = self.session.run(
+                ["last_hidden_state"],
+                {
+                    "input_ids": tokens["input_ids"].astype(np.int64),
+                    "attention_mask": tokens["attention_mask"].astype(np.int64),
+                },
+            )
+            cls = hidden[:, 0]
+            dense_vecs[batch] = cls / np.linalg.norm(cls, axis=1, keepdims=True)
+
+        logger.debug(
+            "Encoded %d texts, %d tokens (%d with padding)",
+            len(texts),
+            lengths.sum(),
+            padded_token_count(lengths[order], batch_size),
+        )
+        return {"dense_vecs": dense_vecs}
@@ -0,0 +1,526 @@
+"""
+Vector search over withdrarxiv embeddings stored in Postgres with the
+pgvector extension, so several backend nodes can share one database
+rather than each holding a local copy of the embeddings.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import csv
+import io
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import duckdb
+import numpy as np
+import psycopg2
+import psycopg2.pool
+
+# search backends understood by PgvectorSearchEngine
+PGVECTOR_SEARCH_BACKENDS = ("hnsw", "exact")
+
+# columns of the withdrarxiv `papers` table copied into Postgres
+PGVECTOR_PAPERS_COLUMNS = (
+    "arxiv_id",
+    "title",
+    "abstract",
+    "subjects",
+    "scrubbed_comments",
+    "category",
+)
+
+
+def get_pgvector_table_names(model_name: str) -> Dict[str, str]:
+    """
+    Get the Postgres tables holding the withdrarxiv papers and their
+    embeddings for an embedding model, prefixed so they can share a
+    database with other applications (such as ADK sessions).
+
+    Returns:
+        Dict[str, str]: The `papers` and `embeddings` table names.
+    """
+    suffix = re.sub(r"\W+", "_", model_name).strip("_").lower()
+    return {
+        "papers": f"withdrarxiv_papers_{suffix}",
+        "embeddings": f"withdrarxiv_embeddings_{suffix}",
+    }
+
+
+def _format_vector(vector: np.ndarray) -> str:
+    """
+    Format a vector as a pgvector literal, e.g. `[0.1,0.2]`.
+    """
+    return (
+        "[" + ",".join(map(repr, np.asarray(vector, dtype=np.float32).tolist())) + "]"
+    )
+
+
+def create_pgvector_tables(
+    conn, papers_table: str, embeddings_table: str, embedding_size: int
+) -> None:
+    """
+    Create (or recreate) the papers and embeddings tables, enabling the
+    pgvector extension if needed, in the connection's current transaction
+    (which the caller commits).
+
+    Constraints are named after their tables, so that
+    `swap_pgvector_tables` can rename them along with the tables.
+
+    Args:
+        conn: A psycopg2 connection.
+        papers_table (str): Name of the papers table.
+        embeddings_table (str): Name of the embeddings table.
+        embedding_size (int): Number of components in each embedding.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        cursor.execute(f"DROP TABLE IF EXISTS {embeddings_table};")
+        cursor.execute(f"DROP TABLE IF EXISTS {papers_table};")
+        cursor.execute(
+            f"""
+            CREATE TABLE {papers_table} (
+              arxiv_id TEXT CONSTRAINT {papers_table}_pkey PRIMARY KEY,
+              {", ".join(f"{column} TEXT" for column in PGVECTOR_PAPERS_COLUMNS[1:])}
+            );
+            """
+        )
+        cursor.execute(
+            f"""
+            CREATE TABLE {embeddings_table} (
+              arxiv_id TEXT CONSTRAINT {embeddings_table}_pkey PRIMARY KEY
+                CONSTRAINT {embeddings_table}_arxiv_id_fkey
+                REFERENCES {papers_table}(arxiv_id),
+              embedding vector({int(embedding_size)}) NOT NULL
+            );
+            """
+        )
+
+
+def create_pgvector_hnsw_index(
+    conn, embeddings_table: str, ef_construction: int = 128, m: int = 16
+) -> None:
+    """
+    Build (or rebuild) a pgvector HNSW index over the embeddings with the
+    inner product metric, which matches exact search for the normalized
+    embeddings we store, in the connection's current transaction (which
+    the caller commits).
+
+    Args:
+        conn: A psycopg2 connection.
+        embeddings_table (str): Name of the embeddings table.
+        ef_construction (int, optional):
+            Candidate list size while building. Defaults to 128.
+        m (int, optional): Maximum neighbours per node. Defaults to 16.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS {embeddings_table}_hnsw_idx;")
+        cursor.execute(
+            f"""
+            CREATE INDEX {embeddings_table}_hnsw_idx
+            ON {embeddings_table} USING hnsw (embedding vector_ip_ops)
+            WITH (m = {int(m)}, ef_construction = {int(ef_construction)});
+            """
+        )
+
+
+def swap_pgvector_tables(
+    conn,
+    papers_table: str,
+    embeddings_table: str,
+    staging_papers_table: str,
+    staging_embeddings_table: str,
+) -> None:
+    """
+    Replace the papers and embeddings tables with staging tables made by
+    `create_pgvector_tables`, renaming the staging tables and their
+    constraints and HNSW index, in the connection's current transaction
+    (which the caller commits).
+
+    Searches keep reading the previous tables until the transaction
+    commits, and only wait for the drop and renames.
+
+    Args:
+        conn: A psycopg2 connection.
+        papers_table (str): Name of the papers table.
+        embeddings_table (str): Name of the embeddings table.
+        staging_papers_table (str): Name of the staged papers table.
+        staging_embeddings_table (str): Name of the staged embeddings table.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {embeddings_table};")
+        cursor.execute(f"DROP TABLE IF EXISTS {papers_table};")
+        for staging, table in (
+            (staging_papers_table, papers_table),
+            (staging_embeddings_table, embeddings_table),
+        ):
+            cursor.execute(f"ALTER TABLE {staging} RENAME TO {table};")
+            cursor.execute(f"ALTER INDEX {staging}_pkey RENAME TO {table}_pkey;")
+        cursor.execute(
+            f"ALTER TABLE {embeddings_table} RENAME CONSTRAINT"
+            f" {staging_embeddings_table}_arxiv_id_fkey"
+            f" TO {embeddings_table}_arxiv_id_fkey;"
+        )
+        cursor.execute(
+            f"ALTER INDEX IF EXISTS {staging_embeddings_table}_hnsw_idx"
+            f" RENAME TO {embeddings_table}_hnsw_idx;"
+        )
+
+
+def _copy_rows(cursor, table: str, columns: List[str], rows: List[tuple]) -> None:
+    """
+    Bulk load rows into a table with COPY.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+def load_duckdb_into_pgvector(
+    db_path: str,
+    dsn: str,
+    papers_table: str,
+    embeddings_table: str,
+    embedding_size: int,
+    chunk_size: int = 10_000,
+    create_hnsw: bool = True,
+) -> int:
+    """
+    Copy the `papers` and `embeddings` tables of a withdrarxiv DuckDB
+    database into Postgres, replacing any previous copy, and index the
+    embeddings with HNSW.
+
+    The copy is loaded and indexed in staging tables, then swapped in
+    with `swap_pgvector_tables`, all in one transaction, so searches
+    running meanwhile see either the previous copy or the new one, and a
+    failed load leaves the previous copy in place.
+
+    Args:
+        db_path (str): Path to the DuckDB database.
+        dsn (str): Postgres connection string.
+        papers_table (str): Name of the Postgres papers table.
+        embeddings_table (str): Name of the Postgres embeddings table.
+        embedding_size (int): Number of components in each embedding.
+        chunk_size (int, optional): Rows copied per chunk. Defaults to 10,000.
+        create_hnsw (bool, optional): Whether to build the HNSW index once
+            the embeddings are loaded. Defaults to True.
+
+    Returns:
+        int: The number of embeddings loaded.
+    """
+    staging_papers_table = f"{papers_table}_staging"
+    staging_embeddings_table = f"{embeddings_table}_staging"
+    source = duckdb.connect(db_path, read_only=True)
+    conn = psycopg2.connect(dsn)
+    n_rows = 0
+    try:
+        create_pgvector_tables(
+            conn, staging_papers_table, staging_embeddings_table, embedding_size
+        )
+        with conn.cursor() as cursor:
+            papers = source.execute(
+                f"SELECT {', '.join(PGVECTOR_PAPERS_COLUMNS)} FROM papers"
+                " WHERE arxiv_id IN (SELECT arxiv_id FROM embeddings)"
+            )
+            while rows := papers.fetchmany(chunk_size):
+                _copy_rows(
+                    cursor, staging_papers_table, list(PGVECTOR_PAPERS_COLUMNS), rows
+                )
+
+            reader = source.execute(
+                "SELECT arxiv_id, embedding FROM embeddings"
+            ).fetch_record_batch(chunk_size)
+            for batch in reader:
+                vectors = (
+                    batch.column(1)
+                    .flatten()
+                    .to_numpy()
+                    .reshape(batch.num_rows, embedding_size)
+                )
+                _copy_rows(
+                    cursor,
+                    staging_embeddings_table,
+                    ["arxiv_id", "embedding"],
+                    [
+                        (arxiv_id, _format_vector(vector))
+                        for arxiv_id, vector in zip(
+                            batch.column(0).to_pylist(), vectors
+                        )
+                    ],
+                )
+                n_rows += batch.num_rows
+
+        if create_hnsw:
+            create_pgvector_hnsw_index(conn, staging_embeddings_table)
+        swap_pgvector_tables(
+            conn,
+            papers_table,
+            embeddings_table,
+            staging_papers_table,
+            staging_embeddings_table,
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        source.close()
+
+    return n_rows
+
+
+class PgvectorSearchEngine:
+    """
+    Search withdrarxiv embeddings stored in Postgres with pgvector for
+    papers similar to a query, with the same interface as
+    `manugen_ai.search.WithdrarxivSearchEngine`.
+
+    Connections come from a thread-safe pool shared by every search of
+    the engine, so requests don't pay for connecting to Postgres. Searches
+    beyond `max_connections` at once wait for a connection to be returned
+    rather than failing with `psycopg2.pool.PoolError`.
+
+    Backends:
+        - "hnsw": approximate search through the pgvector HNSW index.
+        - "exact": full scan ordered by inner product.
+
+    Args:
+        dsn (str):
+            Postgres connection string.
+        embed_fn (Callable[[str], np.ndarray]):
+            Function which embeds a single query string.
+        embedding_size (int):
+            Number of components in each embedding.
+        papers_table (str):
+            Name of the papers table.
+        embeddings_table (str):
+            Name of the embeddings table.
+        backend (str, optional):
+            One of PGVECTOR_SEARCH_BACKENDS. Defaults to "hnsw".
+        hnsw_ef_search (int, optional):
+            Candidate list size for HNSW searches, trading latency for
+            recall. Defaults to pgvector's `hnsw.ef_search` (40).
+        embed_batch_fn (Callable[[List[str]], np.ndarray], optional):
+            Function which embeds a list of query strings at once, used by
+            `search_batch`. Defaults to calling `embed_fn` per query.
+        min_connections (int, optional):
+            Connections opened up front. Defaults to 1.
+        max_connections (int, optional):
+            Most connections open at once. Defaults to 10.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        embed_fn: Callable[[str], np.ndarray],
+        embedding_size: int,
+        papers_table: str,
+        embeddings_table: str,
+        backend: str = "hnsw",
+        hnsw_ef_search: Optional[int] = None,
+        embed_batch_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+        min_connections: int = 1,
+        max_connections: int = 10,
+    ):
+        if backend not in PGVECTOR_SEARCH_BACKENDS:
+            raise ValueError(
+                f"Unknown search backend {backend}, "
+                f"expected one of {PGVECTOR_SEARCH_BACKENDS}."
+            )
+
+        self.embed_fn = embed_fn
+        self.embed_batch_fn = embed_batch_fn
+        self.embedding_size = embedding_size
+        self.papers_table = papers_table
+        self.embeddings_table = embeddings_table
+        self.backend = backend
+        self.hnsw_ef_search = hnsw_ef_search
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            min_connections, max_connections, dsn
+        )
+        # the pool raises rather than waiting once every connection is out
+        self._pool_slots = threading.BoundedSemaphore(max_connections)
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[Any]:
+        """
+        Borrow a connection from the pool for one transaction, waiting
+        while every connection is in use.
+        """
+        with self._pool_slots:
+            conn = self._pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._pool.putconn(conn)
+
+    def _search_with_cursor(
+        self, cursor, vector: np.ndarray, top_k: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the top-k statement for one vector on a cursor.
+        """
+        cursor.execute(
+            f"""
+            WITH topk AS (
+              SELECT
+                arxiv_id,
+                -(embedding <#> %(q)s::vector) AS similarity
+              FROM {self.embeddings_table}
+              ORDER BY embedding <#> %(q)s::vector
+              LIMIT %(k)s
+            )
+            SELECT
+              topk.arxiv_id,
+              topk.similarity,
+              p.scrubbed_comments AS related_retraction_reasons
+            FROM topk
+            JOIN {self.papers_table} p USING(arxiv_id)
+            ORDER BY topk.similarity DESC;
+            """,
+            {"q": _format_vector(vector), "k": int(top_k)},
+        )
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def search_vectors(
+        self,
+        vectors: np.ndarray,
+        top_k: int = 2,
+        backend: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find the papers most similar to each of several vectors, searching
+        them in turn on one pooled connection.
+
+        Args:
+            vectors (np.ndarray):
+                Query embeddings of shape (n, embedding_size).
+            top_k (int, optional):
+                The number of papers to return per query. Defaults to 2.
+            backend (str, optional):
+                Override the engine's backend for this search, e.g. "exact".
+
+        Returns:
+            List[List[Dict[str, Any]]]:
+                One list of records per query, in query order, with
+                `arxiv_id`, `similarity` and `related_retraction_reasons`.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.embedding_size)
+        if len(vectors) == 0 or top_k <= 0:
+            return [[] for _ in vectors]
+
+        with self._connection() as conn, conn.cursor() as cursor:
+            if (backend or self.backend) == "exact":
+                cursor.execute("SET LOCAL enable_indexscan = off;")
+            elif self.hnsw_ef_search is not None:
+                cursor.execute(
+                    f"SET LOCAL hnsw.ef_search = {int(self.hnsw_ef_search)};"
+                )
+            return [
+                self._search_with_cursor(cursor, vector, top_k) for vector in vectors
+            ]
+
+    def search_vector(
+        self,
+        vector: np.ndarray,
+        top_k: int = 2,
+        backend: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the papers whose embeddings are most similar to a vector.
+
+        Args:
+            vector (np.ndarray):
+                The query embedding.
+            top_k (int, optional):
+                The number of papers to return. Defaults to 2.
+            backend (str, optional):
+                Override the engine's backend for this search, e.g. "exact".
+
+        Returns:
+            List[Dict[str, Any]]:
+                See `search_vectors`.
+        """
+        return self.search_vectors(
+            np.asarray(vector)[np.newaxis, :], top_k=top_k, backend=backend
+        )[0]
+
+    def search(self, query: str, top_k: int = 2) -> List[Dict[str, Any]]:
+        """
+        Embed a query once and find the most similar papers.
+
+        Args:
+            query (str):
+                The abstract or query string to search for.
+            top_k (int, optional):
+                The number of papers to return. Defaults to 2.
+
+        Returns:
+            List[Dict[str, Any]]:
+                See `search_vectors`.
+        """
+        return self.search_vector(self.embed_fn(query), top_k=top_k)
+
+    def search_batch(
+        self, queries: List[str], top_k: int = 2
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Embed several queries at once and find the most similar papers
+        for each of them.
+
+        Args:
+            queries (List[str]):
+                The abstracts or query strings to search for.
+            top_k (int, optional):
+                The number of papers to return per query. Defaults to 2.
+
+        Returns:
+            List[List[Dict[str, Any]]]:
+                See `search_vectors`.
+        """
+        if not queries:
+            return []
+        if self.embed_batch_fn is not None:
+            vectors = self.embed_batch_fn(list(queries))
+        else:
+            vectors = np.stack([self.embed_fn(query) for query in queries])
+        return self.search_vectors(vectors, top_k=top_k)
+
+    def recall_at_k(self, vectors: np.ndarray, top_k: int = 10) -> float:
+        """
+        Measure the recall@k of the engine's backend against exact search.
+
+        Args:
+            vectors (np.ndarray):
+                Query embeddings of shape (n, embedding_size).
+            top_k (int, optional):
+                Number of neighbours compared per query. Defaults to 10.
+
+        Returns:
+            float: The mean fraction of the exact top-k found by the backend.
+        """
+        exact = self.search_vectors(vectors, top_k=top_k, backend="exact")
+        found = self.search_vectors(vectors, top_k=top_k)
+        recalls = [
+            len({r["arxiv_id"] for r in e} & {r["arxiv_id"] for r in f}) / len(e)
+            if e
+            else 1.0
+            for e, f in zip(exact, found)
+        ]
+        return float(np.mean(recalls))
+
+    def close(self) -> None:
+        """
+        Close every pooled connection.
+        """
+        self._pool.closeall()
@@ -0,0 +1,1348 @@
+"""
+Vector search over withdrarxiv embedding databases.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pathlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# name of the optional HNSW index on embeddings(embedding)
+HNSW_INDEX_NAME = "embeddings_hnsw_idx"
+
+# table mapping rows of the exported embedding matrix to arxiv ids
+MATRIX_OFFSETS_TABLE = "embedding_offsets"
+
+# search backends understood by WithdrarxivSearchEngine
+SEARCH_BACKENDS = ("auto", "exact", "hnsw", "matrix", "compact", "partitioned")
+
+# upper bound on the (rows x queries) scores held in memory at once
+# when searching the embedding matrix for a batch of queries
+MATRIX_SCORE_BLOCK_SIZE = 2**26
+
+# tables of a compact embeddings database (see export_compact_embeddings)
+COMPACT_EMBEDDINGS_TABLE = "compact_embeddings"
+COMPACT_INFO_TABLE = "compact_embedding_info"
+
+# dtypes of the first-pass vectors of a compact embeddings database
+COMPACT_DTYPES = ("int8", "float16")
+
+# candidates per query found with the compact vectors, then reranked exactly
+COMPACT_RERANK_CANDIDATES = 100
+
+# rows of the compact matrix converted to float32 at once while scoring
+COMPACT_SCORE_CHUNK_ROWS = 2**12
+
+# tables of embedding partitions (see create_embedding_partitions):
+# each paper's partition, the partitions' centroids, and a copy of the
+# embeddings ordered by partition
+PARTITIONS_TABLE = "embedding_partitions"
+PARTITION_CENTROIDS_TABLE = "embedding_partition_centroids"
+PARTITIONED_EMBEDDINGS_TABLE = "partitioned_embeddings"
+
+# ways of partitioning embeddings
+PARTITION_METHODS = ("subject", "kmeans")
+
+# partitions searched per query by the "partitioned" backend
+PARTITION_NPROBE = 8
+
+
+def load_vss_extension(conn: duckdb.DuckDBPyConnection) -> bool:
+    """
+    Install (if needed) and load DuckDB's `vss` extension.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection):
+            The connection to load the extension into.
+
+    Returns:
+        bool: True if the extension is loaded, False otherwise.
+    """
+    try:
+        conn.execute("INSTALL vss; LOAD vss;")
+    except duckdb.Error as e:
+        logger.warning("Could not load the DuckDB vss extension (%s)", e)
+        return False
+    return True
+
+
+def has_hnsw_index(conn: duckdb.DuckDBPyConnection) -> bool:
+    """
+    Check whether the embeddings table has an HNSW index.
+    """
+    return bool(
+        conn.execute(
+            "SELECT count(*) FROM duckdb_indexes() WHERE index_name = $name",
+            {"name": HNSW_INDEX_NAME},
+        ).fetchone()[0]
+    )
+
+
+def create_hnsw_index(
+    conn: duckdb.DuckDBPyConnection,
+    ef_construction: int = 128,
+    ef_search: int = 64,
+    m: int = 16,
+) -> None:
+    """
+    Build (or rebuild) an HNSW index over the `embeddings` table using
+    DuckDB's `vss` extension, persisted inside the database file.
+
+    The index uses the inner product metric, which matches the exact
+    search path for the normalized embeddings we store. Build it once the
+    table is complete: writing to an indexed table requires `vss` to be
+    loaded.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection):
+            A writable connection to the embeddings database.
+        ef_construction (int, optional):
+            Candidate list size while building. Defaults to 128.
+        ef_search (int, optional):
+            Default candidate list size while searching. Defaults to 64.
+        m (int, optional):
+            Maximum neighbours per node. Defaults to 16.
+    """
+    conn.execute("INSTALL vss; LOAD vss;")
+    conn.execute("SET hnsw_enable_experimental_persistence = true;")
+    conn.execute(f"DROP INDEX IF EXISTS {HNSW_INDEX_NAME};")
+    conn.execute(
+        f"""
+        CREATE INDEX {HNSW_INDEX_NAME}
+        ON embeddings USING HNSW (embedding)
+        WITH (
+          metric = 'ip',
+          ef_construction = {int(ef_construction)},
+          ef_search = {int(ef_search)},
+          M = {int(m)}
+        );
+        """
+    )
+
+
+def get_matrix_path(db_path: str) -> str:
+    """
+    Get the path of the embedding matrix exported next to a database,
+    e.g. `withdrarxiv_embeddings_bge-m3.embeddings.npy`.
+    """
+    return str(pathlib.Path(db_path).with_suffix(".embeddings.npy"))
+
+
+def export_embedding_matrix(
+    conn: duckdb.DuckDBPyConnection,
+    matrix_path: str,
+    embedding_size: int,
+    chunk_size: int = 10_000,
+) -> str:
+    """
+    Export the `embeddings` table as a contiguous float32 matrix in an
+    `.npy` file, along with an `embedding_offsets` table mapping each
+    matrix row to its arxiv id.
+
+    The matrix can then be opened with `np.load(mmap_mode="r")`, so every
+    process searching it shares the OS page cache rather than holding a
+    private copy of the embeddings.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection):
+            A writable connection to the embeddings database.
+        matrix_path (str):
+            Where to write the `.npy` matrix.
+        embedding_size (int):
+            Number of components in each embedding.
+        chunk_size (int, optional):
+            Rows copied per chunk. Defaults to 10,000.
+
+    Returns:
+        str: The matrix path.
+    """
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE {MATRIX_OFFSETS_TABLE} AS
+        SELECT
+          (row_number() OVER (ORDER BY arxiv_id) - 1)::BIGINT AS row_offset,
+          arxiv_id
+        FROM embeddings
+        ORDER BY row_offset;
+        """
+    )
+    n_rows = conn.execute(f"SELECT count(*) FROM {MATRIX_OFFSETS_TABLE}").fetchone()[0]
+
+    # write to a temporary file first so readers never see a partial matrix
+    tmp_path = f"{matrix_path}.tmp"
+    matrix = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=np.float32, shape=(n_rows, embedding_size)
+    )
+    reader = conn.execute(
+        f"""
+        SELECT e.embedding
+        FROM {MATRIX_OFFSETS_TABLE} o
+        JOIN embeddings e USING(arxiv_id)
+        ORDER BY o.row_offset;
+        """
+    ).fetch_record_batch(chunk_size)
+    row = 0
+    for batch in reader:
+        chunk = (
+            batch.column(0).flatten().to_numpy().reshape(batch.num_rows, embedding_size)
+        )
+        matrix[row : row + batch.num_rows] = chunk
+        row += batch.num_rows
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, matrix_path)
+
+    return matrix_path
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    iterations: int = 10,
+    seed: int = 0,
+    chunk_size: int = 10_000,
+) -> np.ndarray:
+    """
+    Cluster unit vectors by inner product with spherical k-means.
+
+    Args:
+        vectors (np.ndarray): Unit vectors of shape (n, dim).
+        n_clusters (int): Number of clusters.
+        iterations (int, optional): Lloyd iterations. Defaults to 10.
+        seed (int, optional): Random seed. Defaults to 0.
+        chunk_size (int, optional): Vectors assigned at a time.
+            Defaults to 10,000.
+
+    Returns:
+        np.ndarray: Unit centroids of shape (n_clusters, dim).
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        counts = np.zeros(n_clusters, dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start : start + chunk_size]
+            labels = np.argmax(chunk @ centroids.T, axis=1)
+            np.add.at(sums, labels, chunk)
+            counts += np.bincount(labels, minlength=n_clusters)
+        # reseed empty clusters with random vectors
+        empty = counts == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = (sums / np.where(norms > 0, norms, 1)).astype(np.float32)
+    return centroids
+
+
+def create_embedding_partitions(
+    conn: duckdb.DuckDBPyConnection,
+    embedding_size: int,
+    method: str = "kmeans",
+    n_partitions: Optional[int] = None,
+    sample_size: int = 100_000,
+    chunk_size: int = 10_000,
+    seed: int = 0,
+) -> int:
+    """
+    Split the embeddings into partitions, by papers' top-level arXiv
+    subject (e.g. "cs" or "hep-th") or by spherical k-means clusters,
+    for the IVF-style "partitioned" search backend.
+
+    Writes each paper's partition, the partitions' unit centroids and a
+    copy of the embeddings ordered by partition, so a search scans only
+    the partitions whose centroids are nearest the query. The copy
+    doubles the space the embeddings take in the database.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection):
+            A writable connection to the embeddings database.
+        embedding_size (int):
+            Number of components in each embedding.
+        method (str, optional):
+            One of PARTITION_METHODS. Defaults to "kmeans".
+        n_partitions (int, optional):
+            Number of k-means clusters. Defaults to the square root of
+            the number of embeddings.
+        sample_size (int, optional):
+            Embeddings k-means is trained on. Defaults to 100,000.
+        chunk_size (int, optional):
+            Rows processed per chunk. Defaults to 10,000.
+        seed (int, optional):
+            Random seed for k-means. Defaults to 0.
+
+    Returns:
+        int: The number of partitions.
+    """
+    if method not in PARTITION_METHODS:
+        raise ValueError(
+            f"Unknown partition method {method}, expected one of {PARTITION_METHODS}."
+        )
+
+    def read_vectors(batch) -> np.ndarray:
+        return (
+            batch.column(1).flatten().to_numpy().reshape(batch.num_rows, embedding_size)
+        )
+
+    if method == "subject":
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TABLE {PARTITIONS_TABLE} AS
+            WITH labeled AS (
+              SELECT
+                e.arxiv_id,
+                coalesce(
+                  nullif(regexp_extract(p.subjects, '[(]([a-z-]+)', 1), ''), 'other'
+                ) AS label
+              FROM embeddings e
+              LEFT JOIN papers p USING(arxiv_id)
+            )
+            SELECT
+              arxiv_id,
+              (dense_rank() OVER (ORDER BY label) - 1)::INTEGER AS partition_id,
+              label
+            FROM labeled;
+            """
+        )
+    else:
+        n_rows = conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        n_partitions = n_partitions or max(1, int(np.sqrt(n_rows)))
+        sample = conn.execute(
+            f"""
+            SELECT arxiv_id, embedding FROM embeddings
+            USING SAMPLE reservoir({int(sample_size)} ROWS) REPEATABLE ({int(seed)});
+            """
+        ).fetch_arrow_table()
+        centroids = spherical_kmeans(
+            read_vectors(sample.combine_chunks().to_batches()[0]),
+            n_clusters=n_partitions,
+            seed=seed,
+        )
+
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TABLE {PARTITIONS_TABLE} (
+              arxiv_id VARCHAR,
+              partition_id INTEGER,
+              label VARCHAR
+            );
+            """
+        )
+        # read through a second cursor, as inserting on the connection
+        # would invalidate the pending result
+        reader = (
+            conn.cursor()
+            .execute("SELECT arxiv_id, embedding FROM embeddings;")
+            .fetch_record_batch(chunk_size)
+        )
+        for batch in reader:
+            labels = np.argmax(read_vectors(batch) @ centroids.T, axis=1)
+            conn.register(
+                "partition_chunk",
+                pa.table(
+                    {
+                        "arxiv_id": batch.column(0),
+                        "partition_id": labels.astype(np.int32),
+                        "label": [f"cluster {label}" for label in labels],
+                    }
+                ),
+            )
+            conn.execute(
+                f"INSERT INTO {PARTITIONS_TABLE} SELECT * FROM partition_chunk;"
+            )
+            conn.unregister("partition_chunk")
+
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE {PARTITIONED_EMBEDDINGS_TABLE} AS
+        SELECT p.partition_id, e.arxiv_id, e.embedding
+        FROM embeddings e
+        JOIN {PARTITIONS_TABLE} p USING(arxiv_id)
+        ORDER BY p.partition_id, e.arxiv_id;
+        """
+    )
+
+    # centroids are the normalized means of each partition's embeddings
+    labels = conn.execute(
+        f"""
+        SELECT partition_id, any_value(label), count(*)
+        FROM {PARTITIONS_TABLE}
+        GROUP BY partition_id
+        ORDER BY partition_id;
+        """
+    ).fetchall()
+    sums = np.zeros((len(labels), embedding_size), dtype=np.float64)
+    reader = conn.execute(
+        f"SELECT partition_id, embedding FROM {PARTITIONED_EMBEDDINGS_TABLE};"
+    ).fetch_record_batch(chunk_size)
+    for batch in reader:
+        np.add.at(sums, batch.column(0).to_numpy(), read_vectors(batch))
+    norms = np.linalg.norm(sums, axis=1, keepdims=True)
+    centroids = (sums / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+    conn.register(
+        "centroids_src",
+        pa.table(
+            {
+                "partition_id": pa.array([row[0] for row in labels], pa.int32()),
+                "label": [row[1] for row in labels],
+                "size": pa.array([row[2] for row in labels], pa.int64()),
+                "centroid": pa.FixedSizeListArray.from_arrays(
+                    pa.array(centroids.ravel()), embedding_size
+                ),
+            }
+        ),
+    )
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE {PARTITION_CENTROIDS_TABLE} AS
+        SELECT
+          partition_id,
+          label,
+          size,
+          centroid::FLOAT[{int(embedding_size)}] AS centroid
+        FROM centroids_src
+        ORDER BY partition_id;
+        """
+    )
+    conn.unregister("centroids_src")
+
+    return len(labels)
+
+
+def get_compact_db_path(db_path: str) -> str:
+    """
+    Get the path of the compact first-pass vectors of a database,
+    e.g. `withdrarxiv_embeddings_bge-m3.compact.duckdb`.
+    """
+    return str(pathlib.Path(db_path).with_suffix(".compact.duckdb"))
+
+
+def _blobs_to_matrix(blobs: List[bytes], dtype: str, dim: int) -> np.ndarray:
+    """
+    Stack vectors stored as raw bytes into a matrix of shape (len(blobs), dim).
+    """
+    return np.frombuffer(b"".join(blobs), dtype=dtype).reshape(len(blobs), dim)
+
+
+def _embedding_ids_fingerprint(
+    conn: duckdb.DuckDBPyConnection, table: str = "embeddings"
+) -> Tuple[int, str]:
+    """
+    Count the rows of an embeddings table and hash their sorted arxiv ids,
+    to tell whether a compact database was exported from it.
+    """
+    n_rows, ids_md5 = conn.execute(
+        f"""
+        SELECT count(*), md5(string_agg(arxiv_id, ',' ORDER BY arxiv_id))
+        FROM {table};
+        """
+    ).fetchone()
+    return n_rows, ids_md5 or ""
+
+
+def export_compact_embeddings(
+    db_path: str,
+    compact_db_path: str,
+    embedding_size: int,
+    dtype: str = "int8",
+    dim: Optional[int] = None,
+    chunk_size: int = 10_000,
+) -> str:
+    """
+    Write the compact first-pass vectors of an embeddings database for
+    the "compact" search backend.
+
+    The compact database holds only each paper's arxiv id and the leading
+    `dim` components of its embedding as int8 or float16, which workers
+    hold in memory for a first-pass search. The candidates it finds are
+    reranked with their float32 embeddings, read from the full database
+    for those candidates only. int8 vectors of all 1024 components of a
+    bge-m3 embedding take about 4x less memory per worker than the
+    float32 embeddings, and about 16x less when truncated to 256
+    components.
+
+    The full database is still needed, on disk next to the compact one,
+    for the rerank: the compact database shrinks the memory each worker
+    holds, not the download, which it adds to.
+
+    The compact database records the number of embeddings and a
+    fingerprint of their arxiv ids, so a compact database exported from
+    another version of the full database isn't used with it.
+
+    int8 vectors share one scale for the whole matrix, so first-pass
+    scores are proportional to the float ones and no scales are stored.
+
+    Args:
+        db_path (str):
+            Path to a database with `papers` and `embeddings` tables.
+        compact_db_path (str):
+            Where to write the compact database.
+        embedding_size (int):
+            Number of components in each embedding.
+        dtype (str, optional):
+            One of COMPACT_DTYPES for the first-pass vectors. Defaults to "int8".
+        dim (int, optional):
+            Leading components kept in the first-pass vectors.
+            Defaults to all of them.
+        chunk_size (int, optional):
+            Rows copied per chunk. Defaults to 10,000.
+
+    Returns:
+        str: The compact database path.
+    """
+    if dtype not in COMPACT_DTYPES:
+        raise ValueError(
+            f"Unknown compact dtype {dtype}, expected one of {COMPACT_DTYPES}."
+        )
+    dim = dim or embedding_size
+    if not 0 < dim <= embedding_size:
+        raise ValueError(f"dim must be between 1 and {embedding_size}, got {dim}.")
+
+    # write to a temporary file first so readers never see a partial database
+    tmp_path = f"{compact_db_path}.tmp"
+    pathlib.Path(tmp_path).unlink(missing_ok=True)
+    conn = duckdb.connect(tmp_path)
+    try:
+        source = str(db_path).replace("'", "''")
+        conn.execute(f"ATTACH '{source}' AS source (READ_ONLY);")
+        n_rows, ids_md5 = _embedding_ids_fingerprint(conn, "source.embeddings")
+        conn.execute(
+            f"""
+            CREATE TABLE {COMPACT_INFO_TABLE} AS
+            SELECT
+              $dtype AS dtype,
+              $dim::INTEGER AS dim,
+              $embedding_size::INTEGER AS embedding_size,
+              $n_rows::BIGINT AS n_rows,
+              $ids_md5 AS ids_md5;
+            """,
+            {
+                "dtype": dtype,
+                "dim": dim,
+                "embedding_size": embedding_size,
+                "n_rows": n_rows,
+                "ids_md5": ids_md5,
+            },
+        )
+        conn.execute(
+            f"""
+            CREATE TABLE {COMPACT_EMBEDDINGS_TABLE} (
+              row_offset BIGINT,
+              arxiv_id VARCHAR,
+              embedding BLOB
+            );
+            """
+        )
+
+        scale = 1.0
+        if dtype == "int8":
+            max_abs = conn.execute(
+                f"""
+                SELECT max(list_max(list_transform(
+                  list_slice(embedding::FLOAT[], 1, {int(dim)}), x -> abs(x)
+                )))
+                FROM source.embeddings;
+                """
+            ).fetchone()[0]
+            scale = 127.0 / max_abs if max_abs else 1.0
+
+        # read through a second cursor, as inserting on the connection
+        # would invalidate the pending result
+        reader = (
+            conn.cursor()
+            .execute(
+                "SELECT arxiv_id, embedding FROM source.embeddings ORDER BY arxiv_id;"
+            )
+            .fetch_record_batch(chunk_size)
+        )
+        row = 0
+        for batch in reader:
+            vectors = (
+                batch.column(1)
+                .flatten()
+                .to_numpy()
+                .reshape(batch.num_rows, embedding_size)
+            )
+            if dtype == "int8":
+                first_pass = np.clip(
+                    np.rint(vectors[:, :dim] * scale), -127, 127
+                ).astype(np.int8)
+            else:
+                first_pass = vectors[:, :dim].astype(np.float16)
+            conn.register(
+                "compact_chunk",
+                pa.table(
+                    {
+                        "row_offset": np.arange(row, row + batch.num_rows),
+                        "arxiv_id": batch.column(0),
+                        "embedding": pa.array(
+                            [vec.tobytes() for vec in first_pass], pa.binary()
+                        ),
+                    }
+                ),
+            )
+            conn.execute(
+                f"INSERT INTO {COMPACT_EMBEDDINGS_TABLE} SELECT * FROM compact_chunk;"
+            )
+            conn.unregister("compact_chunk")
+            row += batch.num_rows
+        conn.execute("DETACH source;")
+    finally:
+        conn.close()
+    os.replace(tmp_path, compact_db_path)
+
+    return compact_db_path
+
+
+class WithdrarxivSearchEngine:
+    """
+    Search a withdrarxiv embeddings database for papers similar to a query.
+
+    The engine keeps one read-only DuckDB connection open for its whole
+    lifetime (with a cursor per thread) and reuses a single parameterized
+    top-k statement. Queries are embedded once in Python and the vector is
+    bound to the statement as a FLOAT[n] parameter, instead of calling an
+    `embed` UDF from SQL which DuckDB cannot treat as a constant.
+
+    Backends:
+        - "exact": full scan ordered by inner product.
+        - "hnsw": approximate search through the database's HNSW index.
+        - "matrix": exact brute-force search over the memory-mapped
+          embedding matrix exported next to the database.
+        - "compact": first-pass search over the int8 or float16 vectors
+          of the compact database exported next to the database (see
+          `export_compact_embeddings`) held in memory, then an exact
+          rerank of the best candidates with their float32 embeddings.
+        - "partitioned": exact search within the `nprobe` partitions
+          (see `create_embedding_partitions`) whose centroids are most
+          similar to the query.
+        - "auto": "compact" when the compact vectors exist, "hnsw" when the index
+          exists and `vss` can be loaded, "partitioned" when the database
+          is partitioned, then "matrix" when the matrix exists, and
+          "exact" otherwise.
+
+    Args:
+        db_path (str):
+            Path to a DuckDB database with `papers` and `embeddings` tables,
+            as created by `manugen_ai.data.create_withdrarxiv_embeddings`.
+        embed_fn (Callable[[str], np.ndarray]):
+            Function which embeds a single query string.
+        embedding_size (int):
+            Number of components in each embedding.
+        backend (str, optional):
+            One of SEARCH_BACKENDS. Defaults to "auto".
+        hnsw_ef_search (int, optional):
+            Candidate list size for HNSW searches, trading latency for
+            recall. Defaults to the value the index was built with.
+        matrix_path (str, optional):
+            Path to the exported embedding matrix. Defaults to
+            `get_matrix_path(db_path)`.
+        embed_batch_fn (Callable[[List[str]], np.ndarray], optional):
+            Function which embeds a list of query strings at once, used by
+            `search_batch`. Defaults to calling `embed_fn` per query.
+        compact_rerank_candidates (int, optional):
+            Candidates per query found with the compact vectors and
+            reranked exactly by the "compact" backend. Defaults to
+            COMPACT_RERANK_CANDIDATES.
+        nprobe (int, optional):
+            Partitions searched per query by the "partitioned" backend,
+            trading latency for recall. Defaults to PARTITION_NPROBE.
+        compact_db_path (str, optional):
+            Path to the compact first-pass vectors. Defaults to
+            `get_compact_db_path(db_path)`.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        embed_fn: Callable[[str], np.ndarray],
+        embedding_size: int,
+        backend: str = "auto",
+        hnsw_ef_search: Optional[int] = None,
+        matrix_path: Optional[str] = None,
+        embed_batch_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+        compact_rerank_candidates: int = COMPACT_RERANK_CANDIDATES,
+        nprobe: int = PARTITION_NPROBE,
+        compact_db_path: Optional[str] = None,
+    ):
+        if backend not in SEARCH_BACKENDS:
+            raise ValueError(
+                f"Unknown search backend {backend}, expected one of {SEARCH_BACKENDS}."
+            )
+
+        self.db_path = db_path
+        self.embed_fn = embed_fn
+        self.embed_batch_fn = embed_batch_fn
+        self.embedding_size = embedding_size
+        self.hnsw_ef_search = hnsw_ef_search
+        self.matrix_path = matrix_path or get_matrix_path(db_path)
+        self.compact_db_path = compact_db_path or get_compact_db_path(db_path)
+        self.compact_rerank_candidates = compact_rerank_candidates
+        self.nprobe = nprobe
+
+        self._conn = duckdb.connect(db_path, read_only=True)
+        self._local = threading.local()
+        # top-k statements built so far, filled by every searching thread
+        self._topk_statements: Dict[tuple, str] = {}
+        self._topk_lock = threading.Lock()
+        self._matrix = None
+        self._compact = None
+        self._compact_ids = None
+        self._centroids = None
+        # searches using the engine (see `acquire`), and whether it's
+        # closed once they're done
+        self._users = 0
+        self._retired = False
+        self._closed = False
+        self._users_lock = threading.Lock()
+        self.backend = self._resolve_backend(backend)
+
+    def _resolve_backend(self, backend: str) -> str:
+        """
+        Decide which backend to search with, falling back to exact search
+        when the HNSW index or the embedding matrix is missing or unusable.
+        """
+        if backend in ("auto", "compact"):
+            if self._load_compact():
+                return "compact"
+            if backend == "compact":
+                logger.warning(
+                    "No usable compact embeddings at %s, falling back to exact search",
+                    self.compact_db_path,
+                )
+        if backend in ("auto", "hnsw"):
+            if has_hnsw_index(self._conn) and load_vss_extension(self._conn):
+                return "hnsw"
+            if backend == "hnsw":
+                logger.warning(
+                    "No usable HNSW index in %s, falling back to exact search",
+                    self.db_path,
+                )
+        if backend in ("auto", "partitioned"):
+            if self._load_partitions():
+                return "partitioned"
+            if backend == "partitioned":
+                logger.warning(
+                    "%s has no embedding partitions, falling back to exact search",
+                    self.db_path,
+                )
+        if backend in ("auto", "matrix"):
+            if self._load_matrix():
+                return "matrix"
+            if backend == "matrix":
+                logger.warning(
+                    "No usable embedding matrix at %s, falling back to exact search",
+                    self.matrix_path,
+                )
+        return "exact"
+
+    def _load_matrix(self) -> bool:
+        """
+        Memory-map the exported embedding matrix, checking that it matches
+        the database's offsets table.
+        """
+        if not pathlib.Path(self.matrix_path).is_file():
+            return False
+        matrix = np.load(self.matrix_path, mmap_mode="r")
+        if not self._has_table(MATRIX_OFFSETS_TABLE):
+            return False
+        n_rows = self._conn.execute(
+            f"SELECT count(*) FROM {MATRIX_OFFSETS_TABLE}"
+        ).fetchone()[0]
+        if matrix.shape != (n_rows, self.embedding_size):
+            return False
+        self._matrix = matrix
+        return True
+
+    def _load_compact(self) -> bool:
+        """
+        Read the compact first-pass vectors and their arxiv ids into
+        memory, checking that they match the embedding size and were
+        exported from this database's embeddings.
+        """
+        if not pathlib.Path(self.compact_db_path).is_file():
+            return False
+        conn = duckdb.connect(self.compact_db_path, read_only=True)
+        try:
+            if not conn.execute(
+                "SELECT count(*) FROM duckdb_tables() WHERE table_name = $name",
+                {"name": COMPACT_INFO_TABLE},
+            ).fetchone()[0]:
+                return False
+            cursor = conn.execute(f"SELECT * FROM {COMPACT_INFO_TABLE}")
+            info = dict(zip([col[0] for col in cursor.description], cursor.fetchone()))
+            if info["embedding_size"] != self.embedding_size:
+                return False
+            if (
+                info.get("n_rows"),
+                info.get("ids_md5"),
+            ) != _embedding_ids_fingerprint(self._conn):
+                logger.warning(
+                    "Compact embeddings at %s were not exported from %s, "
+                    "so they aren't used; export them again",
+                    self.compact_db_path,
+                    self.db_path,
+                )
+                return False
+            dtype, dim = info["dtype"], info["dim"]
+            table = conn.execute(
+                f"""
+                SELECT arxiv_id, embedding
+                FROM {COMPACT_EMBEDDINGS_TABLE}
+                ORDER BY row_offset
+                """
+            ).fetch_arrow_table()
+        finally:
+            conn.close()
+        self._compact = _blobs_to_matrix(table.column(1).to_pylist(), dtype, dim)
+        self._compact_ids = table.column(0).to_numpy(zero_copy_only=False)
+        return True
+
+    def _load_partitions(self) -> bool:
+        """
+        Read the partitions' centroids into memory, checking that they
+        match the embedding size and that the partitioned copy of the
+        embeddings has every row (e.g. not rows added by a resumed build).
+        """
+        if not (
+            self._has_table(PARTITION_CENTROIDS_TABLE)
+            and self._has_table(PARTITIONED_EMBEDDINGS_TABLE)
+        ):
+            return False
+        n_partitioned, n_rows = self._conn.execute(
+            f"""
+            SELECT
+              (SELECT count(*) FROM {PARTITIONED_EMBEDDINGS_TABLE}),
+              (SELECT count(*) FROM embeddings)
+            """
+        ).fetchone()
+        if n_partitioned != n_rows:
+            return False
+        centroids = (
+            self._conn.execute(
+                f"SELECT centroid FROM {PARTITION_CENTROIDS_TABLE} ORDER BY partition_id"
+            )
+            .fetch_arrow_table()
+            .column(0)
+            .combine_chunks()
+        )
+        if centroids.type.list_size != self.embedding_size:
+            return False
+        self._centroids = (
+            centroids.flatten().to_numpy().reshape(len(centroids), self.embedding_size)
+        )
+        return True
+
+    def _has_table(self, table_name: str) -> bool:
+        """
+        Check whether the database has a table.
+        """
+        return bool(
+            self._conn.execute(
+                "SELECT count(*) FROM duckdb_tables() WHERE table_name = $name",
+                {"name": table_name},
+            ).fetchone()[0]
+        )
+
+    def _cursor(self) -> duckdb.DuckDBPyConnection:
+        """
+        Return a cursor on the shared connection for the current thread,
+        as DuckDB connections may not be used by several threads at once.
+        """
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._conn.cursor()
+            if self.backend == "hnsw" and self.hnsw_ef_search is not None:
+                cursor.execute(f"SET hnsw_ef_search = {int(self.hnsw_ef_search)};")
+            self._local.cursor = cursor
+        return cursor
+
+    def _topk_sql(self, backend: str, vector: np.ndarray, top_k: int) -> str:
+        """
+        Return the top-k statement for a backend, built once per backend
+        (and per k for HNSW, whose limit must be a constant).
+        """
+        key = (backend, int(top_k) if backend == "hnsw" else None)
+        with self._topk_lock:
+            statement = self._topk_statements.get(key)
+            if statement is None:
+                query_vector = f"$q::FLOAT[{self.embedding_size}]"
+                order_by = "similarity DESC"
+                limit = "$k"
+                if backend == "hnsw":
+                    # the HNSW index is only used for a top-n over a constant
+                    # query vector, so the vector is inlined at {vector} rather
+                    # than bound as a parameter
+                    query_vector = f"{{vector}}::FLOAT[{self.embedding_size}]"
+                    order_by = (
+                        f"array_negative_inner_product(embedding, {query_vector})"
+                    )
+                    limit = str(int(top_k))
+
+                statement = f"""
+                WITH topk AS (
+                  SELECT
+                    arxiv_id,
+                    array_inner_product(embedding, {query_vector}) AS similarity
+                  FROM embeddings
+                  ORDER BY {order_by}
+                  LIMIT {limit}
+                )
+                SELECT
+                  arxiv_id,
+                  similarity,
+                  p.scrubbed_comments AS related_retraction_reasons
+                FROM topk
+                JOIN papers p USING(arxiv_id)
+                ORDER BY similarity DESC;
+                """
+                self._topk_statements[key] = statement
+
+        if backend == "hnsw":
+            return statement.replace(
+                "{vector}", f"[{', '.join(map(repr, vector.tolist()))}]"
+            )
+        return statement
+
+    def search_vector(
+        self,
+        vector: np.ndarray,
+        top_k: int = 2,
+        backend: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the papers whose embeddings are most similar to a vector.
+
+        Args:
+            vector (np.ndarray):
+                The query embedding.
+            top_k (int, optional):
+                The number of papers to return. Defaults to 2.
+            backend (str, optional):
+                Override the engine's backend for this search, e.g. "exact".
+
+        Returns:
+            List[Dict[str, Any]]:
+                One record per paper, ordered by descending similarity, with
+                `arxiv_id`, `similarity` and `related_retraction_reasons`.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        backend = backend or self.backend
+        if backend == "matrix":
+            return self._search_matrix(vector, top_k)
+        if backend == "compact":
+            return self._search_compact_batch(vector[np.newaxis, :], top_k)[0]
+        if backend == "partitioned":
+            return self._search_exact_batch(
+                vector[np.newaxis, :], top_k, probes=self._probes(vector[np.newaxis, :])
+            )[0]
+        params = {} if backend == "hnsw" else {"q": vector, "k": top_k}
+
+        cursor = self._cursor().execute(self._topk_sql(backend, vector, top_k), params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _search_matrix(self, vector: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """
+        Score every row of the embedding matrix with one matrix-vector
+        product and look up the top-k rows in the database.
+        """
+        return self._search_matrix_batch(vector[np.newaxis, :], top_k)[0]
+
+    def _search_matrix_batch(
+        self, vectors: np.ndarray, top_k: int
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Score every row of the embedding matrix against a block of queries
+        at a time with one matrix-matrix product, then look up the top-k
+        rows of all queries in the database at once.
+        """
+        n_rows = self._matrix.shape[0]
+        top_k = min(top_k, n_rows)
+        if top_k <= 0:
+            return [[] for _ in vectors]
+
+        block = max(1, MATRIX_SCORE_BLOCK_SIZE // max(n_rows, 1))
+        top_offsets, top_scores = [], []
+        for start in range(0, len(vectors), block):
+            # scores has shape (queries in block, rows)
+            scores = vectors[start : start + block] @ self._matrix.T
+            offsets = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+            offset_scores = np.take_along_axis(scores, offsets, axis=1)
+            order = np.argsort(-offset_scores, axis=1)
+            top_offsets.extend(np.take_along_axis(offsets, order, axis=1))
+            top_scores.extend(np.take_along_axis(offset_scores, order, axis=1))
+
+        rows = (
+            self._cursor()
+            .execute(
+                f"""
+                SELECT
+                  o.row_offset,
+                  o.arxiv_id,
+                  p.scrubbed_comments AS related_retraction_reasons
+                FROM {MATRIX_OFFSETS_TABLE} o
+                JOIN papers p USING(arxiv_id)
+                WHERE o.row_offset IN (SELECT unnest($offsets));
+                """,
+                {"offsets": np.unique(top_offsets).tolist()},
+            )
+            .fetchall()
+        )
+        by_offset = {row[0]: row for row in rows}
+        return [
+            [
+                {
+                    "arxiv_id": by_offset[offset][1],
+                    "similarity": float(score),
+                    "related_retraction_reasons": by_offset[offset][2],
+                }
+                for offset, score in zip(offsets.tolist(), scores.tolist())
+                if offset in by_offset
+            ]
+            for offsets, scores in zip(top_offsets, top_scores)
+        ]
+
+    def _search_compact_batch(
+        self, vectors: np.ndarray, top_k: int
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find each query's best candidates with the compact vectors held
+        in memory, then rerank them exactly with their float32 embeddings,
+        read from the database for the candidates only.
+        """
+        n_rows, dim = self._compact.shape
+        top_k = min(top_k, n_rows)
+        if top_k <= 0:
+            return [[] for _ in vectors]
+        n_candidates = min(max(self.compact_rerank_candidates, top_k), n_rows)
+
+        block = max(1, MATRIX_SCORE_BLOCK_SIZE // max(n_rows, 1))
+        candidates = []
+        for start in range(0, len(vectors), block):
+            queries = vectors[start : start + block, :dim]
+            # scores has shape (queries in block, rows)
+            scores = np.empty((len(queries), n_rows), dtype=np.float32)
+            for row in range(0, n_rows, COMPACT_SCORE_CHUNK_ROWS):
+                chunk = self._compact[row : row + COMPACT_SCORE_CHUNK_ROWS]
+                scores[:, row : row + len(chunk)] = queries @ chunk.astype(np.float32).T
+            candidates.extend(
+                np.argpartition(-scores, n_candidates - 1, axis=1)[:, :n_candidates]
+            )
+
+        # rerank with the candidates' float32 embeddings from the database
+        table = (
+            self._cursor()
+            .execute(
+                """
+                SELECT
+                  e.arxiv_id,
+                  e.embedding,
+                  p.scrubbed_comments AS related_retraction_reasons
+                FROM embeddings e
+                JOIN papers p USING(arxiv_id)
+                -- filtered in the scan, unlike a semi-join, so only the
+                -- candidates' embeddings are read
+                WHERE list_contains($ids, e.arxiv_id);
+                """,
+                {"ids": self._compact_ids[np.unique(candidates)].tolist()},
+            )
+            .fetch_arrow_table()
+        )
+        embeddings = (
+            table.column(1)
+            .combine_chunks()
+            .flatten()
+            .to_numpy()
+            .reshape(table.num_rows, self.embedding_size)
+        )
+        by_id = {arxiv_id: i for i, arxiv_id in enumerate(table.column(0).to_pylist())}
+        reasons = table.column(2).to_pylist()
+
+        results = []
+        for vector, offsets in zip(vectors, candidates):
+            found = [
+                (arxiv_id, by_id[arxiv_id])
+                for arxiv_id in self._compact_ids[offsets].tolist()
+                if arxiv_id in by_id
+            ]
+            if not found:
+                results.append([])
+                continue
+            similarities = embeddings[[i for _, i in found]] @ vector
+            results.append(
+                [
+                    {
+                        "arxiv_id": found[i][0],
+                        "similarity": float(similarities[i]),
+                        "related_retraction_reasons": reasons[found[i][1]],
+                    }
+                    for i in np.argsort(-similarities, kind="stable")[:top_k]
+                ]
+            )
+        return results
+
+    def _probes(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Find the `nprobe` partitions whose centroids are most similar to
+        each query, as an array of shape (queries, nprobe).
+        """
+        nprobe = min(self.nprobe, len(self._centroids))
+        scores = vectors @ self._centroids.T
+        return np.argpartition(-scores, nprobe - 1, axis=1)[:, :nprobe]
+
+    def _search_exact_batch(
+        self,
+        vectors: np.ndarray,
+        top_k: int,
+        probes: Optional[np.ndarray] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find the top-k papers of every query with a single statement,
+        scanning the embeddings once against all queries and keeping
+        each query's top-k with `max_by`.
+
+        With `probes`, the partitions to search for each query, only the
+        embeddings of those partitions are scanned.
+        """
+        queries = {
+            "query_id": np.arange(len(vectors)),
+            "embedding": pa.FixedSizeListArray.from_arrays(
+                pa.array(vectors.ravel()), self.embedding_size
+            ),
+        }
+        candidates = "batch_queries q CROSS JOIN embeddings e"
+        if probes is not None:
+            # typed as INTEGER like partition_id, so the join's filter is
+            # pushed into the scan rather than comparing casts of every row
+            queries["partition_ids"] = pa.array(
+                probes.astype(np.int32).tolist(), type=pa.list_(pa.int32())
+            )
+            candidates = f"""(
+                    SELECT query_id, embedding, unnest(partition_ids) AS partition_id
+                    FROM batch_queries
+                  ) q
+                  JOIN {PARTITIONED_EMBEDDINGS_TABLE} e USING(partition_id)"""
+
+        cursor = self._cursor()
+        cursor.register("batch_queries", pa.table(queries))
+        try:
+            rows = cursor.execute(
+                f"""
+                WITH scores AS (
+                  SELECT
+                    q.query_id,
+                    e.arxiv_id,
+                    array_inner_product(
+                      e.embedding, q.embedding::FLOAT[{self.embedding_size}]
+                    ) AS similarity
+                  FROM {candidates}
+                ),
+                topk AS (
+                  SELECT
+                    query_id,
+                    unnest(
+                      max_by(
+                        {{'arxiv_id': arxiv_id, 'similarity': similarity}},
+                        similarity,
+                        $k
+                      ),
+                      recursive := true
+                    )
+                  FROM scores
+                  GROUP BY query_id
+                )
+                SELECT
+                  query_id,
+                  arxiv_id,
+                  similarity,
+                  p.scrubbed_comments AS related_retraction_reasons
+                FROM topk
+                JOIN papers p USING(arxiv_id)
+                ORDER BY query_id, similarity DESC;
+                """,
+                {"k": top_k},
+            ).fetchall()
+        finally:
+            cursor.unregister("batch_queries")
+
+        results = [[] for _ in vectors]
+        for query_id, arxiv_id, similarity, reasons in rows:
+            results[query_id].append(
+                {
+                    "arxiv_id": arxiv_id,
+                    "similarity": similarity,
+                    "related_retraction_reasons": reasons,
+                }
+            )
+        return results
+
+    def search_vectors(
+        self,
+        vectors: np.ndarray,
+        top_k: int = 2,
+        backend: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find the papers most similar to each of several vectors.
+
+        The "matrix" and "compact" backends score all queries with
+        matrix-matrix products, and "exact" and "partitioned" with a
+        single SQL statement; the HNSW index can only serve one constant
+        query vector per statement, so "hnsw" searches each vector in turn.
+
+        Args:
+            vectors (np.ndarray):
+                Query embeddings of shape (n, embedding_size).
+            top_k (int, optional):
+                The number of papers to return per query. Defaults to 2.
+            backend (str, optional):
+                Override the engine's backend for this search, e.g. "exact".
+
+        Returns:
+            List[List[Dict[str, Any]]]:
+                One list of records per query, in query order,
+                as returned by `search_vector`.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.embedding_size)
+        backend = backend or self.backend
+        if len(vectors) == 0 or top_k <= 0:
+            return [[] for _ in vectors]
+        if backend == "matrix":
+            return self._search_matrix_batch(vectors, top_k)
+        if backend == "compact":
+            return self._search_compact_batch(vectors, top_k)
+        if backend == "exact":
+            return self._search_exact_batch(vectors, top_k)
+        if backend == "partitioned":
+            return self._search_exact_batch(
+                vectors, top_k, probes=self._probes(vectors)
+            )
+        return [
+            self.search_vector(vector, top_k=top_k, backend=backend)
+            for vector in vectors
+        ]
+
+    def search(self, query: str, top_k: int = 2) -> List[Dict[str, Any]]:
+        """
+        Embed a query once and find the most similar papers.
+
+        Args:
+            query (str):
+                The abstract or query string to search for.
+            top_k (int, optional):
+                The number of papers to return. Defaults to 2.
+
+        Returns:
+            List[Dict[str, Any]]:
+                See `search_vector`.
+        """
+        return self.search_vector(self.embed_fn(query), top_k=top_k)
+
+    def search_batch(
+        self, queries: List[str], top_k: int = 2
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Embed several queries at once and find the most similar papers
+        for each of them.
+
+        Args:
+            queries (List[str]):
+                The abstracts or query strings to search for.
+            top_k (int, optional):
+                The number of papers to return per query. Defaults to 2.
+
+        Returns:
+            List[List[Dict[str, Any]]]:
+                See `search_vectors`.
+        """
+        if not queries:
+            return []
+        if self.embed_batch_fn is not None:
+            vectors = self.embed_batch_fn(list(queries))
+        else:
+            vectors = np.stack([self.embed_fn(query) for query in queries])
+        return self.search_vectors(vectors, top_k=top_k)
+
+    def recall_at_k(self, vectors: np.ndarray, top_k: int = 10) -> float:
+        """
+        Measure the recall@k of the engine's backend against exact search.
+
+        Args:
+            vectors (np.ndarray):
+                Query embeddings of shape (n, embedding_size).
+            top_k (int, optional):
+                Number of neighbours compared per query. Defaults to 10.
+
+        Returns:
+            float: The mean fraction of the exact top-k found by the backend.
+        """
+        recalls = []
+        for vector in vectors:
+            exact = {
+                r["arxiv_id"]
+                for r in self.search_vector(vector, top_k=top_k, backend="exact")
+            }
+            found = {r["arxiv_id"] for r in self.search_vector(vector, top_k=top_k)}
+            recalls.append(len(exact & found) / len(exact) if exact else 1.0)
+        return float(np.mean(recalls))
+
+    def acquire(self) -> bool:
+        """
+        Mark a search as using the engine, so a retired engine stays open
+        until the search calls `release`.
+
+        Returns:
+            bool: False if the engine is already closed, and can't be used.
+        """
+        with self._users_lock:
+            if self._closed:
+                return False
+            self._users += 1
+            return True
+
+    def release(self) -> None:
+        """
+        Mark a search started with `acquire` as done, closing the engine
+        if it's retired and no other search uses it.
+        """
+        with self._users_lock:
+            self._users -= 1
+            if not (self._retired and self._users == 0):
+                return
+        self.close()
+
+    def retire(self) -> None:
+        """
+        Close the engine once the searches using it are done (at once if
+        there are none), e.g. when it's replaced by a newer database's.
+        """
+        with self._users_lock:
+            self._retired = True
+            if self._users:
+                return
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the underlying DuckDB connection and drop the vectors held
+        in memory (or memory-mapped).
+        """
+        with self._users_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._conn.close()
+        self._matrix = None
+        self._compact = None
+        self._compact_ids = None
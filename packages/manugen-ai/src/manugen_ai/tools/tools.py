@@ -4,17 +4,35 @@ Tools for agents within manugen-ai
 
 from __future__ import annotations
 
+import asyncio
 import json
+import os
 import pathlib
+import re
 import tempfile
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Union
+from urllib.parse import quote_plus
 
 import pygit2
-import requests
 from google.adk.tools.tool_context import ToolContext
 from jsonschema import ValidationError, validate
-from manugen_ai.utils import graceful_fail
-from pyalex import Works
+from manugen_ai.extraction import extract_content
+from manugen_ai.http_client import get_http_client
+from manugen_ai.utils import error_message, graceful_fail
+
+OPENALEX_WORKS_URL = "https://api.openalex.org/works"
+# fields of works openalex_query downloads
+OPENALEX_SELECT = "id,doi,title,abstract_inverted_index"
+# most cited works openalex_query returns per topic
+OPENALEX_RESULTS_PER_TOPIC = int(os.environ.get("OPENALEX_RESULTS_PER_TOPIC", "3"))
+# seconds OpenAlex search results are reused from the HTTP cache
+OPENALEX_CACHE_TTL_S = float(os.environ.get("OPENALEX_CACHE_TTL_S", "86400"))
+# (optional) email sent with OpenAlex requests, for its faster "polite pool"
+OPENALEX_MAILTO = os.environ.get("OPENALEX_MAILTO", "")
+# URLs fetch_urls fetches at once (the HTTP client also limits each host)
+FETCH_URLS_MAX_CONCURRENCY = int(os.environ.get("FETCH_URLS_MAX_CONCURRENCY", "16"))
+# largest number of (estimated) tokens fetch_url returns per URL
+FETCH_MAX_TOKENS = int(os.environ.get("FETCH_MAX_TOKENS", "8000"))
 
 
 @graceful_fail()
@@ -47,39 +65,109 @@ def parse_list(text: str) -> List[str]:
     return items
 
 
+def invert_abstract(inverted_index: Dict[str, List[int]] | None) -> str | None:
+    """
+    Rebuild an abstract from an OpenAlex `abstract_inverted_index`,
+    which maps each word to its positions.
+    """
+    if inverted_index is None:
+        return None
+    positions = sorted(
+        (position, word)
+        for word, word_positions in inverted_index.items()
+        for position in word_positions
+    )
+    return " ".join(word for _, word in positions)
+
+
+def split_topics(topics: str) -> List[str]:
+    """
+    Split topics separated by commas, semicolons or lines (optionally as
+    a bullet list) into a list without repeats, ignoring case.
+    """
+    unique = {}
+    for topic in re.split(r"[,;\n]", topics):
+        topic = re.sub(r"\s+", " ", topic.strip().lstrip("-*•").strip())
+        if topic:
+            unique.setdefault(topic.lower(), topic)
+    return list(unique.values())
+
+
+async def _search_openalex_topic(topic: str) -> List[Dict[str, Any]]:
+    """
+    Search OpenAlex for the most cited works with a topic in their abstract.
+    """
+    url = (
+        # the filter value is quoted so commas in topics don't split the filter
+        # (and lowercased, as the search ignores case, so repeats share a cache entry)
+        f"{OPENALEX_WORKS_URL}"
+        # search by abstracts with the topic
+        f"?filter=abstract.search:{quote_plus(topic.lower())}"
+        # filter retractions
+        ",is_retracted:false"
+        # sort descending by citation count
+        "&sort=cited_by_count:desc"
+        # download only the fields we return
+        f"&select={OPENALEX_SELECT}"
+        # set a limit to our results
+        f"&per-page={OPENALEX_RESULTS_PER_TOPIC}"
+    )
+    if OPENALEX_MAILTO:
+        url += f"&mailto={quote_plus(OPENALEX_MAILTO)}"
+
+    response = await get_http_client().get(url, cache_ttl_s=OPENALEX_CACHE_TTL_S)
+    response.raise_for_status()
+    return response.json()["results"]
+
+
 @graceful_fail()
-def openalex_query(topics: str) -> Dict[str, List[Dict[str, Any]]]:
+async def openalex_query(
+    topics: str,
+) -> Dict[str, Union[List[Dict[str, Any]], str]]:
     """
     For each topic, search OpenAlex and return only
-    title and abstract for open-access works.
+    title, abstract and DOI of the most cited works.
 
     Args:
         topics (str):
-            Topics to search for, as a string.
+            Topics to search for, separated by commas.
 
     Returns:
-        Dict[str, List[Dict[str, Any]]]:
+        Dict[str, Union[List[Dict[str, Any]], str]]:
             Mapping from topic to list of dicts with
-            'title' and 'abstract'.
+            'title', 'abstract' and 'doi', or an error message
+            for topics which couldn't be searched. Works found
+            for several topics are listed once, under the first.
     """
-    client = Works()
-    limit = 3
-
-    works = (
-        # search by abstracts with topics
-        client.search_filter(abstract=topics)
-        # filter retractions
-        .filter(is_retracted=False)
-        # sort descending by citation count
-        .sort(cited_by_count="desc")
-        # set a limit to our results
-        .get(per_page=limit)
+    topic_list = split_topics(topics)
+    # search every topic at once, so one failed search doesn't lose the others
+    results = await asyncio.gather(
+        *(_search_openalex_topic(topic) for topic in topic_list),
+        return_exceptions=True,
     )
-    output = [
-        # return only title, abstract, and DOI
-        {"title": w["title"], "abstract": w["abstract"], "doi": w["doi"]}
-        for w in works
-    ]
+
+    seen = set()
+    output = {}
+    for topic, works in zip(topic_list, results):
+        if isinstance(works, BaseException):
+            if not isinstance(works, Exception):
+                # don't swallow cancellation
+                raise works
+            output[topic] = error_message(works)
+            continue
+        output[topic] = []
+        for w in works:
+            if w["id"] in seen:
+                continue
+            seen.add(w["id"])
+            # return only title, abstract, and DOI
+            output[topic].append(
+                {
+                    "title": w["title"],
+                    "abstract": invert_abstract(w.get("abstract_inverted_index")),
+                    "doi": w["doi"],
+                }
+            )
 
     return output
 
@@ -98,7 +186,7 @@ def exit_loop(tool_context: ToolContext):
 
 
 @graceful_fail()
-def fetch_url(url: str) -> str:
+async def fetch_url(url: str) -> str:
     """
     Fetch the text content of a web resource.
 
@@ -106,11 +194,37 @@ def fetch_url(url: str) -> str:
         url: URL to retrieve.
 
     Returns:
-        str: Content of the URL.
+        str: Content of the URL: readable Markdown for web pages,
+            metadata for images and binary files, and other text as is.
     """
-    res = requests.get(url)
+    res = await get_http_client().get(url)
     res.raise_for_status()
-    return res.text
+    # parse pages off the event loop
+    return await asyncio.to_thread(extract_content, res, FETCH_MAX_TOKENS)
+
+
+@graceful_fail()
+async def fetch_urls(urls: List[str]) -> Dict[str, str]:
+    """
+    Fetch the text content of several web resources at once.
+
+    Args:
+        urls (List[str]): URLs of the resources.
+
+    Returns:
+        Dict[str, str]: Content of each URL, or an error message
+            for URLs which couldn't be fetched.
+    """
+    semaphore = asyncio.Semaphore(FETCH_URLS_MAX_CONCURRENCY)
+
+    async def fetch(url: str) -> str:
+        async with semaphore:
+            return await fetch_url(url)
+
+    # fetch repeated URLs once
+    unique_urls = list(dict.fromkeys(urls))
+    contents = await asyncio.gather(*(fetch(url) for url in unique_urls))
+    return dict(zip(unique_urls, contents))
 
 
 @graceful_fail()
@@ -4,11 +4,16 @@ Utils for manugen-ai
 
 from __future__ import annotations
 
+import contextlib
 import functools
+import hashlib
+import inspect
 import itertools
+import logging
 import os
 import pathlib
-from typing import Any, Callable, Literal, Tuple, TypeVar
+import time
+from typing import Any, Callable, Iterator, Literal, Tuple, TypeVar
 
 import requests
 from google.adk.agents import LoopAgent, ParallelAgent, SequentialAgent
@@ -16,17 +21,37 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
 # ruff: noqa: T201
 
+logger = logging.getLogger(__name__)
+
 F = TypeVar("F", bound=Callable[..., Any])
 
 
+def error_message(e: Exception) -> str:
+    """
+    Describe an exception as a friendly error message for an agent.
+
+    Args:
+        e (Exception): The exception.
+
+    Returns:
+        str: The error message.
+    """
+    return f"There was an error or the call was bad. ({type(e).__name__}: {e})"
+
+
 # we leave this with no parameters and will depend on
 # the decorator implementation to wrap functions
 # due to how google-adk parses agent tools as functions.
 def graceful_fail():
     """
-    A decorator that wraps a function to catch
+    A decorator that wraps a function (or coroutine function) to catch
     exceptions and return a friendly error message.
 
     Returns:
@@ -46,14 +71,24 @@ def graceful_fail():
     """
 
     def decorator(func):
+        # keep coroutine functions async, so agents await them as async tools
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    return error_message(e)
+
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             try:
                 return func(*args, **kwargs)
             except Exception as e:
-                return (
-                    f"There was an error or the call was bad. ({type(e).__name__}: {e})"
-                )
+                return error_message(e)
 
         return wrapper
 
@@ -369,16 +404,133 @@ def build_mermaid(
     return mermaid_src, png
 
 
-def download_file_if_not_available(local_path: str, download_url: str):
+@contextlib.contextmanager
+def file_lock(lock_path: str) -> Iterator[None]:
+    """
+    Hold an exclusive OS lock on a file, blocking until it's available,
+    so only one process at a time runs the locked section.
+
+    Args:
+        lock_path (str):
+            Path of the lock file (created if needed).
+    """
+    with open(lock_path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def sha256_file(path: str, chunk_size: int = 2**20) -> str:
+    """
+    Compute the SHA-256 hex digest of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_in:
+        while chunk := file_in.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _download_to_part_file(
+    download_url: str,
+    part_path: str,
+    chunk_size: int,
+    timeout_s: float,
+    progress_interval_s: float,
+) -> None:
+    """
+    Download a URL into a partial file, resuming from the bytes it already
+    holds with an HTTP Range request when the server supports it.
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    with requests.get(
+        download_url, stream=True, headers=headers, timeout=timeout_s
+    ) as response:
+        if response.status_code == 416:
+            # the partial file can't be resumed, so start over
+            os.remove(part_path)
+            raise requests.ConnectionError(f"Cannot resume {part_path}")
+        response.raise_for_status()
+        if offset and response.status_code != 206:
+            logger.info("Server ignored the range request, restarting download")
+            offset = 0
+
+        length = response.headers.get("Content-Length")
+        total = offset + int(length) if length else None
+        start = last_log = time.perf_counter()
+        received = 0
+        with open(part_path, "ab" if offset else "wb") as file_out:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                file_out.write(chunk)
+                received += len(chunk)
+                now = time.perf_counter()
+                if now - last_log >= progress_interval_s:
+                    last_log = now
+                    logger.info(
+                        "Downloaded %.1f of %s MB (%.1f MB/s)",
+                        (offset + received) / 2**20,
+                        f"{total / 2**20:.1f}" if total else "?",
+                        received / 2**20 / (now - start),
+                    )
+
+    if total is not None and os.path.getsize(part_path) < total:
+        raise requests.ConnectionError(
+            f"Download of {download_url} ended after "
+            f"{os.path.getsize(part_path)} of {total} bytes"
+        )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Downloaded %.1f MB in %.1f s (%.1f MB/s)",
+        received / 2**20,
+        elapsed,
+        received / 2**20 / max(elapsed, 1e-9),
+    )
+
+
+def download_file_if_not_available(
+    local_path: str,
+    download_url: str,
+    sha256: str | None = None,
+    max_retries: int = 5,
+    chunk_size: int = 2**20,
+    timeout_s: float = 60.0,
+    progress_interval_s: float = 10.0,
+):
     """
     Check if a file exists locally;
     if not, download it from the given URL.
 
+    Processes downloading the same file wait on an OS lock
+    (`<local_path>.lock`), so only the first one downloads it and the
+    others reuse the result. Data is written to `<local_path>.part`
+    and renamed once complete (and verified), so `local_path` is never
+    a partial file; interrupted transfers resume from the partial file
+    with HTTP Range requests.
+
     Args:
         local_path (str):
             Path (including filename) where the file should be saved.
         download_url (str):
             URL to download the file from.
+        sha256 (str, optional):
+            Expected SHA-256 hex digest of the file.
+        max_retries (int, optional):
+            Interrupted transfers resumed before giving up. Defaults to 5.
+        chunk_size (int, optional):
+            Bytes read from the response at a time. Defaults to 1 MiB.
+        timeout_s (float, optional):
+            Connect and read timeout in seconds. Defaults to 60.
+        progress_interval_s (float, optional):
+            Seconds between progress logs. Defaults to 10.
+
+    Raises:
+        ValueError: If the downloaded file doesn't match `sha256`.
     """
 
     # if the path exists, return it
@@ -388,13 +540,43 @@ def download_file_if_not_available(local_path: str, download_url: str):
     # ensure the directory exists
     os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
-    # Stream download to avoid loading the entire file into memory
-    with requests.get(download_url, stream=True) as response:
-        response.raise_for_status()
-        with open(local_path, "wb") as file_out:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    file_out.write(chunk)
+    with file_lock(f"{local_path}.lock"):
+        # another process may have downloaded the file while we waited
+        if pathlib.Path(local_path).is_file():
+            return local_path
+
+        part_path = f"{local_path}.part"
+        logger.info("Downloading %s to %s", download_url, local_path)
+        for attempt in range(max_retries + 1):
+            try:
+                _download_to_part_file(
+                    download_url,
+                    part_path,
+                    chunk_size=chunk_size,
+                    timeout_s=timeout_s,
+                    progress_interval_s=progress_interval_s,
+                )
+                break
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                if attempt == max_retries:
+                    raise
+                logger.warning("Download interrupted (%s), resuming", e)
+                time.sleep(min(2**attempt, 30))
+
+        if sha256 is not None:
+            digest = sha256_file(part_path)
+            if digest != sha256.lower():
+                os.remove(part_path)
+                raise ValueError(
+                    f"Checksum mismatch for {download_url}: "
+                    f"expected sha256 {sha256}, got {digest}"
+                )
+
+        os.replace(part_path, local_path)
 
     # we now have the file so we can return the local path
     return local_path
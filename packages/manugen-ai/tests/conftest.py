@@ -2,11 +2,39 @@
 conftest for pytest fixutres and related
 """
 
+import json
 import pathlib
 import tempfile
-from typing import Any, Generator
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Generator, Tuple
 
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
+from manugen_ai import data, http_client
+
+
+@pytest.fixture(autouse=True)
+def hashing_embedding_provider(monkeypatch) -> None:
+    """
+    Embed with the deterministic "hashing" provider unless a test picks
+    another, so tests never load a model or call an embeddings API.
+    """
+    monkeypatch.setattr(data, "EMBEDDING_PROVIDER", "hashing")
+    monkeypatch.setattr(data, "_EMBEDDING_PROVIDERS", {})
+
+
+@pytest.fixture(autouse=True)
+def temp_http_cache(monkeypatch, tmp_path: pathlib.Path) -> None:
+    """
+    Give each test a new shared HTTP client with an empty response cache.
+    """
+    monkeypatch.setattr(http_client, "HTTP_CACHE_DIR", str(tmp_path / "http_cache"))
+    monkeypatch.setattr(http_client, "_HTTP_CLIENT", None)
 
 
 @pytest.fixture
@@ -23,3 +51,354 @@ def temp_markdown_dir() -> Generator[
     (dir_path / "methods.md").write_text("# Methods\n\nDetails about the methods.")
     yield dir_path
     temp_dir.cleanup()
+
+
+@pytest.fixture
+def withdrarxiv_db(tmp_path: pathlib.Path) -> Tuple[str, np.ndarray]:
+    """
+    Create a small withdrarxiv embeddings database with
+    random unit vectors, returning its path and the vectors.
+    """
+    n_rows, dim = 50, 8
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n_rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"2401.{i:05d}" for i in range(n_rows)]
+
+    db_path = str(tmp_path / "withdrarxiv_embeddings_test.duckdb")
+    conn = duckdb.connect(db_path)
+    conn.register(
+        "papers_src",
+        pa.table(
+            {
+                "arxiv_id": ids,
+                "title": [f"title {i}" for i in range(n_rows)],
+                "abstract": [f"abstract {i}" for i in range(n_rows)],
+                "subjects": ["Machine Learning (cs.LG)"] * n_rows,
+                "scrubbed_comments": [f"reason {i}" for i in range(n_rows)],
+                "category": ["factual/methodological/other critical errors"] * n_rows,
+            }
+        ),
+    )
+    conn.execute("CREATE TABLE papers AS SELECT * FROM papers_src")
+    conn.register(
+        "embeddings_src",
+        pa.table(
+            {
+                "arxiv_id": ids,
+                "embedding": pa.FixedSizeListArray.from_arrays(
+                    pa.array(vectors.ravel()), dim
+                ),
+            }
+        ),
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE embeddings AS
+        SELECT arxiv_id, embedding::FLOAT[{dim}] AS embedding
+        FROM embeddings_src
+        """
+    )
+    conn.close()
+
+    return db_path, vectors
+
+
+@pytest.fixture
+def withdrarxiv_parquet(tmp_path: pathlib.Path) -> str:
+    """
+    Create a small withdrarxiv-shaped Parquet file, including
+    rows from categories which should be filtered out.
+    """
+    n_rows = 30
+    categories = ["factual/methodological/other critical errors"] * n_rows
+    categories[3] = "reason not specified"
+    categories[4] = "subsumed by another publication"
+    parquet_path = str(tmp_path / "withdrarxiv.parquet")
+    pq.write_table(
+        pa.table(
+            {
+                "arxiv_id": [f"2402.{i:05d}" for i in range(n_rows)],
+                "title": [f"title {i}" for i in range(n_rows)],
+                "abstract": [f"abstract {i}" for i in range(n_rows)],
+                "subjects": ["Machine Learning (cs.LG)"] * n_rows,
+                "scrubbed_comments": [f"reason {i}" for i in range(n_rows)],
+                "category": categories,
+            }
+        ),
+        parquet_path,
+    )
+    return parquet_path
+
+
+class FakeEmbeddingServer:
+    """
+    A local stand-in for the Gemini `batchEmbedContents` endpoint.
+
+    Each text is embedded as a one-hot vector with 8 components at
+    `int(last word) % 8`. Statuses queued in `fail_with` are returned
+    (one per request) before any request succeeds.
+    """
+
+    def __init__(self, latency_s: float = 0.01):
+        self.latency_s = latency_s
+        self.fail_with = []
+        self.batch_sizes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server.lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    status = server.fail_with.pop(0) if server.fail_with else 200
+                time.sleep(server.latency_s)
+                with server.lock:
+                    server.in_flight -= 1
+
+                if status == 200:
+                    texts = [r["content"]["parts"][0]["text"] for r in body["requests"]]
+                    with server.lock:
+                        server.batch_sizes.append(len(texts))
+                    payload = {"embeddings": []}
+                    for text in texts:
+                        values = [0.0] * 8
+                        values[int(text.split()[-1]) % 8] = 1.0
+                        payload["embeddings"].append({"values": values})
+                else:
+                    payload = {"error": {"code": status, "message": "fake error"}}
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def fake_embedding_server() -> Generator[FakeEmbeddingServer, Any, Any]:
+    """
+    Run a fake Gemini embedding server on localhost.
+    """
+    server = FakeEmbeddingServer()
+    thread = threading.Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+class FakeFileServer:
+    """
+    A local file server supporting HTTP Range requests.
+
+    The first `truncate_after` bytes of the next response are sent
+    before the connection is dropped, if set, to simulate an
+    interrupted transfer.
+    """
+
+    def __init__(self, payload: bytes, latency_s: float = 0.1):
+        self.payload = payload
+        self.latency_s = latency_s
+        self.truncate_after = None
+        self.ranges = []
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/withdrarxiv.duckdb"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.latency_s)
+                range_header = self.headers.get("Range")
+                with server.lock:
+                    server.ranges.append(range_header)
+                    truncate_after = server.truncate_after
+                    server.truncate_after = None
+
+                start = 0
+                if range_header:
+                    start = int(range_header.removeprefix("bytes=").split("-")[0])
+                    self.send_response(206)
+                    self.send_header(
+                        "Content-Range",
+                        f"bytes {start}-{len(server.payload) - 1}/{len(server.payload)}",
+                    )
+                else:
+                    self.send_response(200)
+                body = server.payload[start:]
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if truncate_after is not None:
+                    self.wfile.write(body[:truncate_after])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def fake_file_server() -> Generator[FakeFileServer, Any, Any]:
+    """
+    Serve 3 MiB of random bytes on localhost.
+    """
+    server = FakeFileServer(np.random.default_rng(0).bytes(3 * 2**20))
+    thread = threading.Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+class FakeWebServer:
+    """
+    A local web server with slow responses which counts concurrent requests.
+
+    `routes` maps paths to a content type, body and optionally extra
+    response headers; other paths are 404s. Conditional requests matching
+    a route's ETag or Last-Modified header get a 304 Not Modified. Bodies
+    of paths starting with "/stream" are sent without a Content-Length
+    header.
+    """
+
+    def __init__(self, routes: dict, latency_s: float = 0.0):
+        self.routes = routes
+        self.latency_s = latency_s
+        self.paths = []
+        self.not_modified = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    server.paths.append(self.path)
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    time.sleep(server.latency_s)
+                    route = server.routes.get(self.path.split("?")[0])
+                    if route is None:
+                        self.send_error(404)
+                        return
+                    content_type, body, *extra = route
+                    extra_headers = extra[0] if extra else {}
+                    if any(
+                        self.headers.get(request_header) is not None
+                        and self.headers.get(request_header)
+                        == extra_headers.get(response_header)
+                        for request_header, response_header in (
+                            ("If-None-Match", "ETag"),
+                            ("If-Modified-Since", "Last-Modified"),
+                        )
+                    ):
+                        with server.lock:
+                            server.not_modified += 1
+                        self.send_response(304)
+                        for name, value in extra_headers.items():
+                            self.send_header(name, value)
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", content_type)
+                    for name, value in extra_headers.items():
+                        self.send_header(name, value)
+                    if not self.path.startswith("/stream"):
+                        self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server.lock:
+                        server.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def fake_web_server() -> Generator[FakeWebServer, Any, Any]:
+    """
+    Serve a web page, OpenAlex-like works, large bodies and responses
+    with caching headers on localhost.
+    """
+    works = {
+        "results": [
+            {
+                "id": "https://openalex.org/W1",
+                "title": "Gene expression in yeast",
+                "abstract_inverted_index": {"expression": [1], "Gene": [0]},
+                "doi": "https://doi.org/10.1234/yeast",
+            },
+            {
+                "id": "https://openalex.org/W2",
+                "title": "No abstract",
+                "abstract_inverted_index": None,
+                "doi": None,
+            },
+        ]
+    }
+    server = FakeWebServer(
+        {
+            "/page": ("text/html; charset=utf-8", b"<h1>Example Domain</h1>"),
+            "/works": ("application/json", json.dumps(works).encode("utf-8")),
+            "/large": ("application/octet-stream", b"x" * 2**16),
+            "/stream": ("application/octet-stream", b"x" * 2**16),
+            "/fresh": (
+                "text/plain",
+                b"protocol v1",
+                {"Cache-Control": "max-age=3600"},
+            ),
+            "/etag": (
+                "text/plain",
+                b"protocol v1",
+                {"Cache-Control": "no-cache", "ETag": '"v1"'},
+            ),
+            "/last-modified": (
+                "text/plain",
+                b"protocol v1",
+                {
+                    "Cache-Control": "max-age=0",
+                    "Last-Modified": "Mon, 06 Oct 2025 10:00:00 GMT",
+                },
+            ),
+            "/no-store": (
+                "text/plain",
+                b"protocol v1",
+                {"Cache-Control": "no-store", "ETag": '"v1"'},
+            ),
+        },
+        latency_s=0.05,
+    )
+    thread = threading.Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
@@ -0,0 +1,773 @@
+"""
+Tests for withdrarxiv embedding search
+"""
+
+import asyncio
+import json
+import pathlib
+import threading
+import time
+
+import duckdb
+import numpy as np
+import pytest
+from manugen_ai import data
+from manugen_ai.search import (
+    PARTITIONED_EMBEDDINGS_TABLE,
+    PARTITIONS_TABLE,
+    WithdrarxivSearchEngine,
+    create_embedding_partitions,
+    create_hnsw_index,
+    export_compact_embeddings,
+    export_embedding_matrix,
+    get_compact_db_path,
+    get_matrix_path,
+    load_vss_extension,
+)
+
+
+def test_search_engine_embeds_query_once(withdrarxiv_db) -> None:
+    """The query is embedded once per search and results are ordered."""
+    db_path, vectors = withdrarxiv_db
+    calls = []
+
+    def embed_fn(text: str) -> np.ndarray:
+        calls.append(text)
+        return vectors[7]
+
+    engine = WithdrarxivSearchEngine(
+        db_path=db_path, embed_fn=embed_fn, embedding_size=vectors.shape[1]
+    )
+    results = engine.search("a draft abstract", top_k=3)
+    engine.close()
+
+    assert calls == ["a draft abstract"]
+    assert len(results) == 3
+    assert results[0]["arxiv_id"] == "2401.00007"
+    assert results[0]["related_retraction_reasons"] == "reason 7"
+    similarities = [result["similarity"] for result in results]
+    assert similarities == sorted(similarities, reverse=True)
+    assert np.argsort(-(vectors @ vectors[7]))[:3].tolist() == [
+        int(result["arxiv_id"].split(".")[1]) for result in results
+    ]
+
+
+def test_search_withdrarxiv_embeddings_reuses_engine(
+    withdrarxiv_db, monkeypatch
+) -> None:
+    """The search tool reuses one engine and returns JSON records."""
+    db_path, vectors = withdrarxiv_db
+    monkeypatch.setattr(data, "get_withdrarxiv_db_path", lambda: db_path)
+    monkeypatch.setattr(data, "embed", lambda text: vectors[0])
+    monkeypatch.setattr(data, "get_embedding_size", lambda: vectors.shape[1])
+    monkeypatch.setattr(data, "_SEARCH_ENGINE", None)
+
+    first = json.loads(data.search_withdrarxiv_embeddings("query", top_k=2))
+    engine = data.get_withdrarxiv_search_engine()
+    second = json.loads(data.search_withdrarxiv_embeddings("query", top_k=2))
+
+    assert first == second
+    assert first[0] == {"related_retraction_reasons": "reason 0"}
+    assert data.get_withdrarxiv_search_engine() is engine
+    engine.close()
+
+
+def test_asearch_withdrarxiv_embeddings_matches_sync(
+    withdrarxiv_db, monkeypatch
+) -> None:
+    """The async search tool returns what the sync one does, off the loop."""
+    db_path, vectors = withdrarxiv_db
+    monkeypatch.setattr(data, "get_withdrarxiv_db_path", lambda: db_path)
+    monkeypatch.setattr(data, "HASHING_EMBEDDING_SIZE", vectors.shape[1])
+    monkeypatch.setattr(data, "USE_EMBEDDING_CACHE", False)
+    monkeypatch.setattr(data, "_SEARCH_ENGINE", None)
+    monkeypatch.setattr(data, "_SEARCH_EXECUTOR", None)
+    search_threads = []
+    search_vector = data._search_withdrarxiv_vector
+
+    def recording_search_vector(vector: np.ndarray, top_k: int):
+        search_threads.append(threading.current_thread().name)
+        return search_vector(vector, top_k)
+
+    monkeypatch.setattr(data, "_search_withdrarxiv_vector", recording_search_vector)
+
+    async def search_concurrently() -> list[str]:
+        return await asyncio.gather(
+            *(
+                data.asearch_withdrarxiv_embeddings(f"draft abstract {i}", top_k=3)
+                for i in range(4)
+            )
+        )
+
+    results = asyncio.run(search_concurrently())
+    expected = [
+        data.search_withdrarxiv_embeddings(f"draft abstract {i}", top_k=3)
+        for i in range(4)
+    ]
+    data.get_withdrarxiv_search_engine().close()
+    data.get_withdrarxiv_search_executor().shutdown()
+
+    assert results == expected
+    assert len(json.loads(results[0])) == 3
+    assert len(search_threads) == 4
+    assert all(name.startswith("withdrarxiv-search") for name in search_threads)
+
+
+def test_search_batch_matches_single_searches(withdrarxiv_db) -> None:
+    """Batched searches embed once and match per-query searches."""
+    db_path, vectors = withdrarxiv_db
+    conn = duckdb.connect(db_path)
+    export_embedding_matrix(conn, get_matrix_path(db_path), embedding_size=8)
+    conn.close()
+    queries = [f"draft {i}" for i in (3, 11, 42)]
+    batches = []
+
+    def embed_batch_fn(texts: list[str]) -> np.ndarray:
+        batches.append(texts)
+        return vectors[[int(text.split()[-1]) for text in texts]]
+
+    for backend in ("exact", "matrix"):
+        engine = WithdrarxivSearchEngine(
+            db_path=db_path,
+            embed_fn=lambda text: vectors[int(text.split()[-1])],
+            embed_batch_fn=embed_batch_fn,
+            embedding_size=vectors.shape[1],
+            backend=backend,
+        )
+        results = engine.search_batch(queries, top_k=4)
+        expected = [engine.search(query, top_k=4) for query in queries]
+        engine.close()
+
+        assert len(results) == 3
+        for batch_results, single_results in zip(results, expected):
+            assert [r["arxiv_id"] for r in batch_results] == [
+                r["arxiv_id"] for r in single_results
+            ]
+            assert np.allclose(
+                [r["similarity"] for r in batch_results],
+                [r["similarity"] for r in single_results],
+            )
+        assert results[1][0]["related_retraction_reasons"] == "reason 11"
+
+    assert batches == [queries, queries]
+
+
+def test_search_withdrarxiv_embeddings_batch(withdrarxiv_db, monkeypatch) -> None:
+    """The batch search tool returns one list of JSON records per query."""
+    db_path, vectors = withdrarxiv_db
+    monkeypatch.setattr(data, "get_withdrarxiv_db_path", lambda: db_path)
+    monkeypatch.setattr(data, "embed_batch", lambda texts: vectors[: len(texts)].copy())
+    monkeypatch.setattr(data, "get_embedding_size", lambda: vectors.shape[1])
+    monkeypatch.setattr(data, "_SEARCH_ENGINE", None)
+
+    results = json.loads(
+        data.search_withdrarxiv_embeddings_batch(["a", "b", "c"], top_k=2)
+    )
+    data.get_withdrarxiv_search_engine().close()
+
+    assert [len(query_results) for query_results in results] == [2, 2, 2]
+    assert results[2][0] == {"related_retraction_reasons": "reason 2"}
+
+
+def test_search_engine_switches_to_published_database(
+    withdrarxiv_db, monkeypatch, tmp_path: pathlib.Path
+) -> None:
+    """Workers switch to a newly published database once it's loaded in the
+    background, closing the previous one when its searches are done."""
+    db_path, vectors = withdrarxiv_db
+    manifest_path = str(tmp_path / "withdrarxiv_embeddings_test.manifest.json")
+    monkeypatch.setattr(data, "WITHDRARXIV_MANIFEST_PATH", manifest_path)
+    monkeypatch.setattr(data, "get_model_name", lambda: "test-model")
+    monkeypatch.setattr(data, "embed", lambda text: vectors[0])
+    monkeypatch.setattr(data, "get_embedding_size", lambda: vectors.shape[1])
+    monkeypatch.setattr(data, "_SEARCH_ENGINE", None)
+    monkeypatch.setattr(data, "_SEARCH_ENGINE_MANIFEST_STAT", None)
+    monkeypatch.setattr(data, "_SEARCH_ENGINE_SWITCH", None)
+
+    manifest = data.publish_withdrarxiv_embeddings(db_path, version="1")
+    assert manifest.rows == len(vectors)
+    first = data.get_withdrarxiv_search_engine()
+    assert first.db_path == db_path
+    assert data.get_withdrarxiv_search_engine() is first
+
+    # publish a refreshed copy of the database under a new file name
+    new_db_path = str(tmp_path / "withdrarxiv_embeddings_test_v2.duckdb")
+    conn = duckdb.connect(new_db_path)
+    conn.execute(f"ATTACH '{db_path}' AS v1 (READ_ONLY)")
+    conn.execute("CREATE TABLE embeddings AS SELECT * FROM v1.embeddings")
+    conn.execute(
+        "CREATE TABLE papers AS "
+        "SELECT * REPLACE ('new ' || scrubbed_comments AS scrubbed_comments) "
+        "FROM v1.papers"
+    )
+    conn.close()
+    # a search still running on the previous engine
+    assert first.acquire()
+    data.publish_withdrarxiv_embeddings(new_db_path, version="2")
+
+    # the search noticing the new manifest isn't held up while it loads
+    assert data.get_withdrarxiv_search_engine() is first
+    data._SEARCH_ENGINE_SWITCH.join()
+    results = json.loads(data.search_withdrarxiv_embeddings("query", top_k=1))
+    assert results == [{"related_retraction_reasons": "new reason 0"}]
+    second = data.get_withdrarxiv_search_engine()
+    assert second is not first and second.db_path == new_db_path
+    # the running search keeps working, and closes the engine when done
+    assert first.search("query", top_k=1)[0]["related_retraction_reasons"] == (
+        "reason 0"
+    )
+    first.release()
+    assert not first.acquire()
+
+    # a database which doesn't match the model being used is ignored
+    monkeypatch.setattr(data, "get_model_name", lambda: "other-model")
+    data.publish_withdrarxiv_embeddings(db_path, version="3")
+    monkeypatch.setattr(data, "get_model_name", lambda: "test-model")
+    assert data.get_withdrarxiv_search_engine() is second
+    data._SEARCH_ENGINE_SWITCH.join()
+    assert data.get_withdrarxiv_search_engine() is second
+
+    second.close()
+
+
+def test_search_engine_falls_back_to_exact(withdrarxiv_db) -> None:
+    """Without an HNSW index, the engine uses exact search."""
+    db_path, vectors = withdrarxiv_db
+    engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[0],
+        embedding_size=vectors.shape[1],
+        backend="hnsw",
+    )
+
+    assert engine.backend == "exact"
+    assert engine.recall_at_k(vectors[:5], top_k=5) == 1.0
+    engine.close()
+
+
+def test_search_engine_hnsw_recall(withdrarxiv_db) -> None:
+    """With an HNSW index, the engine uses it and reports recall."""
+    db_path, vectors = withdrarxiv_db
+    conn = duckdb.connect(db_path)
+    if not load_vss_extension(conn):
+        conn.close()
+        pytest.skip("DuckDB vss extension is not available")
+    create_hnsw_index(conn)
+    conn.close()
+
+    engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[3],
+        embedding_size=vectors.shape[1],
+    )
+
+    assert engine.backend == "hnsw"
+    assert engine.search("query", top_k=1)[0]["arxiv_id"] == "2401.00003"
+    assert 0.0 <= engine.recall_at_k(vectors[:10], top_k=5) <= 1.0
+    engine.close()
+
+
+def test_search_engine_matrix_backend(withdrarxiv_db) -> None:
+    """The matrix backend matches exact search over the DuckDB table."""
+    db_path, vectors = withdrarxiv_db
+    conn = duckdb.connect(db_path)
+    matrix_path = export_embedding_matrix(
+        conn,
+        matrix_path=get_matrix_path(db_path),
+        embedding_size=vectors.shape[1],
+        chunk_size=7,
+    )
+    conn.close()
+
+    matrix = np.load(matrix_path, mmap_mode="r")
+    assert matrix.shape == vectors.shape
+
+    engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[11],
+        embedding_size=vectors.shape[1],
+    )
+    assert engine.backend == "matrix"
+
+    results = engine.search("query", top_k=4)
+    exact = engine.search_vector(vectors[11], top_k=4, backend="exact")
+    assert [r["arxiv_id"] for r in results] == [r["arxiv_id"] for r in exact]
+    assert results[0]["related_retraction_reasons"] == "reason 11"
+    assert np.allclose(
+        [r["similarity"] for r in results], [r["similarity"] for r in exact]
+    )
+    engine.close()
+
+
+@pytest.mark.parametrize(
+    "dtype, dim, candidates",
+    [("int8", None, 10), ("float16", 4, 50)],
+)
+def test_search_engine_compact_backend(
+    withdrarxiv_db, dtype: str, dim: int, candidates: int
+) -> None:
+    """The compact backend's reranked top-k matches exact search."""
+    db_path, vectors = withdrarxiv_db
+    compact_db_path = export_compact_embeddings(
+        db_path,
+        compact_db_path=get_compact_db_path(db_path),
+        embedding_size=vectors.shape[1],
+        dtype=dtype,
+        dim=dim,
+        chunk_size=7,
+    )
+
+    exact_engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[0],
+        embedding_size=vectors.shape[1],
+        backend="exact",
+    )
+    engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[0],
+        embedding_size=vectors.shape[1],
+        compact_rerank_candidates=candidates,
+    )
+    assert engine.backend == "compact"
+    assert engine.compact_db_path == compact_db_path
+    assert engine._compact.shape == (len(vectors), dim or vectors.shape[1])
+    # the compact database holds no papers or full vectors
+    conn = duckdb.connect(compact_db_path, read_only=True)
+    assert {row[0] for row in conn.execute("SHOW TABLES").fetchall()} == {
+        "compact_embeddings",
+        "compact_embedding_info",
+    }
+    conn.close()
+
+    results = engine.search_vectors(vectors[:6], top_k=3)
+    for vector, query_results in zip(vectors[:6], results):
+        exact = exact_engine.search_vector(vector, top_k=3)
+        assert [r["arxiv_id"] for r in query_results] == [r["arxiv_id"] for r in exact]
+        assert np.allclose(
+            [r["similarity"] for r in query_results],
+            [r["similarity"] for r in exact],
+            atol=1e-6,
+        )
+    assert engine.search("query", top_k=1)[0]["related_retraction_reasons"] == (
+        "reason 0"
+    )
+    engine.close()
+    exact_engine.close()
+
+
+def test_search_engine_ignores_stale_compact_embeddings(withdrarxiv_db) -> None:
+    """Compact embeddings exported before the database changed aren't used."""
+    db_path, vectors = withdrarxiv_db
+    export_compact_embeddings(
+        db_path,
+        compact_db_path=get_compact_db_path(db_path),
+        embedding_size=vectors.shape[1],
+    )
+    conn = duckdb.connect(db_path)
+    # the same number of rows, with one paper replaced by another
+    conn.execute(
+        "UPDATE embeddings SET arxiv_id = '2402.00000' WHERE arxiv_id = '2401.00000'"
+    )
+    conn.close()
+
+    engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[0],
+        embedding_size=vectors.shape[1],
+        backend="compact",
+    )
+    assert engine.backend == "exact"
+    engine.close()
+
+
+@pytest.mark.parametrize("method, n_partitions", [("subject", 3), ("kmeans", 5)])
+def test_search_engine_partitioned_backend(
+    withdrarxiv_db, method: str, n_partitions: int
+) -> None:
+    """Searching every partition matches exact search, and fewer
+    partitions only returns papers from those partitions."""
+    db_path, vectors = withdrarxiv_db
+    conn = duckdb.connect(db_path)
+    conn.execute(
+        """
+        UPDATE papers SET subjects = ['Machine Learning (cs.LG)',
+          'Algebraic Geometry (math.AG)',
+          'High Energy Physics - Theory (hep-th)'][
+            (split_part(arxiv_id, '.', 2)::INTEGER % 3) + 1
+          ]
+        """
+    )
+    assert (
+        create_embedding_partitions(
+            conn,
+            embedding_size=vectors.shape[1],
+            method=method,
+            n_partitions=n_partitions,
+            chunk_size=7,
+        )
+        == n_partitions
+    )
+    partition_of = dict(
+        conn.execute(
+            f"SELECT arxiv_id, partition_id FROM {PARTITIONS_TABLE}"
+        ).fetchall()
+    )
+    conn.close()
+    if method == "subject":
+        assert partition_of["2401.00000"] == partition_of["2401.00003"]
+        assert partition_of["2401.00000"] != partition_of["2401.00001"]
+
+    engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[0],
+        embedding_size=vectors.shape[1],
+        nprobe=n_partitions,
+    )
+    assert engine.backend == "partitioned"
+    results = engine.search_vectors(vectors[:5], top_k=4)
+    for vector, query_results in zip(vectors[:5], results):
+        exact = engine.search_vector(vector, top_k=4, backend="exact")
+        assert [r["arxiv_id"] for r in query_results] == [r["arxiv_id"] for r in exact]
+    assert engine.search("query", top_k=1)[0]["arxiv_id"] == "2401.00000"
+
+    engine.nprobe = 1
+    for query_results in engine.search_vectors(vectors[:5], top_k=4):
+        assert len({partition_of[r["arxiv_id"]] for r in query_results}) == 1
+    assert 0.0 <= engine.recall_at_k(vectors[:10], top_k=4) <= 1.0
+    engine.close()
+
+    # partitions missing rows added to the embeddings since are not used
+    conn = duckdb.connect(db_path)
+    conn.execute(
+        "INSERT INTO embeddings SELECT '2402.00000', embedding FROM embeddings LIMIT 1"
+    )
+    conn.close()
+    engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[0],
+        embedding_size=vectors.shape[1],
+        backend="partitioned",
+    )
+    assert engine.backend == "exact"
+    engine.close()
+
+
+def test_search_engine_partitioned_backend_prunes_rows(
+    withdrarxiv_db, tmp_path
+) -> None:
+    """Searching one partition scans only that partition's embeddings."""
+    db_path, vectors = withdrarxiv_db
+    conn = duckdb.connect(db_path)
+    create_embedding_partitions(
+        conn, embedding_size=vectors.shape[1], method="kmeans", n_partitions=5
+    )
+    sizes = dict(
+        conn.execute(
+            f"SELECT partition_id, count(*) FROM {PARTITIONS_TABLE} GROUP BY ALL"
+        ).fetchall()
+    )
+    conn.close()
+
+    engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[0],
+        embedding_size=vectors.shape[1],
+        nprobe=1,
+    )
+    profile_path = tmp_path / "profile.json"
+    cursor = engine._cursor()
+    cursor.execute("SET enable_profiling = 'json';")
+    cursor.execute(f"SET profiling_output = '{profile_path}';")
+    engine.search_vectors(vectors[:1], top_k=2)
+    cursor.execute("SET enable_profiling = 'no_output';")
+    probe = int(engine._probes(vectors[:1])[0, 0])
+    engine.close()
+
+    def scanned_rows(node: dict) -> int:
+        rows = sum(scanned_rows(child) for child in node.get("children", []))
+        if node.get("extra_info", {}).get("Table") == PARTITIONED_EMBEDDINGS_TABLE:
+            rows += node["operator_cardinality"]
+        return rows
+
+    assert scanned_rows(json.loads(profile_path.read_text())) == sizes[probe]
+
+
+def fake_embed_batch(
+    texts: list[str], batch_size: int = 4, use_cache: bool = True
+) -> np.ndarray:
+    """A deterministic stand-in for embed_batch with 8 components."""
+    embs = np.zeros((len(texts), 8), dtype=np.float32)
+    for row, text in enumerate(texts):
+        embs[row, int(text.split()[-1]) % 8] = 1.0
+    return embs
+
+
+class RecordingFlagModel:
+    """A stand-in for BGEM3FlagModel which records its calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=4, max_length=None):
+        self.calls.append((list(texts), batch_size, max_length))
+        return {"dense_vecs": fake_embed_batch(texts).astype(np.float64)}
+
+
+def test_encode_with_flag_embedding_model(monkeypatch) -> None:
+    """Texts are passed to the model as is, which batches them by length."""
+    model = RecordingFlagModel()
+    monkeypatch.setattr(data, "_EMBEDDING_MODEL", model)
+    monkeypatch.setattr(data, "FLAGEMBEDDING_MAX_LENGTH", 512)
+    texts = [f"text {i}" for i in range(5)]
+
+    embs = data.encode_with_flag_embedding_model(texts, batch_size=3)
+
+    assert embs.dtype == np.float32
+    assert np.array_equal(embs, fake_embed_batch(texts))
+    assert model.calls == [(texts, 3, 512)]
+
+
+def test_export_flag_embedding_model_to_onnx_once(tmp_path, monkeypatch) -> None:
+    """Concurrent callers wait for one export rather than racing."""
+    from manugen_ai import onnx_embeddings
+
+    exports = []
+
+    def fake_export(model_name_or_path, output_dir, cache_dir=None):
+        exports.append(output_dir)
+        time.sleep(0.1)
+        pathlib.Path(output_dir).mkdir()
+        return output_dir
+
+    monkeypatch.setattr(onnx_embeddings, "export_bge_m3_onnx", fake_export)
+    monkeypatch.setattr(data, "FLAGEMBEDDING_ONNX_DIR", str(tmp_path / "onnx" / "m"))
+    threads = [
+        threading.Thread(target=data.export_flag_embedding_model_to_onnx)
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert exports == [str(tmp_path / "onnx" / "m")]
+
+
+def test_create_withdrarxiv_embeddings_resumes(
+    withdrarxiv_parquet, tmp_path, monkeypatch
+) -> None:
+    """An interrupted build resumes after its last committed batch."""
+    monkeypatch.setattr(data, "get_embedding_size", lambda: 8)
+    target_db = str(tmp_path / "withdrarxiv_embeddings_test.duckdb")
+    embedded = []
+
+    def failing_embed_batch(
+        texts: list[str], batch_size: int = 4, use_cache: bool = True
+    ) -> np.ndarray:
+        if len(embedded) >= 10:
+            raise RuntimeError("build killed")
+        embedded.extend(texts)
+        return fake_embed_batch(texts)
+
+    monkeypatch.setattr(data, "embed_batch", failing_embed_batch)
+    with pytest.raises(RuntimeError):
+        data.create_withdrarxiv_embeddings(
+            target_db=target_db, batch_size=5, parquet_path=withdrarxiv_parquet
+        )
+    assert len(embedded) == 10
+
+    def counting_embed_batch(
+        texts: list[str], batch_size: int = 4, use_cache: bool = True
+    ) -> np.ndarray:
+        embedded.extend(texts)
+        return fake_embed_batch(texts)
+
+    monkeypatch.setattr(data, "embed_batch", counting_embed_batch)
+    data.create_withdrarxiv_embeddings(
+        target_db=target_db, batch_size=5, parquet_path=withdrarxiv_parquet
+    )
+
+    # each of the 28 papers kept is embedded exactly once across both runs
+    assert len(embedded) == len(set(embedded)) == 28
+    conn = duckdb.connect(target_db, read_only=True)
+    assert conn.execute(
+        "SELECT count(*), count(DISTINCT arxiv_id) FROM embeddings"
+    ).fetchone() == (28, 28)
+    conn.close()
+    assert np.load(get_matrix_path(target_db)).shape == (28, 8)
+
+
+def test_create_withdrarxiv_embeddings_resumes_only_same_build(
+    withdrarxiv_parquet, tmp_path, monkeypatch
+) -> None:
+    """Finished builds and builds with other inputs are rebuilt, not resumed."""
+    monkeypatch.setattr(data, "get_embedding_size", lambda: 8)
+    target_db = str(tmp_path / "withdrarxiv_embeddings_test.duckdb")
+    embedded = []
+
+    def counting_embed_batch(
+        texts: list[str], batch_size: int = 4, use_cache: bool = True
+    ) -> np.ndarray:
+        embedded.extend(texts)
+        return fake_embed_batch(texts)[:, : data.get_embedding_size()]
+
+    def build(parquet_path: str) -> list:
+        embedded.clear()
+        data.create_withdrarxiv_embeddings(
+            target_db=target_db,
+            export_matrix=False,
+            batch_size=5,
+            parquet_path=parquet_path,
+            partitions="subject",
+        )
+        conn = duckdb.connect(target_db, read_only=True)
+        rows = conn.execute(
+            "SELECT arxiv_id, embedding FROM embeddings ORDER BY arxiv_id"
+        ).fetchall()
+        assert conn.execute("SELECT completed FROM build_checkpoint").fetchone()[0]
+        conn.close()
+        return rows
+
+    monkeypatch.setattr(data, "embed_batch", counting_embed_batch)
+    assert len(build(withdrarxiv_parquet)) == 28
+    # a finished build is rebuilt rather than kept as is
+    assert len(build(withdrarxiv_parquet)) == 28
+    assert len(embedded) == 28
+
+    # new data
+    fewer = str(tmp_path / "fewer.parquet")
+    conn = duckdb.connect()
+    conn.execute(f"COPY (SELECT * FROM '{withdrarxiv_parquet}' LIMIT 10) TO '{fewer}'")
+    conn.close()
+    assert len(build(fewer)) == 8
+
+    # a new embedding size
+    monkeypatch.setattr(data, "get_embedding_size", lambda: 4)
+    rows = build(fewer)
+    assert len(embedded) == 8
+    assert {len(embedding) for _, embedding in rows} == {4}
+    engine = WithdrarxivSearchEngine(
+        db_path=target_db, embed_fn=lambda text: np.ones(4), embedding_size=4
+    )
+    assert engine.backend == "partitioned"
+    engine.close()
+
+
+def test_create_withdrarxiv_embeddings_pipelined(
+    withdrarxiv_parquet, tmp_path, monkeypatch
+) -> None:
+    """A pipelined build stores the same embeddings as a sequential one."""
+    monkeypatch.setattr(data, "get_embedding_size", lambda: 8)
+    monkeypatch.setattr(data, "embed_batch", fake_embed_batch)
+
+    stored = {}
+    for pipelined in (False, True):
+        target_db = str(tmp_path / f"withdrarxiv_embeddings_{pipelined}.duckdb")
+        data.create_withdrarxiv_embeddings(
+            target_db=target_db,
+            export_matrix=False,
+            batch_size=4,
+            parquet_path=withdrarxiv_parquet,
+            pipelined=pipelined,
+            encode_batch_size=2,
+            queue_size=1,
+        )
+        conn = duckdb.connect(target_db, read_only=True)
+        stored[pipelined] = conn.execute(
+            "SELECT arxiv_id, embedding FROM embeddings ORDER BY arxiv_id"
+        ).fetchall()
+        conn.close()
+
+    assert len(stored[True]) == 28
+    assert stored[True] == stored[False]
+
+
+def test_create_withdrarxiv_embeddings_gemini_groups_batches(
+    withdrarxiv_parquet, tmp_path, monkeypatch
+) -> None:
+    """Gemini builds embed several batches per call so requests overlap."""
+    monkeypatch.setattr(data, "get_embedding_size", lambda: 8)
+    monkeypatch.setattr(data, "EMBEDDING_PROVIDER", "gemini")
+    monkeypatch.setattr(data, "GEMINI_EMBEDDING_MAX_CONCURRENCY", 3)
+    calls = []
+
+    def counting_embed_batch(
+        texts: list[str], batch_size: int = 4, use_cache: bool = True
+    ) -> np.ndarray:
+        calls.append(len(texts))
+        return fake_embed_batch(texts)
+
+    monkeypatch.setattr(data, "embed_batch", counting_embed_batch)
+    target_db = str(tmp_path / "withdrarxiv_embeddings_test.duckdb")
+    data.create_withdrarxiv_embeddings(
+        target_db=target_db,
+        export_matrix=False,
+        batch_size=4,
+        parquet_path=withdrarxiv_parquet,
+    )
+
+    # 28 papers in 7 batches of 4, grouped 3 at a time
+    assert calls == [12, 12, 4]
+    conn = duckdb.connect(target_db, read_only=True)
+    stored = conn.execute(
+        "SELECT arxiv_id, embedding FROM embeddings ORDER BY arxiv_id"
+    ).fetchall()
+    conn.close()
+    assert len(stored) == 28
+    for arxiv_id, embedding in stored:
+        assert int(np.argmax(embedding)) == int(arxiv_id.split(".")[-1]) % 8
+
+
+def test_create_withdrarxiv_embeddings_pipelined_error(
+    withdrarxiv_parquet, tmp_path, monkeypatch
+) -> None:
+    """Errors from the pipelined encoder reach the caller."""
+    monkeypatch.setattr(data, "get_embedding_size", lambda: 8)
+
+    def failing_embed_batch(
+        texts: list[str], batch_size: int = 4, use_cache: bool = True
+    ) -> np.ndarray:
+        raise RuntimeError("encoder failed")
+
+    monkeypatch.setattr(data, "embed_batch", failing_embed_batch)
+    with pytest.raises(RuntimeError, match="encoder failed"):
+        data.create_withdrarxiv_embeddings(
+            target_db=str(tmp_path / "withdrarxiv_embeddings_test.duckdb"),
+            batch_size=4,
+            parquet_path=withdrarxiv_parquet,
+            pipelined=True,
+        )
+
+
+def test_create_withdrarxiv_embeddings_sharded(
+    withdrarxiv_parquet, tmp_path, monkeypatch
+) -> None:
+    """A sharded multi-process build stores every embedding once."""
+    monkeypatch.setattr(data, "get_embedding_size", lambda: 8)
+    monkeypatch.setattr(data, "embed_batch", fake_embed_batch)
+    # fork so the worker processes see the patched embed_batch
+    monkeypatch.setattr(data, "_SHARD_MP_CONTEXT", "fork")
+
+    target_db = str(tmp_path / "withdrarxiv_embeddings_test.duckdb")
+    data.create_withdrarxiv_embeddings(
+        target_db=target_db,
+        export_matrix=False,
+        parquet_path=withdrarxiv_parquet,
+        workers=2,
+        shard_size=6,
+    )
+
+    conn = duckdb.connect(target_db, read_only=True)
+    rows = conn.execute(
+        "SELECT arxiv_id, embedding FROM embeddings ORDER BY arxiv_id"
+    ).fetchall()
+    last_rowid = conn.execute("SELECT last_rowid FROM build_checkpoint").fetchone()[0]
+    conn.close()
+
+    assert len(rows) == 28
+    assert last_rowid == 27
+    for arxiv_id, embedding in rows:
+        expected = fake_embed_batch([f"abstract {int(arxiv_id.split('.')[1])}"])[0]
+        assert np.array_equal(np.array(embedding, dtype=np.float32), expected)
+    assert not pathlib.Path(f"{target_db}.shards").exists()
@@ -0,0 +1,139 @@
+"""
+Tests for the content-addressed embedding cache
+"""
+
+import asyncio
+import threading
+
+import numpy as np
+from manugen_ai import data
+from manugen_ai.embedding_cache import EmbeddingCache
+
+
+class CountingEncoder:
+    """Embed texts as one-hot vectors, recording which were encoded."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.encoded.extend(texts)
+        embs = np.zeros((len(texts), 8), dtype=np.float32)
+        for row, text in enumerate(texts):
+            embs[row, int(text.split()[-1]) % 8] = 1.0
+        return embs
+
+
+def test_get_or_embed_encodes_each_text_once(tmp_path) -> None:
+    """Repeated texts are encoded once and served from the cache after."""
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    encoder = CountingEncoder()
+
+    first = cache.get_or_embed("model", ["text 1", "text 2", "text 1"], encoder)
+    second = cache.get_or_embed("model", ["text 2", "text 3"], encoder)
+
+    assert encoder.encoded == ["text 1", "text 2", "text 3"]
+    assert np.array_equal(first, encoder(["text 1", "text 2", "text 1"]))
+    assert np.array_equal(second, encoder(["text 2", "text 3"]))
+    summary = cache.summary()
+    assert summary["lookups"] == 5
+    assert summary["memory_hits"] == 1
+    assert summary["misses"] == 4
+    assert summary["hit_rate"] == 0.2
+    cache.close()
+
+
+def test_get_or_embed_no_texts(tmp_path) -> None:
+    """No texts give an empty (0, d) array, as without the cache."""
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    encoder = CountingEncoder()
+
+    embs = cache.get_or_embed("model", [], encoder, embedding_size=8)
+
+    assert embs.shape == (0, 8)
+    assert embs.dtype == np.float32
+    assert encoder.encoded == []
+    cache.close()
+
+
+def test_cache_persists_and_is_keyed_by_model(tmp_path) -> None:
+    """Embeddings survive a new cache instance and aren't shared across models."""
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path)
+    cache.get_or_embed("model-a", ["text 1", "text 2"], CountingEncoder())
+    cache.close()
+
+    cache = EmbeddingCache(path, memory_size=1)
+    encoder = CountingEncoder()
+    cache.get_or_embed("model-a", ["text 1", "text 2"], encoder)
+    cache.get_or_embed("model-b", ["text 1"], encoder)
+
+    assert encoder.encoded == ["text 1"]
+    assert cache.disk_hits == 2
+    assert cache.summary()["memory_entries"] == 1
+    cache.close()
+
+
+def test_aget_or_embed(tmp_path) -> None:
+    """The async variant awaits the encoder only for missing texts."""
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    encoder = CountingEncoder()
+
+    async def aencoder(texts: list[str]) -> np.ndarray:
+        return encoder(texts)
+
+    asyncio.run(cache.aget_or_embed("model", ["text 1"], aencoder))
+    embs = asyncio.run(cache.aget_or_embed("model", ["text 1", "text 2"], aencoder))
+
+    assert encoder.encoded == ["text 1", "text 2"]
+    assert embs.shape == (2, 8)
+    cache.close()
+
+
+def test_embed_uses_cache(tmp_path, monkeypatch) -> None:
+    """embed and embed_batch share the cache unless it is bypassed."""
+    encoder = CountingEncoder()
+    monkeypatch.setattr(
+        data, "_encode_texts", lambda texts, batch_size=4: encoder(texts)
+    )
+    monkeypatch.setattr(data, "USE_EMBEDDING_CACHE", True)
+    monkeypatch.setattr(data, "EMBEDDING_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(data, "_EMBEDDING_CACHE", None)
+
+    data.embed("draft 1")
+    data.embed_batch(["draft 1", "draft 2"])
+    data.embed("draft 2")
+    data.embed_batch(["draft 2"], use_cache=False)
+
+    assert encoder.encoded == ["draft 1", "draft 2", "draft 2"]
+    assert data.get_embedding_cache().summary()["hit_rate"] == 0.5
+    data.get_embedding_cache().close()
+
+
+def test_aget_or_embed_uses_sqlite_off_the_event_loop(tmp_path) -> None:
+    """The cache database is read and written in a worker thread."""
+    threads = set()
+
+    class RecordingCache(EmbeddingCache):
+        def get_many(self, model, texts):
+            threads.add(threading.get_ident())
+            return super().get_many(model, texts)
+
+        def put_many(self, model, texts, embeddings):
+            threads.add(threading.get_ident())
+            super().put_many(model, texts, embeddings)
+
+    cache = RecordingCache(str(tmp_path / "cache.sqlite"))
+    encoder = CountingEncoder()
+
+    async def aencoder(texts: list[str]) -> np.ndarray:
+        return encoder(texts)
+
+    async def run():
+        await cache.aget_or_embed("model", ["text 1"], aencoder)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+
+    assert threads and loop_thread not in threads
+    cache.close()
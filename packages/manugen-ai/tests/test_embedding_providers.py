@@ -0,0 +1,122 @@
+"""
+Tests for the embedding provider registry
+"""
+
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+from manugen_ai import data, embedding_providers
+from manugen_ai.embedding_providers import (
+    EmbeddingProvider,
+    FlagEmbeddingProvider,
+    HashingEmbeddingProvider,
+    create_embedding_provider,
+    get_embedding_provider_names,
+    register_embedding_provider,
+)
+
+
+class OneHotProvider(EmbeddingProvider):
+    """Embed texts as one-hot vectors, recording the batches encoded."""
+
+    name = "one-hot"
+
+    def __init__(self):
+        self.batches = []
+
+    @property
+    def model_name(self) -> str:
+        return "one-hot-8"
+
+    @property
+    def dimension(self) -> int:
+        return 8
+
+    def encode_batch(self, texts: list[str], batch_size: int = 4) -> np.ndarray:
+        self.batches.append(texts)
+        embs = np.zeros((len(texts), 8), dtype=np.float32)
+        for row, text in enumerate(texts):
+            embs[row, int(text.split()[-1]) % 8] = 1.0
+        return embs
+
+
+def pid_encode(texts: list[str], batch_size: int = 4) -> np.ndarray:
+    """Embed texts as the id of the process which encoded them."""
+    return np.full((len(texts), 2), os.getpid(), dtype=np.float64)
+
+
+def test_flag_embedding_provider_encodes_in_executor() -> None:
+    """Async FlagEmbedding encodes run in the provider's process pool."""
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("fork")
+    ) as pool:
+        provider = FlagEmbeddingProvider(
+            "BAAI/bge-m3", encode_fn=pid_encode, get_executor=lambda: pool
+        )
+        embs = asyncio.run(provider.aencode_batch(["draft 1", "draft 2"]))
+
+    assert embs.dtype == np.float32
+    assert embs.shape == (2, 2)
+    assert int(embs[0, 0]) != os.getpid()
+    assert int(provider.encode_batch(["draft 3"])[0, 0]) == os.getpid()
+    # without an executor, async encodes run in a thread of this process
+    provider.get_executor = lambda: None
+    assert int(asyncio.run(provider.aencode_batch(["draft 4"]))[0, 0]) == os.getpid()
+
+
+def test_hashing_provider_is_deterministic() -> None:
+    """Hashing embeddings are unit vectors which depend only on the words."""
+    provider = HashingEmbeddingProvider(dimension=64)
+    texts = [
+        "Retracted due to an error in Table 2",
+        "retracted, due to an ERROR in table 2!",
+        "A survey of protein folding",
+        "",
+    ]
+
+    embs = provider.encode_batch(texts)
+
+    assert embs.shape == (4, 64)
+    assert embs.dtype == np.float32
+    assert np.allclose(np.linalg.norm(embs[:3], axis=1), 1.0)
+    assert not embs[3].any()
+    assert np.array_equal(embs[0], embs[1])
+    assert np.array_equal(embs, HashingEmbeddingProvider(64).encode_batch(texts))
+    assert np.array_equal(provider.encode(texts[2]), embs[2])
+    assert np.array_equal(asyncio.run(provider.aencode_batch(texts)), embs)
+
+
+def test_embed_uses_registered_provider(monkeypatch) -> None:
+    """embed, embed_batch and the model's name and size follow the provider."""
+    provider = OneHotProvider()
+    monkeypatch.setattr(
+        embedding_providers,
+        "_PROVIDER_FACTORIES",
+        dict(embedding_providers._PROVIDER_FACTORIES),
+    )
+    register_embedding_provider("one-hot", lambda: provider)
+    assert "one-hot" in get_embedding_provider_names()
+    monkeypatch.setattr(data, "EMBEDDING_PROVIDER", "one-hot")
+    monkeypatch.setattr(data, "USE_EMBEDDING_CACHE", False)
+
+    embs = data.embed_batch(["draft 1", "draft 2"])
+    vec = data.embed("draft 5")
+    async_embs = asyncio.run(data.aembed_batch(["draft 3"]))
+
+    assert [int(row.argmax()) for row in embs] == [1, 2]
+    assert int(vec.argmax()) == 5
+    assert int(async_embs[0].argmax()) == 3
+    assert provider.batches == [["draft 1", "draft 2"], ["draft 5"], ["draft 3"]]
+    assert data.get_model_name() == "one-hot-8"
+    assert data.get_embedding_size() == 8
+    assert data.get_embedding_provider() is provider
+
+
+def test_unknown_embedding_provider() -> None:
+    """Creating an unregistered provider names the registered ones."""
+    with pytest.raises(ValueError, match="hashing"):
+        create_embedding_provider("no-such-provider")
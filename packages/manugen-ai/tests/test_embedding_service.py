@@ -0,0 +1,140 @@
+"""
+Tests for the micro-batching embedding service
+"""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+import uvicorn
+from manugen_ai import data
+from manugen_ai.embedding_service import (
+    EmbeddingServiceClient,
+    MicroBatcher,
+    create_embedding_app,
+    parse_service_url,
+)
+
+
+class RecordingEncoder:
+    """Embed texts as one-hot vectors, recording each batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.batches.append(list(texts))
+        embs = np.zeros((len(texts), 8), dtype=np.float32)
+        for row, text in enumerate(texts):
+            embs[row, int(text.split()[-1]) % 8] = 1.0
+        return embs
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_gathers_concurrent_requests() -> None:
+    """Concurrent requests are encoded together, up to the max batch size."""
+    encoder = RecordingEncoder()
+    batcher = MicroBatcher(encoder, max_batch_size=4, max_wait_ms=50)
+    batcher.start()
+
+    results = await asyncio.gather(
+        *(batcher.embed([f"query {i}"]) for i in range(6)),
+        batcher.embed(["query 6", "query 7"]),
+    )
+    await batcher.stop()
+
+    assert [int(embs[0].argmax()) for embs in results[:6]] == list(range(6))
+    assert results[6].shape == (2, 8)
+    assert [len(batch) for batch in encoder.batches] == [4, 4]
+    assert batcher.summary()["mean_batch_size"] == 4
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_propagates_errors() -> None:
+    """Encoder errors reach every request in the failed batch."""
+
+    def failing_encoder(texts: list[str]) -> np.ndarray:
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(failing_encoder, max_wait_ms=1)
+    batcher.start()
+    with pytest.raises(RuntimeError, match="model failed"):
+        await batcher.embed(["query 1"])
+    await batcher.stop()
+
+
+def test_parse_service_url() -> None:
+    """Unix socket URLs map to a socket path."""
+    assert parse_service_url("http://127.0.0.1:8765/") == (
+        "http://127.0.0.1:8765",
+        None,
+    )
+    assert parse_service_url("unix:///tmp/embed.sock")[1] == "/tmp/embed.sock"
+
+
+def test_embedding_service_over_unix_socket(tmp_path, monkeypatch) -> None:
+    """embed_batch requests embeddings from the service when configured."""
+    encoder = RecordingEncoder()
+    socket_path = tmp_path / "embed.sock"
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_embedding_app(encoder, model_name="fake", max_wait_ms=20),
+            uds=str(socket_path),
+            log_level="warning",
+        )
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    url = f"unix://{socket_path}"
+    monkeypatch.setattr(data, "EMBEDDING_PROVIDER", "bge-m3")
+    monkeypatch.setattr(data, "USE_EMBEDDING_CACHE", False)
+    monkeypatch.setattr(data, "EMBEDDING_SERVICE_URL", url)
+    monkeypatch.setattr(data, "_EMBEDDING_SERVICE_CLIENT", EmbeddingServiceClient(url))
+
+    try:
+        embs = data.embed_batch(["draft 1", "draft 2"])
+        vec = data.embed("draft 5")
+        health = data.get_embedding_service_client().health()
+    finally:
+        data.get_embedding_service_client().close()
+        server.should_exit = True
+        thread.join()
+
+    assert embs.dtype == np.float32
+    assert [int(row.argmax()) for row in embs] == [1, 2]
+    assert int(vec.argmax()) == 5
+    assert health["model"] == "fake"
+    assert health["texts"] == 3
+
+
+def test_wait_until_ready(tmp_path) -> None:
+    """The client waits for a service to start, or times out."""
+    socket_path = tmp_path / "embed.sock"
+    client = EmbeddingServiceClient(f"unix://{socket_path}")
+    with pytest.raises(TimeoutError):
+        client.wait_until_ready(timeout_s=0.2, interval_s=0.05)
+
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_embedding_app(RecordingEncoder(), model_name="fake"),
+            uds=str(socket_path),
+            log_level="warning",
+        )
+    )
+    # start the service while the client waits
+    thread = threading.Timer(0.2, server.run)
+    thread.daemon = True
+    thread.start()
+    try:
+        health = client.wait_until_ready(timeout_s=10, interval_s=0.05)
+    finally:
+        client.close()
+        server.should_exit = True
+        thread.join()
+
+    assert health["model"] == "fake"
@@ -0,0 +1,144 @@
+"""
+Tests for content-type-aware extraction of fetched resources
+"""
+
+import json
+import struct
+import zlib
+
+import httpx
+import pytest
+from manugen_ai.extraction import (
+    ExtractionStats,
+    estimate_tokens,
+    extract_content,
+    truncate_to_tokens,
+)
+
+PAGE = b"""<!doctype html>
+<html>
+<head><title>Protocol</title><style>body { color: red; }</style></head>
+<body>
+<nav><a href="/">Home</a> <a href="/about">About</a></nav>
+<script>var html = "<p>not content</p>";</script>
+<main>
+  <h1>RNA-seq protocol</h1>
+  <p>Reads were aligned with <b>STAR</b> (see <a href="figs/1.png">Figure 1</a>).</p>
+  <ul><li>Trim adapters</li><li>Align reads</li></ul>
+  <pre><code>STAR --runThreadN 8
+    --genomeDir index</code></pre>
+  <img src="/img/qc.png" alt="QC plot">
+</main>
+<footer>Copyright</footer>
+</body>
+</html>
+"""
+
+
+def response(content_type: str, content: bytes, url: str) -> httpx.Response:
+    """Build a fetched response."""
+    return httpx.Response(
+        200,
+        headers={"Content-Type": content_type},
+        content=content,
+        request=httpx.Request("GET", url),
+    )
+
+
+def png_header(width: int, height: int) -> bytes:
+    """Build the signature and IHDR chunk of a PNG image."""
+    ihdr = b"IHDR" + struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + struct.pack(">I", 13)
+        + ihdr
+        + struct.pack(">I", zlib.crc32(ihdr))
+    )
+
+
+def test_extract_html_to_markdown() -> None:
+    """Pages become Markdown without scripts, styles or navigation."""
+    text = extract_content(
+        response(
+            "text/html; charset=utf-8", PAGE, "https://example.org/protocols/rna.html"
+        )
+    )
+
+    assert text == (
+        "# RNA-seq protocol\n\n"
+        "Reads were aligned with **STAR** "
+        "(see [Figure 1](https://example.org/protocols/figs/1.png)).\n\n"
+        "- Trim adapters\n"
+        "- Align reads\n\n"
+        "```\nSTAR --runThreadN 8\n    --genomeDir index\n```\n\n"
+        "![QC plot](https://example.org/img/qc.png)"
+    )
+
+
+def test_extract_json_and_text_as_is() -> None:
+    """JSON and plain text are returned unchanged."""
+    body = json.dumps({"results": [{"title": "<b>kept</b>"}]}, indent=2)
+
+    assert (
+        extract_content(response("application/json", body.encode(), "https://e.org/"))
+        == body
+    )
+    assert (
+        extract_content(response("", b"x = 1\n", "https://e.org/analysis.py"))
+        == "x = 1\n"
+    )
+
+
+def test_extract_untyped_content() -> None:
+    """Untyped content is text only if it has no NUL bytes and decodes cleanly."""
+    assert extract_content(response("", b"a\tb\n", "https://e.org/data")) == "a\tb\n"
+
+    for content in (b"\x00\x01\x02data", b"\xff\xfe\xfd data"):
+        text = extract_content(response("", content, "https://e.org/data"))
+        assert text == (
+            f"Binary content (unknown type, {len(content)} bytes) "
+            "from https://e.org/data is not included."
+        )
+
+
+def test_extract_image_metadata() -> None:
+    """Images are described by their metadata, never their bytes."""
+    text = extract_content(
+        response("image/png", png_header(640, 480), "https://e.org/fig.png")
+    )
+
+    assert "Content-Type: image/png" in text
+    assert f"Size: {len(png_header(640, 480))} bytes" in text
+    assert "IHDR" not in text
+    pytest.importorskip("PIL")
+    assert "Dimensions: 640x480 pixels" in text
+
+
+def test_extract_within_token_budget() -> None:
+    """Every kind of content is cut to the token budget, with a note."""
+    words = " ".join(f"word{i}" for i in range(5000))
+    page = f"<html><body><p>{words}</p></body></html>".encode()
+
+    for content_type, content in (("text/plain", words.encode()), ("text/html", page)):
+        text = extract_content(response(content_type, content, "https://e.org/"), 100)
+        assert text.endswith("[... truncated to about 100 tokens]")
+        assert estimate_tokens(text) <= 100 + 12
+
+    assert truncate_to_tokens("short text", 100) == ("short text", False)
+
+
+def test_extraction_stats() -> None:
+    """Stats report bytes in and tokens out by kind of content."""
+    stats = ExtractionStats()
+    stats.record("html", 4000, 100, False)
+    stats.record("html", 6000, 100, True)
+    stats.record("image", 50000, 20, False)
+
+    summary = stats.summary()
+
+    assert summary["extractions"] == 3
+    assert summary["bytes_in"] == 60000
+    assert summary["tokens_out"] == 220
+    assert summary["truncated"] == 1
+    assert summary["by_kind"]["html"]["bytes_in"] == 10000
+    assert summary["bytes_per_token"] == pytest.approx(60000 / 220)
@@ -0,0 +1,82 @@
+"""
+Tests for the async Gemini embedding client
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from google import genai
+from google.genai import errors, types
+from manugen_ai.gemini_embeddings import AsyncGeminiEmbeddingClient
+
+TEXTS = [f"abstract {i}" for i in range(23)]
+
+
+def make_client(server, **kwargs) -> AsyncGeminiEmbeddingClient:
+    """Create an embedding client which calls the fake server."""
+    return AsyncGeminiEmbeddingClient(
+        client=genai.Client(
+            api_key="test-key",
+            http_options=types.HttpOptions(base_url=server.base_url),
+        ),
+        model="text-embedding-004",
+        initial_backoff_s=0.01,
+        **kwargs,
+    )
+
+
+def test_embed_splits_requests_and_bounds_concurrency(
+    fake_embedding_server,
+) -> None:
+    """Texts are split per request, sent concurrently and kept in order."""
+    client = make_client(fake_embedding_server, max_concurrency=2, max_batch_size=5)
+    embs = client.embed_sync(TEXTS)
+
+    assert embs.shape == (23, 8)
+    assert embs.dtype == np.float32
+    assert [int(row.argmax()) for row in embs] == [i % 8 for i in range(23)]
+    assert sorted(fake_embedding_server.batch_sizes) == [3, 5, 5, 5, 5]
+    assert fake_embedding_server.max_in_flight == 2
+    summary = client.throughput.summary()
+    assert summary["texts"] == 23
+    assert summary["requests"] == 5
+    assert summary["texts_per_s"] > 0
+
+
+def test_embed_retries_rate_limits(fake_embedding_server) -> None:
+    """429 and 5xx responses are retried with backoff."""
+    fake_embedding_server.fail_with = [429, 503, 429]
+    client = make_client(fake_embedding_server, max_batch_size=10)
+
+    embs = asyncio.run(client.embed(TEXTS))
+
+    assert embs.shape == (23, 8)
+    assert client.throughput.retries == 3
+    assert client.throughput.requests == 3
+
+
+def test_embed_gives_up(fake_embedding_server) -> None:
+    """Client errors and exhausted retries are raised."""
+    fake_embedding_server.fail_with = [400]
+    client = make_client(fake_embedding_server)
+    with pytest.raises(errors.ClientError):
+        client.embed_sync(TEXTS)
+    assert client.throughput.retries == 0
+
+    fake_embedding_server.fail_with = [500, 500, 500]
+    client = make_client(fake_embedding_server, max_retries=2)
+    with pytest.raises(errors.ServerError):
+        client.embed_sync(TEXTS)
+    assert client.throughput.retries == 2
+    assert client.throughput.failures == 1
+
+
+def test_embed_sync_within_running_loop(fake_embedding_server) -> None:
+    """embed_sync works when called from code running in an event loop."""
+    client = make_client(fake_embedding_server)
+
+    async def caller():
+        return client.embed_sync(TEXTS[:3])
+
+    assert asyncio.run(caller()).shape == (3, 8)
@@ -0,0 +1,149 @@
+"""
+Tests for the on-disk HTTP response cache
+"""
+
+import asyncio
+
+import httpx
+from manugen_ai.http_cache import HttpCache, freshness_lifetime
+from manugen_ai.http_client import AsyncHttpClient
+
+
+def fetch_twice(client: AsyncHttpClient, url: str) -> list[httpx.Response]:
+    """Fetch a URL twice in turn on one event loop."""
+
+    async def fetch():
+        try:
+            return [await client.get(url), await client.get(url)]
+        finally:
+            await client.aclose()
+
+    return asyncio.run(fetch())
+
+
+def test_fresh_responses_are_served_from_cache(fake_web_server, tmp_path) -> None:
+    """Fresh responses are reused, even by a new cache on the same directory."""
+    url = f"{fake_web_server.url}/fresh"
+    client = AsyncHttpClient(cache=HttpCache(str(tmp_path)))
+
+    first, second = fetch_twice(client, url)
+    reopened = AsyncHttpClient(cache=HttpCache(str(tmp_path)))
+    third, _ = fetch_twice(reopened, url)
+
+    assert first.text == second.text == third.text == "protocol v1"
+    assert second.headers["Cache-Control"] == "max-age=3600"
+    second.raise_for_status()
+    assert fake_web_server.paths == ["/fresh"]
+    summary = client.cache.summary()
+    assert summary["hits"] == 1
+    assert summary["misses"] == 1
+    assert summary["hit_rate"] == 0.5
+    assert summary["bytes_served"] == len("protocol v1")
+    assert reopened.cache.summary()["hits"] == 2
+
+
+def test_stale_responses_are_revalidated(fake_web_server, tmp_path) -> None:
+    """Stale responses are revalidated with their ETag or Last-Modified."""
+    client = AsyncHttpClient(cache=HttpCache(str(tmp_path)))
+
+    for path in ("/etag", "/last-modified"):
+        first, second = fetch_twice(client, f"{fake_web_server.url}{path}")
+        assert first.text == second.text == "protocol v1"
+        assert second.status_code == 200
+
+    assert fake_web_server.paths == ["/etag"] * 2 + ["/last-modified"] * 2
+    assert fake_web_server.not_modified == 2
+    summary = client.cache.summary()
+    assert summary["revalidations"] == 2
+    assert summary["misses"] == 2
+    # both responses share one stored body
+    assert summary["entries"] == 2
+    assert summary["bytes"] == len("protocol v1")
+
+
+def test_uncacheable_responses_are_not_stored(fake_web_server, tmp_path) -> None:
+    """no-store responses, and those which can't be reused, are fetched again."""
+    client = AsyncHttpClient(cache=HttpCache(str(tmp_path)))
+
+    for path in ("/no-store", "/page"):
+        fetch_twice(client, f"{fake_web_server.url}{path}")
+
+    assert fake_web_server.paths == ["/no-store"] * 2 + ["/page"] * 2
+    assert client.cache.summary()["stores"] == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path) -> None:
+    """Above max_bytes, the least recently used responses are evicted."""
+    cache = HttpCache(str(tmp_path), max_bytes=300)
+
+    def response(url: str, body: bytes) -> httpx.Response:
+        return httpx.Response(
+            200,
+            headers={"Cache-Control": "max-age=60"},
+            content=body,
+            request=httpx.Request("GET", url),
+        )
+
+    for i in range(3):
+        url = f"https://example.org/{i}"
+        assert cache.store(url, response(url, bytes([i]) * 100))
+    # using the first response makes the second the least recently used
+    assert cache.lookup("https://example.org/0") is not None
+    cache.store("https://example.org/3", response("https://example.org/3", b"3" * 100))
+
+    assert cache.lookup("https://example.org/1") is None
+    assert cache.lookup("https://example.org/0")[0].content == bytes([0]) * 100
+    assert cache.lookup("https://example.org/3")[0].content == b"3" * 100
+    assert cache.summary()["evictions"] == 1
+    assert len(list((tmp_path / "content").glob("*/*"))) == 3
+
+
+def test_freshness_lifetime() -> None:
+    """Freshness follows max-age, Age, Expires and Last-Modified in turn."""
+    now = 1_760_000_000.0
+    date = "Thu, 09 Oct 2025 08:53:20 GMT"
+
+    assert freshness_lifetime(httpx.Headers({"Cache-Control": "max-age=60"}), now) == 60
+    assert (
+        freshness_lifetime(
+            httpx.Headers({"Cache-Control": "public, max-age=60", "Age": "20"}), now
+        )
+        == 40
+    )
+    assert (
+        freshness_lifetime(
+            httpx.Headers({"Date": date, "Expires": "Thu, 09 Oct 2025 09:53:20 GMT"}),
+            now,
+        )
+        == 3600
+    )
+    assert freshness_lifetime(httpx.Headers({"Expires": "0"}), now) == 0
+    assert (
+        freshness_lifetime(
+            httpx.Headers(
+                {"Date": date, "Last-Modified": "Wed, 08 Oct 2025 08:53:20 GMT"}
+            ),
+            now,
+        )
+        == 8640
+    )
+    assert freshness_lifetime(httpx.Headers({"Cache-Control": "no-cache"}), now) == 0
+
+
+def test_cache_ttl_overrides_headers(fake_web_server, tmp_path) -> None:
+    """With a TTL, responses without caching headers are reused until it ends."""
+    client = AsyncHttpClient(cache=HttpCache(str(tmp_path)))
+
+    async def fetch(url: str, ttl_s: float):
+        try:
+            for _ in range(2):
+                await client.get(url, cache_ttl_s=ttl_s)
+        finally:
+            await client.aclose()
+
+    asyncio.run(fetch(f"{fake_web_server.url}/page?ttl=3600", 3600))
+    # expired at once, and can't be revalidated
+    asyncio.run(fetch(f"{fake_web_server.url}/page?ttl=0", 0))
+
+    assert fake_web_server.paths == ["/page?ttl=3600"] + ["/page?ttl=0"] * 2
+    assert client.cache.summary()["hits"] == 1
@@ -0,0 +1,60 @@
+"""
+Tests for the shared async HTTP client
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from manugen_ai.http_client import AsyncHttpClient, ResponseTooLargeError
+
+
+def test_http_client_limits_requests_per_host(fake_web_server) -> None:
+    """No more than max_connections_per_host requests reach one host at once."""
+    client = AsyncHttpClient(max_connections_per_host=2)
+
+    async def fetch_all():
+        try:
+            return await asyncio.gather(
+                *(client.get(f"{fake_web_server.url}/page") for _ in range(6))
+            )
+        finally:
+            await client.aclose()
+
+    responses = asyncio.run(fetch_all())
+
+    assert [r.text for r in responses] == ["<h1>Example Domain</h1>"] * 6
+    assert fake_web_server.max_active == 2
+
+
+@pytest.mark.parametrize("path", ["/large", "/stream"])
+def test_http_client_caps_response_size(fake_web_server, path: str) -> None:
+    """Bodies larger than max_response_bytes raise, with or without a length."""
+    client = AsyncHttpClient(max_response_bytes=2**10)
+
+    async def fetch():
+        try:
+            return await client.get(f"{fake_web_server.url}{path}")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(ResponseTooLargeError):
+        asyncio.run(fetch())
+
+    # a larger cap reads the whole body
+    client.max_response_bytes = 2**17
+    assert len(asyncio.run(fetch()).content) == 2**16
+
+
+def test_http_client_read_timeout(fake_web_server) -> None:
+    """Responses slower than the read timeout raise."""
+    client = AsyncHttpClient(read_timeout_s=0.01)
+
+    async def fetch():
+        try:
+            return await client.get(f"{fake_web_server.url}/page")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(fetch())
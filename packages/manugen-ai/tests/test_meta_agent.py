@@ -2,12 +2,17 @@
 Tests for meta agents
 """
 
+import json
 import os
 
 import pytest
 from google.adk.agents import Agent, LoopAgent
 from google.adk.models.lite_llm import LiteLlm
-from manugen_ai.agents.meta_agent import ResilientToolAgent, StopChecker
+from manugen_ai.agents.meta_agent import (
+    FetchAssetsAgent,
+    ResilientToolAgent,
+    StopChecker,
+)
 from manugen_ai.utils import prepare_ollama_models_for_adk_state, run_agent_workflow
 
 
@@ -155,3 +160,27 @@ async def test_StopChecker():
     assert "feedback" in session_state.keys()
     # test that we exited the loop earlier than the max number of loops
     assert editor_count < MAX_LOOPS
+
+
+@pytest.mark.asyncio
+async def test_FetchAssetsAgent(fake_web_server):
+    """
+    Tests for FetchAssetsAgent
+    """
+
+    urls = [f"{fake_web_server.url}/page", f"{fake_web_server.url}/missing"]
+
+    final_output, session_state, output_events = await run_agent_workflow(
+        agent=FetchAssetsAgent(),
+        prompt="Fetch the outline's assets.",
+        app_name="app",
+        user_id="user",
+        session_id="0001",
+        initial_state={"improved_json": json.dumps({"title": "Example", "urls": urls})},
+        verbose=False,
+    )
+
+    # one fetch per URL, without any model turns
+    assert sorted(fake_web_server.paths) == ["/missing", "/page"]
+    assert session_state["assets"][urls[0]] == "# Example Domain"
+    assert session_state["assets"][urls[1]].startswith("There was an error")
@@ -0,0 +1,120 @@
+"""
+Tests for ONNX Runtime (int8) BGE-M3 embeddings
+
+Tests which export the FlagEmbedding model are skipped unless the
+optional `onnx` dependencies and FlagEmbedding are installed.
+"""
+
+import numpy as np
+import pytest
+from manugen_ai import data
+from manugen_ai.onnx_embeddings import (
+    OnnxBgeM3Encoder,
+    export_bge_m3_onnx,
+    padded_token_count,
+)
+
+TEXTS = [
+    "Deep learning for protein structure prediction.",
+    "We report a CRISPR screen identifying regulators of T cell exhaustion "
+    "in a mouse model of chronic infection, with validation in human samples.",
+    "The paper has been withdrawn by the authors due to an error in Eq. 3.",
+    "Transformers",
+]
+
+
+class WhitespaceTokenizer:
+    """A stand-in for a Hugging Face tokenizer splitting on whitespace."""
+
+    def __call__(self, texts, truncation=False, max_length=None):
+        ids = [[len(word) for word in text.split()] for text in texts]
+        return {"input_ids": [x[:max_length] if truncation else x for x in ids]}
+
+    def pad(self, encoded, padding=True, return_tensors="np"):
+        width = max(len(ids) for ids in encoded["input_ids"])
+        return {
+            "input_ids": np.array(
+                [ids + [0] * (width - len(ids)) for ids in encoded["input_ids"]]
+            ),
+            "attention_mask": np.array(
+                [
+                    [1] * len(ids) + [0] * (width - len(ids))
+                    for ids in encoded["input_ids"]
+                ]
+            ),
+        }
+
+
+class RecordingSession:
+    """
+    A stand-in for an ONNX Runtime session whose CLS state is one-hot at
+    a text's number of tokens, recording each batch's padded length.
+    """
+
+    def __init__(self):
+        self.widths = []
+
+    def run(self, output_names, inputs):
+        mask = inputs["attention_mask"]
+        self.widths.append(mask.shape[1])
+        hidden = np.zeros((*mask.shape, 1024), dtype=np.float32)
+        hidden[np.arange(len(mask)), 0, mask.sum(axis=1)] = 2.0
+        return [hidden]
+
+
+def test_onnx_encoder_batches_by_length() -> None:
+    """Texts are encoded in length-sorted batches and returned in order."""
+    encoder = OnnxBgeM3Encoder.__new__(OnnxBgeM3Encoder)
+    encoder.tokenizer = WhitespaceTokenizer()
+    encoder.session = RecordingSession()
+    encoder.max_length = 8192
+    texts = [" ".join(["word"] * (i * 7 % 10 + 1)) for i in range(10)]
+    lengths = np.array([min(len(text.split()), 6) for text in texts])
+
+    embs = encoder.encode(texts, batch_size=3, max_length=6)["dense_vecs"]
+
+    assert embs.dtype == np.float32
+    assert embs.argmax(axis=1).tolist() == lengths.tolist()
+    assert np.allclose(np.linalg.norm(embs, axis=1), 1.0)
+    # longest first: lengths 6, 6, 6 | 6, 6, 5 | 4, 3, 2 | 1
+    assert encoder.session.widths == [6, 6, 4, 1]
+    assert padded_token_count(np.sort(lengths)[::-1], 3) < padded_token_count(
+        lengths, 3
+    )
+    assert encoder.encode([])["dense_vecs"].shape == (0, 1024)
+
+
+@pytest.fixture(scope="module")
+def onnx_model_dir(tmp_path_factory) -> str:
+    """Export the configured FlagEmbedding model to ONNX once per module."""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("FlagEmbedding")
+    try:
+        return export_bge_m3_onnx(
+            data.FLAGEMBEDDING_MODEL_OR_PATH,
+            str(tmp_path_factory.mktemp("onnx") / "bge-m3-int8"),
+            cache_dir=data.FLAGEMBEDDING_CACHE_DIR,
+        )
+    except OSError as e:
+        pytest.skip(f"FlagEmbedding model is not available: {e}")
+
+
+def test_onnx_int8_matches_torch(onnx_model_dir) -> None:
+    """int8 ONNX embeddings have cosine >= 0.99 with the torch model's."""
+    from FlagEmbedding import BGEM3FlagModel
+
+    torch_model = BGEM3FlagModel(
+        data.FLAGEMBEDDING_MODEL_OR_PATH,
+        cache_dir=data.FLAGEMBEDDING_CACHE_DIR,
+        use_fp16=False,
+        device="cpu",
+    )
+    expected = torch_model.encode(TEXTS, batch_size=2)["dense_vecs"]
+    actual = OnnxBgeM3Encoder(onnx_model_dir).encode(TEXTS, batch_size=2)["dense_vecs"]
+
+    assert actual.shape == expected.shape == (len(TEXTS), 1024)
+    assert actual.dtype == np.float32
+    cosine = np.sum(actual * expected, axis=1) / (
+        np.linalg.norm(actual, axis=1) * np.linalg.norm(expected, axis=1)
+    )
+    assert (cosine >= 0.99).all(), cosine
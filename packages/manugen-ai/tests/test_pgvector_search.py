@@ -0,0 +1,177 @@
+"""
+Tests for withdrarxiv search in Postgres with pgvector
+
+Tests using Postgres need a database with the pgvector extension, given
+by the MANUGEN_TEST_PGVECTOR_CONN_STRING environment variable, and are
+skipped otherwise.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("psycopg2")
+import psycopg2.pool  # noqa: E402
+from manugen_ai.pgvector_search import (  # noqa: E402
+    PgvectorSearchEngine,
+    load_duckdb_into_pgvector,
+)
+from manugen_ai.search import WithdrarxivSearchEngine  # noqa: E402
+
+DSN = os.environ.get("MANUGEN_TEST_PGVECTOR_CONN_STRING")
+requires_pgvector = pytest.mark.skipif(
+    not DSN, reason="MANUGEN_TEST_PGVECTOR_CONN_STRING is not set"
+)
+
+
+class FakeConnection:
+    """A stand-in for a psycopg2 connection."""
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    """
+    A stand-in for `psycopg2.pool.ThreadedConnectionPool`, raising
+    `PoolError` like it does once every connection is in use.
+    """
+
+    def __init__(self, min_connections, max_connections, dsn):
+        self.max_connections = max_connections
+        self.in_use = 0
+        self.most_in_use = 0
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        with self.lock:
+            if self.in_use >= self.max_connections:
+                raise psycopg2.pool.PoolError("connection pool exhausted")
+            self.in_use += 1
+            self.most_in_use = max(self.most_in_use, self.in_use)
+        return FakeConnection()
+
+    def putconn(self, conn):
+        with self.lock:
+            self.in_use -= 1
+
+
+def test_pgvector_engine_waits_for_pooled_connections(monkeypatch) -> None:
+    """More concurrent borrowers than connections wait instead of failing."""
+    monkeypatch.setattr(psycopg2.pool, "ThreadedConnectionPool", FakePool)
+    engine = PgvectorSearchEngine(
+        dsn="postgresql://unused",
+        embed_fn=lambda text: np.zeros(8, dtype=np.float32),
+        embedding_size=8,
+        papers_table="papers",
+        embeddings_table="embeddings",
+        max_connections=2,
+    )
+
+    def borrow(_):
+        with engine._connection():
+            time.sleep(0.01)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(borrow, range(16)))
+
+    assert engine._pool.in_use == 0
+    assert engine._pool.most_in_use == 2
+
+
+@requires_pgvector
+def test_pgvector_search_matches_duckdb(withdrarxiv_db) -> None:
+    """pgvector search returns the same papers as exact DuckDB search."""
+    db_path, vectors = withdrarxiv_db
+    tables = {"papers": "test_withdrarxiv_papers", "embeddings": "test_embeddings"}
+    assert load_duckdb_into_pgvector(
+        db_path,
+        dsn=DSN,
+        papers_table=tables["papers"],
+        embeddings_table=tables["embeddings"],
+        embedding_size=vectors.shape[1],
+    ) == len(vectors)
+
+    duckdb_engine = WithdrarxivSearchEngine(
+        db_path=db_path,
+        embed_fn=lambda text: vectors[5],
+        embedding_size=vectors.shape[1],
+        backend="exact",
+    )
+    engine = PgvectorSearchEngine(
+        dsn=DSN,
+        embed_fn=lambda text: vectors[5],
+        embedding_size=vectors.shape[1],
+        papers_table=tables["papers"],
+        embeddings_table=tables["embeddings"],
+        backend="exact",
+        max_connections=2,
+    )
+
+    results = engine.search("query", top_k=3)
+    expected = duckdb_engine.search("query", top_k=3)
+    assert [r["arxiv_id"] for r in results] == [r["arxiv_id"] for r in expected]
+    assert results[0]["related_retraction_reasons"] == "reason 5"
+    assert np.allclose(
+        [r["similarity"] for r in results],
+        [r["similarity"] for r in expected],
+        atol=1e-5,
+    )
+    assert len(engine.search_vectors(vectors[:4], top_k=2)) == 4
+    assert 0.0 <= engine.recall_at_k(vectors[:5], top_k=3) <= 1.0
+
+    engine.close()
+    duckdb_engine.close()
+
+
+@requires_pgvector
+def test_pgvector_reload_keeps_serving_searches(withdrarxiv_db) -> None:
+    """Searches during a reload see a complete copy of the embeddings."""
+    db_path, vectors = withdrarxiv_db
+    tables = {
+        "papers": "test_reload_withdrarxiv_papers",
+        "embeddings": "test_reload_embeddings",
+    }
+    load = lambda: load_duckdb_into_pgvector(  # noqa: E731
+        db_path,
+        dsn=DSN,
+        papers_table=tables["papers"],
+        embeddings_table=tables["embeddings"],
+        embedding_size=vectors.shape[1],
+    )
+    assert load() == len(vectors)
+
+    engine = PgvectorSearchEngine(
+        dsn=DSN,
+        embed_fn=lambda text: vectors[5],
+        embedding_size=vectors.shape[1],
+        papers_table=tables["papers"],
+        embeddings_table=tables["embeddings"],
+        backend="exact",
+        max_connections=2,
+    )
+    expected = engine.search("query", top_k=3)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        reload = executor.submit(load)
+        while not reload.done():
+            assert engine.search("query", top_k=3) == expected
+        assert reload.result() == len(vectors)
+    assert engine.search("query", top_k=3) == expected
+
+    # a second reload swaps in again, with no staging tables left over
+    assert load() == len(vectors)
+    with engine._connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM pg_tables WHERE tablename LIKE %s",
+            ("test_reload_%_staging",),
+        )
+        assert cursor.fetchone()[0] == 0
+    engine.close()
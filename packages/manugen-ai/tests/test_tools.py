@@ -1,16 +1,22 @@
+import asyncio
 import pathlib
 from types import SimpleNamespace
 
+import httpx
 import pygit2
 import pytest
+from manugen_ai.tools import tools
 from manugen_ai.tools.tools import (
     clone_repository,
     exit_loop,
     fetch_url,
+    fetch_urls,
+    invert_abstract,
     json_conforms_to_schema,
     openalex_query,
     parse_list,
     read_path_contents,
+    split_topics,
 )
 
 
@@ -37,9 +43,10 @@ def test_openalex_query_live(topics):
     Test openalex_query with real topics.
     """
 
-    result = openalex_query(topics)
+    result = asyncio.run(openalex_query(topics))
 
-    for w in result:
+    assert list(result) == [topics]
+    for w in result[topics]:
         # field checks
         assert "title" in w and isinstance(w["title"], str)
         assert "abstract" in w  # may be empty or None
@@ -48,10 +55,101 @@ def test_openalex_query_live(topics):
 
 def test_fetch_url_real() -> None:
     """Fetch example.com and confirm known content is present."""
-    text: str = fetch_url("http://example.com")
+    text: str = asyncio.run(fetch_url("http://example.com"))
     assert "Example Domain" in text
 
 
+def test_invert_abstract() -> None:
+    """Rebuild an abstract from word positions."""
+    assert invert_abstract({"a": [0, 2], "b": [1]}) == "a b a"
+    assert invert_abstract(None) is None
+
+
+def test_split_topics() -> None:
+    """Split topics on commas, semicolons and bullet lines, without repeats."""
+    assert split_topics("Gene expression, yeast;  RNA-seq\n- gene Expression\n* ") == [
+        "Gene expression",
+        "yeast",
+        "RNA-seq",
+    ]
+
+
+def test_openalex_query_local(fake_web_server, monkeypatch) -> None:
+    """Search each topic once, listing works found for several topics once."""
+    monkeypatch.setattr(tools, "OPENALEX_WORKS_URL", f"{fake_web_server.url}/works")
+    works = [
+        {
+            "title": "Gene expression in yeast",
+            "abstract": "Gene expression",
+            "doi": "https://doi.org/10.1234/yeast",
+        },
+        {"title": "No abstract", "abstract": None, "doi": None},
+    ]
+
+    result = asyncio.run(openalex_query("Gene expression; yeast, budding"))
+    # repeated searches are served from the cache
+    repeated = asyncio.run(openalex_query("gene expression"))
+
+    # every topic found the same works
+    assert result == {"Gene expression": works, "yeast": [], "budding": []}
+    assert repeated == {"gene expression": works}
+    select = "&select=id,doi,title,abstract_inverted_index&per-page=3"
+    assert sorted(fake_web_server.paths) == [
+        "/works?filter=abstract.search:budding,is_retracted:false"
+        f"&sort=cited_by_count:desc{select}",
+        "/works?filter=abstract.search:gene+expression,is_retracted:false"
+        f"&sort=cited_by_count:desc{select}",
+        "/works?filter=abstract.search:yeast,is_retracted:false"
+        f"&sort=cited_by_count:desc{select}",
+    ]
+
+
+def test_openalex_query_topic_error(monkeypatch) -> None:
+    """A failed search is reported for its topic, keeping the others' works."""
+
+    async def search(topic: str) -> list:
+        if topic == "yeast":
+            raise httpx.ConnectError("connection refused")
+        return [{"id": "W1", "title": topic, "doi": None}]
+
+    monkeypatch.setattr(tools, "_search_openalex_topic", search)
+
+    result = asyncio.run(openalex_query("gene expression, yeast"))
+
+    assert result == {
+        "gene expression": [
+            {"title": "gene expression", "abstract": None, "doi": None}
+        ],
+        "yeast": "There was an error or the call was bad. "
+        "(ConnectError: connection refused)",
+    }
+
+
+def test_fetch_url_local(fake_web_server) -> None:
+    """Fetch a local page; failed requests return an error message."""
+    text: str = asyncio.run(fetch_url(f"{fake_web_server.url}/page"))
+    assert text == "# Example Domain"
+
+    missing: str = asyncio.run(fetch_url(f"{fake_web_server.url}/missing"))
+    assert missing.startswith("There was an error or the call was bad.")
+    assert "404" in missing
+
+
+def test_fetch_urls_local(fake_web_server) -> None:
+    """Fetch several local URLs concurrently, each repeated URL once."""
+    page = f"{fake_web_server.url}/page"
+    missing = f"{fake_web_server.url}/missing"
+    urls = [f"{page}?{i}" for i in range(4)] + [page, missing, page]
+
+    result: dict = asyncio.run(fetch_urls(urls))
+
+    assert list(result) == [f"{page}?{i}" for i in range(4)] + [page, missing]
+    assert result[page] == "# Example Domain"
+    assert result[missing].startswith("There was an error or the call was bad.")
+    assert len(fake_web_server.paths) == 6
+    assert fake_web_server.max_active > 1
+
+
 def test_exit_loop_sets_escalate() -> None:
     """Ensure exit_loop sets the escalate flag on the ToolContext."""
     fake_ctx: SimpleNamespace = SimpleNamespace(
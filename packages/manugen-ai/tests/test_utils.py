@@ -0,0 +1,61 @@
+"""
+Tests for manugen-ai utils
+"""
+
+import concurrent.futures
+import hashlib
+import pathlib
+
+import pytest
+from manugen_ai.utils import download_file_if_not_available
+
+
+def test_download_file_once_across_concurrent_callers(
+    fake_file_server, tmp_path: pathlib.Path
+) -> None:
+    """Concurrent callers wait on the lock and only one downloads."""
+    local_path = str(tmp_path / "data" / "withdrarxiv.duckdb")
+    sha256 = hashlib.sha256(fake_file_server.payload).hexdigest()
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        paths = list(
+            executor.map(
+                lambda _: download_file_if_not_available(
+                    local_path, fake_file_server.url, sha256=sha256
+                ),
+                range(4),
+            )
+        )
+
+    assert paths == [local_path] * 4
+    assert fake_file_server.ranges == [None]
+    assert pathlib.Path(local_path).read_bytes() == fake_file_server.payload
+    assert not pathlib.Path(f"{local_path}.part").exists()
+
+
+def test_download_file_resumes_interrupted_transfer(
+    fake_file_server, tmp_path: pathlib.Path
+) -> None:
+    """An interrupted transfer resumes with a Range request."""
+    local_path = str(tmp_path / "withdrarxiv.duckdb")
+    fake_file_server.truncate_after = 2**20
+
+    download_file_if_not_available(local_path, fake_file_server.url)
+
+    assert fake_file_server.ranges == [None, f"bytes={2**20}-"]
+    assert pathlib.Path(local_path).read_bytes() == fake_file_server.payload
+
+
+def test_download_file_checksum_mismatch(
+    fake_file_server, tmp_path: pathlib.Path
+) -> None:
+    """A file with the wrong checksum is discarded rather than kept."""
+    local_path = str(tmp_path / "withdrarxiv.duckdb")
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        download_file_if_not_available(
+            local_path, fake_file_server.url, sha256="0" * 64
+        )
+
+    assert not pathlib.Path(local_path).exists()
+    assert not pathlib.Path(f"{local_path}.part").exists()